@@ -1,10 +1,28 @@
 # app.py
+import threading
+
 from flask import Flask
 from flask_cors import CORS
+import logs
+from models import db
+from models.teams import team_points_buffer
+from app import compression, instrumentation, passwords, session
+from app.json_provider import FastJSONProvider
+from app.commands import register_commands
+from models.indexes import ensure_indexes
 from app.challenges import challenges_bp  # Import the challenges blueprint
 from app.users import users_bp  # Example of another blueprint for user-related routes
 from app.teams import teams_bp  # Example of another blueprint for team-related routes
 from app.rewards import rewards_bp # Example of another blueprint for rewards-related routes
+from app.sync import sync_bp  # Batch upload of offline activity
+from app.exercises import exercises_bp  # Exercise logging and daily activity
+from app.monitoring import monitoring_bp  # Prometheus metrics
+from app.leaderboards import leaderboards_bp  # Individual leaderboards
+
+
+def _ensure_indexes():
+    for collection, error in ensure_indexes():
+        logs.logger.error("ensure_indexes_failed", collection=collection, error=str(error))
 
 
 def create_app():
@@ -14,8 +32,47 @@ def create_app():
     """
     
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)  # orjson; encodes ObjectId, datetime and Decimal
     CORS(app)  # Enable CORS for frontend communication
 
+    # Shared Mongo connection pool; connects lazily on first query per worker
+    app.config.from_object("config")
+    db.init_app(app)
+
+    # Correlation ids and sampled structured logs; set up before the metrics
+    # hooks so the slow-request log carries the request id
+    logs.init_app(app)
+
+    # Per-request latency and MongoDB command metrics on /metrics
+    instrumentation.init_app(app)
+
+    # gzip/br for large responses; registered after the metrics hooks so it
+    # runs before them and response bytes are counted as sent
+    compression.init_app(app)
+
+    # Indexes are normally created at deploy time with `flask ensure-indexes`.
+    # If asked to do it here, do it off the startup path so the worker can
+    # serve while Mongo builds them.
+    if app.config["MONGO_ENSURE_INDEXES"]:
+        threading.Thread(target=_ensure_indexes, name="ensure-indexes", daemon=True).start()
+
+    # flask ensure-indexes / seed / audit-queries and the cron jobs
+    register_commands(app)
+
+    # Session tokens are signed with SECRET_KEY
+    session.init_app(app)
+
+    # Password hashing runs in a process pool sized from config
+    passwords.init_app(app)
+
+    # Optionally batch team point increments instead of writing each one
+    team_points_buffer.configure(
+        app.config["TEAM_POINTS_WRITE_BEHIND"],
+        app.config["TEAM_POINTS_FLUSH_INTERVAL_SECONDS"],
+        app.config["TEAM_POINTS_FLUSH_THRESHOLD"],
+    )
+    instrumentation.watch_buffer(team_points_buffer)
+
     # Register the Blueprint for challenges
     app.register_blueprint(challenges_bp, url_prefix='/api/challenges')
 
@@ -27,6 +84,18 @@ def create_app():
     # Register the Blueprint for teams (if you have one)
     app.register_blueprint(teams_bp, url_prefix='/api/teams')
 
+    # Register the Blueprint for exercise logging
+    app.register_blueprint(exercises_bp, url_prefix='/api/exercise')
+
+    # Register the Blueprint for offline activity sync
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+
+    # Register the Blueprint for individual leaderboards
+    app.register_blueprint(leaderboards_bp, url_prefix='/api/leaderboards')
+
+    # Register the Blueprint for metrics at /metrics
+    app.register_blueprint(monitoring_bp)
+
     # Register any additional blueprints here
     # e.g., app.register_blueprint(other_bp, url_prefix='/api/other')
 
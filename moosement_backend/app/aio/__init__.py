@@ -0,0 +1,57 @@
+# Async serving tier: the hot challenges, rewards, teams and users routes on
+# Quart and PyMongo's AsyncMongoClient. Each worker's event loop keeps many
+# requests waiting on Mongo at once, instead of one per thread.
+from quart import Quart, Response
+from quart_cors import cors
+
+import logs
+import metrics
+from models import db
+from models.teams import team_points_buffer
+from app import compression, instrumentation, passwords
+from app.json_provider import FastJSONProvider
+from app.session import init_app as init_sessions
+from app.aio.challenges import challenges_bp
+from app.aio.rewards import rewards_bp
+from app.aio.teams import teams_bp
+from app.aio.users import users_bp
+
+
+def create_async_app():
+    """
+    Builds the ASGI app. It reads the same config and serves the same URLs as
+    create_app(); routes it does not have (team management, profile updates,
+    sync, exercise and individual leaderboards) stay on the WSGI app.
+    """
+    app = Quart(__name__)
+    app.json = FastJSONProvider(app)
+    app = cors(app)
+
+    app.config.from_object("config")
+    db.init_app(app)
+    logs.init_async_app(app)
+    instrumentation.init_async_app(app)
+    compression.init_async_app(app)
+    init_sessions(app)
+    passwords.init_app(app)
+    team_points_buffer.configure(
+        app.config["TEAM_POINTS_WRITE_BEHIND"],
+        app.config["TEAM_POINTS_FLUSH_INTERVAL_SECONDS"],
+        app.config["TEAM_POINTS_FLUSH_THRESHOLD"],
+    )
+    instrumentation.watch_buffer(team_points_buffer)
+
+    app.register_blueprint(challenges_bp, url_prefix='/api/challenges')
+    app.register_blueprint(rewards_bp, url_prefix='/api/rewards')
+    app.register_blueprint(users_bp, url_prefix='/api/users')
+    app.register_blueprint(teams_bp, url_prefix='/api/teams')
+
+    @app.route("/metrics", methods=["GET"])
+    async def get_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.after_serving
+    async def close_client():
+        await db.close_async()
+
+    return app
@@ -0,0 +1,149 @@
+# challenges.py (async tier)
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+from quart import Blueprint, jsonify, request
+
+from logs import logger
+from models import db
+from models.assignments import todays_assignment_async, resolve_assignment
+from models.challenges import challenge_catalog
+from models.completions import (
+    record_completion_async, get_completion_history_async,
+    HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT,
+)
+from models.leaderboards import note_points_changed
+from models.teams import add_team_points_async
+from models.users import award_challenge_points_async, revoke_challenge_points_async
+from app.aio.conditional import catalog_response
+from app.aio.pagination import page_params, next_cursor
+from app.aio.session import require_user
+
+challenges_bp = Blueprint("challenges_bp", __name__)
+
+
+@challenges_bp.route("/get_challenges", methods=["GET"])
+async def get_challenges():
+    params, error = page_params()
+    if error:
+        return error
+    limit, position = params
+    after = position.get("id") if position else None
+
+    snapshot = await challenge_catalog.snapshot_async()
+    challenges, cursor = next_cursor(
+        snapshot.page_after(after, limit + 1), limit, lambda challenge: {"id": str(challenge["_id"])}
+    )
+
+    def build_payload(_):
+        return {
+            "challenges": [
+                {key: value for key, value in challenge.items() if key != "_id"}
+                for challenge in challenges
+            ],
+            "next_cursor": cursor
+        }
+    return await catalog_response(snapshot, build_payload, variant=(after, limit))
+
+
+@challenges_bp.route("/today", methods=["GET"])
+async def get_todays_challenges():
+    request_user, error = await require_user()
+    if error:
+        return error
+
+    assignment, snapshot = await asyncio.gather(
+        todays_assignment_async(request_user.id), challenge_catalog.snapshot_async()
+    )
+    if assignment is None:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({
+        "day": assignment["day"],
+        "challenges": resolve_assignment(assignment, snapshot)
+    }), 200
+
+
+@challenges_bp.route("/complete", methods=["POST"])
+async def complete_challenge():
+    try:
+        data = await request.get_json()
+        if "challenge_id" not in data:
+            return jsonify({"error": "Missing field: challenge_id"}), 400
+
+        challenge_id = data["challenge_id"]
+        if not ObjectId.is_valid(challenge_id):
+            return jsonify({"error": "Invalid ID format"}), 400
+        challenge_id = str(challenge_id)
+
+        # Resolving the user and looking up the challenge are independent
+        (request_user, error), challenge = await asyncio.gather(
+            require_user(), challenge_catalog.get_async(challenge_id)
+        )
+        if error:
+            return error
+        if not challenge:
+            return jsonify({"error": "Challenge not found"}), 404
+
+        user_object_id = request_user.id
+        user = await award_challenge_points_async(user_object_id, challenge_id, challenge.get("points", 0))
+        if not user:
+            if not await db.get_async_collection(db.USERS).count_documents({"_id": user_object_id}, limit=1):
+                return jsonify({"error": "User not found"}), 404
+            return jsonify({"error": "Challenge already completed today"}), 400
+
+        total_points = user["last_points_earned"]
+        streak = user["streaks"]
+        note_points_changed()
+
+        # Record the completion and update team points together
+        writes = [record_completion_async(
+            user_object_id, challenge_id, challenge.get("name"),
+            total_points, streak, datetime.utcnow().isoformat()
+        )]
+        team_id = user.get("team_id")
+        if team_id:
+            writes.append(add_team_points_async(team_id, total_points))
+
+        results = await asyncio.gather(*writes, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("completion_write_failed", challenge_id=challenge_id, error=str(result))
+
+        # The completion was already recorded today: undo the points
+        if results[0] is False:
+            await revoke_challenge_points_async(user_object_id, challenge_id, user)
+            if team_id and results[-1] is True:
+                await add_team_points_async(team_id, -total_points)
+            return jsonify({"error": "Challenge already completed today"}), 400
+
+        return jsonify({
+            "message": "Challenge completed successfully",
+            "points_earned": total_points,
+            "current_streak": streak,
+            "total_points": user.get("total_points", 0)
+        }), 200
+
+    except Exception as e:
+        logger.error("complete_challenge_failed", error=str(e))
+        return jsonify({"error": "An error occurred while completing the challenge"}), 500
+
+
+@challenges_bp.route("/history", methods=["GET"])
+async def get_history():
+    request_user, error = await require_user()
+    if error:
+        return error
+    user_id = str(request_user.id)
+
+    params, error = page_params(HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT)
+    if error:
+        return error
+    limit, position = params
+    before = position.get("at") if position else None
+
+    history, cursor = next_cursor(
+        await get_completion_history_async(user_id, limit + 1, before), limit,
+        lambda completion: {"at": completion["completed_at"]}
+    )
+    return jsonify({"completed_challenges": history, "next_cursor": cursor}), 200
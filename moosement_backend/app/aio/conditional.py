@@ -0,0 +1,22 @@
+# conditional.py (async tier)
+from quart import current_app, request
+
+from app.compression import compress_snapshot
+from app.conditional import render_snapshot
+
+
+async def catalog_response(snapshot, build_payload, variant=None):
+    """
+    catalog_response() for the async tier. Bodies are cached on the same
+    snapshot as the WSGI tier's, keyed by the async endpoint name.
+    """
+    key = (request.endpoint, variant)
+    body, etag = render_snapshot(snapshot, key, build_payload, current_app.json.dumps)
+
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    response = await response.make_conditional(request)
+    if response.status_code == 200:
+        compress_snapshot(response, snapshot, key, body, request.accept_encodings, current_app.config)
+    return response
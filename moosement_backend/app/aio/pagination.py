@@ -0,0 +1,21 @@
+# pagination.py (async tier)
+from quart import current_app, jsonify, request
+
+from app.pagination import cursor_serializer, read_page, split_page
+
+
+def page_params(default=None, maximum=None):
+    params, error = read_page(
+        request.args,
+        cursor_serializer(current_app),
+        default or current_app.config["PAGE_SIZE_DEFAULT"],
+        maximum or current_app.config["PAGE_SIZE_MAX"],
+    )
+    if error:
+        message, status = error
+        return None, (jsonify({"error": message}), status)
+    return params, None
+
+
+def next_cursor(items, limit, position_of):
+    return split_page(items, limit, position_of, cursor_serializer(current_app))
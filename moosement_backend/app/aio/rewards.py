@@ -0,0 +1,116 @@
+# rewards.py (async tier)
+import asyncio
+
+from quart import Blueprint, jsonify, request
+
+from logs import logger
+from models.leaderboards import note_points_changed
+from models.rewards import reward_catalog, redeem_reward_async
+from models.rewards import USER_NOT_FOUND, ALREADY_REDEEMED, NOT_ENOUGH_POINTS, SOLD_OUT
+from models.users import UserRewards
+from app.aio.conditional import catalog_response
+from app.aio.pagination import page_params, next_cursor
+from app.aio.session import require_user
+
+rewards_bp = Blueprint("rewards_bp", __name__)
+
+
+@rewards_bp.route("/rewards", methods=["GET"])
+async def get_rewards():
+    try:
+        params, error = page_params()
+        if error:
+            return error
+        limit, position = params
+        after = position.get("id") if position else None
+
+        snapshot = await reward_catalog.snapshot_async()
+        rewards, cursor = next_cursor(
+            snapshot.page_after(after, limit + 1), limit, lambda reward: {"id": str(reward["_id"])}
+        )
+
+        def build_payload(_):
+            return {
+                "rewards": [
+                    {key: value for key, value in reward.items() if key != "_id"}
+                    for reward in rewards
+                ],
+                "next_cursor": cursor
+            }
+        return await catalog_response(snapshot, build_payload, variant=(after, limit))
+    except Exception as e:
+        logger.error("rewards_list_failed", error=str(e))
+        return jsonify({"error": str(e), "rewards": []}), 500
+
+
+@rewards_bp.route("/redeem", methods=["POST"])
+async def redeem_reward():
+    try:
+        data = await request.get_json()
+        reward_name = data.get("reward_name")
+
+        if not reward_name:
+            return jsonify({"error": "User ID and Reward Name are required"}), 400
+
+        (request_user, error), reward = await asyncio.gather(
+            require_user(), reward_catalog.get_async(reward_name)
+        )
+        if error:
+            return error
+        if not reward:
+            return jsonify({"error": "Reward not found"}), 404
+
+        outcome, remaining_points = await redeem_reward_async(request_user.id, reward)
+
+        if outcome == USER_NOT_FOUND:
+            return jsonify({"error": "User not found"}), 404
+        if outcome == ALREADY_REDEEMED:
+            return jsonify({"error": "Reward already redeemed"}), 400
+        if outcome == NOT_ENOUGH_POINTS:
+            return jsonify({"error": "Not enough points to redeem this reward"}), 400
+        if outcome == SOLD_OUT:
+            return jsonify({"error": "Reward is out of stock"}), 409
+        note_points_changed()
+        logger.info(
+            "reward_redeemed", user_id=str(request_user.id), reward=reward_name, remaining_points=remaining_points
+        )
+
+        return jsonify({
+            "message": f"Successfully redeemed {reward_name}",
+            "remaining_points": remaining_points
+        }), 200
+    except Exception as e:
+        logger.error("redeem_failed", error=str(e))
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+@rewards_bp.route("/user_rewards", methods=["GET"])
+async def get_user_rewards():
+    try:
+        request_user, error = await require_user()
+        if error:
+            return error
+
+        params, error = page_params()
+        if error:
+            return error
+        limit, position = params
+        offset = int(position.get("o", 0)) if position else 0
+
+        user = await request_user.load(UserRewards, slices={"redeemed_rewards": [offset, limit + 1]})
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        redeemed_rewards = user.redeemed_rewards
+        if not isinstance(redeemed_rewards, list):
+            redeemed_rewards = []
+        redeemed_rewards, cursor = next_cursor(redeemed_rewards, limit, lambda _: {"o": offset + limit})
+
+        return jsonify({
+            "user_id": str(request_user.id),
+            "redeemed_rewards": redeemed_rewards,
+            "next_cursor": cursor
+        }), 200
+    except Exception as e:
+        logger.error("user_rewards_failed", error=str(e))
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -0,0 +1,60 @@
+# session.py (async tier)
+from quart import current_app, g, jsonify, request
+
+from app.session import RequestUser, resolve_user, sign_token, token_from_header
+from models import db
+from models.users import UserMembership
+
+
+class AsyncRequestUser(RequestUser):
+    """
+    RequestUser whose database reads are awaited on the async client.
+    """
+
+    __slots__ = ()
+
+    async def load(self, record, slices=None):
+        key = (record, repr(sorted(slices.items())) if slices else None)
+        if key not in self._records:
+            self._records[key] = await record.find_one_async(
+                db.get_async_collection(db.USERS), {"_id": self.id}, slices=slices
+            )
+        return self._records[key]
+
+    async def membership(self):
+        return await self.load(UserMembership)
+
+
+def issue_token(user_id, team_id=None, company_id=None):
+    return sign_token(current_app.extensions["session_serializer"], user_id, team_id, company_id)
+
+
+async def _user_id_from_request(field):
+    user_id = request.args.get(field)
+    if user_id is None:
+        data = await request.get_json(silent=True)
+        if isinstance(data, dict):
+            user_id = data.get(field)
+    return user_id
+
+
+async def require_user(field="user_id"):
+    """
+    require_user() for the async tier; same rules as app.session.
+    """
+    if "request_user" in g:
+        return g.request_user, None
+
+    user, error = resolve_user(
+        token_from_header(request.headers),
+        await _user_id_from_request(field),
+        current_app.extensions["session_serializer"],
+        current_app.config["SESSION_TOKEN_MAX_AGE_SECONDS"],
+        user_class=AsyncRequestUser,
+    )
+    if error:
+        message, status = error
+        return None, (jsonify({"error": message}), status)
+
+    g.request_user = user
+    return user, None
@@ -0,0 +1,67 @@
+# teams.py (async tier)
+from quart import Blueprint, jsonify, request
+
+from models import db
+from models.teams import get_top_teams_async, get_team_rank_async
+from app.aio.pagination import page_params, next_cursor
+from app.teams import LEADERBOARD_DEFAULT_LIMIT, LEADERBOARD_MAX_LIMIT, LEADERBOARD_MAX_NEIGHBOURS
+
+teams_bp = Blueprint("teams_bp", __name__)
+
+
+@teams_bp.route("/points", methods=["GET"])
+async def get_team_points():
+    data = await request.get_json()
+    if "team_id" not in data:
+        return jsonify({"error": "Missing field: team_id"}), 400
+
+    team_id = data["team_id"]
+    team = await db.get_async_collection(db.TEAMS).find_one(
+        {"team_id": team_id}, {"_id": 0, "total_team_points": 1}
+    )
+    if not team:
+        return jsonify({"error": "Invalid team"}), 400
+
+    return jsonify({
+        "team_id": team_id,
+        "team_total_points": team["total_team_points"]
+    }), 200
+
+
+@teams_bp.route("/new_leaderboard", methods=["GET"])
+async def get_leaderboard():
+    params, error = page_params(LEADERBOARD_DEFAULT_LIMIT, LEADERBOARD_MAX_LIMIT)
+    if error:
+        return error
+    limit, position = params
+    after = None
+    if position:
+        after = {
+            "total_team_points": position.get("p"),
+            "team_id": position.get("t"),
+            "team_standing": position.get("s", 0)
+        }
+
+    leaderboard, cursor = next_cursor(
+        await get_top_teams_async(limit + 1, after), limit,
+        lambda team: {"p": team["total_team_points"], "t": team["team_id"], "s": team["team_standing"]}
+    )
+    return jsonify({"leaderboard": leaderboard, "next_cursor": cursor})
+
+
+@teams_bp.route("/rank", methods=["GET"])
+async def get_team_standing():
+    team_id = request.args.get("team_id")
+    if not team_id:
+        return jsonify({"error": "Missing parameter: team_id"}), 400
+
+    try:
+        neighbours = int(request.args.get("neighbours", 0))
+    except ValueError:
+        return jsonify({"error": "neighbours must be an integer"}), 400
+    neighbours = max(0, min(neighbours, LEADERBOARD_MAX_NEIGHBOURS))
+
+    rank = await get_team_rank_async(team_id, neighbours)
+    if not rank:
+        return jsonify({"error": "Invalid team"}), 404
+    return jsonify(rank), 200
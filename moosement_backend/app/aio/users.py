@@ -0,0 +1,149 @@
+# users.py (async tier)
+from datetime import datetime
+
+from quart import Blueprint, jsonify, request
+
+from logs import logger
+from models import db
+from models.users import UserPoints, UserCredentials, current_streak
+from app.passwords import hash_password_async, verify_password_async, needs_rehash, HashingBusy
+from app.aio.pagination import page_params, next_cursor
+from app.aio.session import issue_token, require_user
+
+users_bp = Blueprint("users_bp", __name__)
+
+
+def _hashing_busy():
+    response = jsonify({"error": "Server is busy, please try again"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+@users_bp.route("/register", methods=["POST"])
+async def register():
+    data = await request.get_json()
+
+    for field in ["name", "email", "password"]:
+        if field not in data:
+            return jsonify({"error": f"Missing field: {field}"}), 400
+
+    users_collection = db.get_async_collection(db.USERS)
+    if await users_collection.find_one({"email": data["email"]}, {"_id": 1}):
+        return jsonify({"error": "User with this email already exists"}), 409
+
+    try:
+        hashed_password = await hash_password_async(data["password"])
+    except HashingBusy:
+        return _hashing_busy()
+
+    now = datetime.utcnow().isoformat()
+    new_user = {
+        "name": data["name"],
+        "email": data["email"],
+        "password": hashed_password,
+        "points": 0,
+        "joined_date": data.get("joined_date") or now,
+        "company_id": data.get("company_id"),
+        "department": data.get("department"),
+        "team_id": None,
+        "total_points": 0,
+        "streaks": 0,
+        "role": "employee",
+        "redeemed_rewards": [],
+        "team_rank": None,
+        "user_avatar": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    insert_result = await users_collection.insert_one(new_user)
+    return jsonify({"message": "User registered successfully", "user_id": str(insert_result.inserted_id)}), 201
+
+
+@users_bp.route("/login", methods=["POST"])
+async def login():
+    data = await request.get_json()
+
+    for field in ["email", "password"]:
+        if field not in data:
+            return jsonify({"error": f"Missing field: {field}"}), 400
+    password = data["password"]
+
+    users_collection = db.get_async_collection(db.USERS)
+    user = await UserCredentials.find_one_async(users_collection, {"email": data["email"]})
+    if not user:
+        return jsonify({"error": "Invalid email"}), 400
+    if not user.password:
+        return jsonify({"error": "Account has not been activated"}), 403
+
+    try:
+        if not await verify_password_async(user.password, password):
+            return jsonify({"error": "Invalid password"}), 400
+    except HashingBusy:
+        return _hashing_busy()
+
+    if needs_rehash(user.password):
+        try:
+            await users_collection.update_one(
+                {"_id": user._id, "password": user.password},
+                {"$set": {"password": await hash_password_async(password)}}
+            )
+        except HashingBusy:
+            pass  # Upgrade on a later login instead
+
+    return jsonify({
+        "message": "User logged in successfully",
+        "user_id": str(user._id),
+        "token": issue_token(user._id, user.team_id, user.company_id)
+    }), 200
+
+
+@users_bp.route("/points", methods=["GET"])
+async def get_user_points():
+    request_user, error = await require_user()
+    if error:
+        response, status = error
+        return jsonify({
+            "error": (await response.get_json())["error"],
+            "total_points": 0,
+            "redeemed_rewards": []
+        }), status
+
+    params, error = page_params()
+    if error:
+        return error
+    limit, position = params
+    offset = int(position.get("o", 0)) if position else 0
+
+    try:
+        user = await request_user.load(UserPoints, slices={"redeemed_rewards": [offset, limit + 1]})
+        if not user:
+            return jsonify({
+                "error": "User not found",
+                "total_points": 0,
+                "redeemed_rewards": []
+            }), 404
+
+        redeemed_rewards = user.redeemed_rewards
+        if not isinstance(redeemed_rewards, list):
+            redeemed_rewards = []
+        for reward in redeemed_rewards:
+            if isinstance(reward, dict):
+                reward.setdefault("reward_name", "Unknown Reward")
+                reward.setdefault("points_spent", 0)
+        redeemed_rewards, cursor = next_cursor(redeemed_rewards, limit, lambda _: {"o": offset + limit})
+
+        return jsonify({
+            "user_id": str(request_user.id),
+            "total_points": user.total_points,
+            "current_streak": current_streak(user.streaks, user.last_active_day),
+            "redeemed_rewards": redeemed_rewards,
+            "next_cursor": cursor
+        }), 200
+    except Exception as e:
+        logger.error("user_points_failed", user_id=str(request_user.id), error=str(e))
+        return jsonify({
+            "error": f"An error occurred: {str(e)}",
+            "user_id": str(request_user.id),
+            "total_points": 0,
+            "redeemed_rewards": []
+        }), 500
@@ -0,0 +1,5 @@
+# Async serving mode, alongside the WSGI app in app.py. Run from moosement_backend/:
+#   hypercorn app.asgi:app --workers 4 --bind 0.0.0.0:5000
+from app.aio import create_async_app
+
+app = create_async_app()
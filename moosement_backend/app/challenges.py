@@ -1,54 +1,69 @@
 # challenges.py
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
 from datetime import datetime
 from bson import ObjectId
-from config import MONGO_URI
+from logs import logger
+from models import db
+from models.teams import add_team_points
+from models.users import award_challenge_points, revoke_challenge_points
+from models.challenges import get_challenge, challenge_catalog
+from models.assignments import todays_assignment, resolve_assignment
+from models.leaderboards import note_points_changed
+from app.conditional import catalog_response
+from app.session import require_user
+from app.pagination import page_params, next_cursor
+from models.completions import (
+    record_completion, get_completion_history,
+    HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT,
+)
 
 # Initialize blueprint
 challenges_bp = Blueprint('challenges_bp', __name__)
 
-# Database connection
-client = MongoClient(MONGO_URI)
-db = client["moosement"]
-users_collection = db["user_data"]
-
-challenges_collection = db["challenge_data"]
-teams_collection = db["team_data"]
-
-def update_user_streak(user_id):
-    """Update user's streak based on challenge completion history"""
-    user = users_collection.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        return
-    
-    # Get the last completion timestamp
-    completed_challenges = user.get("completed_challenges", [])
-    if not completed_challenges:
-        return 1
-    
-    last_completion = completed_challenges[-1].get("completed_at")
-    if not last_completion:
-        return 1
-    
-    # Convert ISO string to datetime
-    last_completion_date = datetime.fromisoformat(last_completion)
-    current_date = datetime.utcnow()
-    
-    # Check if the last completion was yesterday
-    time_diff = current_date.date() - last_completion_date.date()
-    if time_diff.days == 1:
-        return user.get("streaks", 0) + 1
-    elif time_diff.days == 0:  # Same day completion
-        return user.get("streaks", 0)
-    else:  # Streak broken
-        return 1
+# Collections from the shared connection pool
+users_collection = db.collection(db.USERS)
+challenges_collection = db.collection(db.CHALLENGES)
+teams_collection = db.collection(db.TEAMS)
 
 # Get all challenges
 @challenges_bp.route('/get_challenges', methods=['GET'])
 def get_challenges():
-    challenges_list = list(challenges_collection.find({}, {"_id": 0}))
-    return jsonify({"challenges": challenges_list})
+    params, error = page_params()
+    if error:
+        return error
+    limit, position = params
+    after = position.get("id") if position else None
+
+    # Served from the in-memory catalog; unchanged pages get a 304
+    snapshot = challenge_catalog.snapshot()
+    challenges, cursor = next_cursor(
+        snapshot.page_after(after, limit + 1), limit, lambda challenge: {"id": str(challenge["_id"])}
+    )
+
+    def build_payload(_):
+        return {
+            "challenges": [
+                {key: value for key, value in challenge.items() if key != "_id"}
+                for challenge in challenges
+            ],
+            "next_cursor": cursor
+        }
+    return catalog_response(snapshot, build_payload, variant=(after, limit))
+
+# Get the signed-in user's challenges for today, picked by the nightly batch
+@challenges_bp.route('/today', methods=['GET'])
+def get_todays_challenges():
+    request_user, error = require_user()
+    if error:
+        return error
+
+    assignment = todays_assignment(request_user.id)
+    if assignment is None:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({
+        "day": assignment["day"],
+        "challenges": resolve_assignment(assignment, challenge_catalog.snapshot())
+    }), 200
 
 # Complete a challenge
 @challenges_bp.route('/complete', methods=['POST'])
@@ -57,85 +72,88 @@ def complete_challenge():
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ["user_id", "challenge_id"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing field: {field}"}), 400
+        if "challenge_id" not in data:
+            return jsonify({"error": "Missing field: challenge_id"}), 400
+        
+        request_user, error = require_user()
+        if error:
+            return error
         
-        user_id = data["user_id"]
+        user_object_id = request_user.id
         challenge_id = data["challenge_id"]
         
         # Validate ObjectIds
-        try:
-            user_object_id = ObjectId(user_id)
-            challenge_object_id = ObjectId(challenge_id)
-        except:
+        if not ObjectId.is_valid(challenge_id):
             return jsonify({"error": "Invalid ID format"}), 400
+        challenge_id = str(challenge_id)
         
-        # Get user and challenge data
-        user = users_collection.find_one({"_id": user_object_id})
-        challenge = challenges_collection.find_one({"_id": challenge_object_id})
-        
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+        # Challenge metadata comes from the in-memory catalog
+        challenge = get_challenge(challenge_id)
         if not challenge:
             return jsonify({"error": "Challenge not found"}), 404
-            
-        # Check if challenge was already completed today
-        today = datetime.utcnow().date().isoformat()
-        completed_challenges = user.get("completed_challenges", [])
-        
-        for completed in completed_challenges:
-            if (completed.get("challenge_id") == str(challenge_id) and 
-                completed.get("completed_at", "").startswith(today)):
-                return jsonify({"error": "Challenge already completed today"}), 400
         
-        # Calculate points
-        base_points = challenge.get("points", 0)
-        streak = update_user_streak(user_id)
-        streak_multiplier = min(streak * 0.1, 0.5)  # Cap streak bonus at 50%
-        total_points = int(base_points * (1 + streak_multiplier))
-        
-        # Update user's completed challenges and points
-        completion_record = {
-            "challenge_id": str(challenge_id),
-            "challenge_name": challenge.get("name"),
-            "points_earned": total_points,
-            "completed_at": datetime.utcnow().isoformat(),
-            "streak": streak
-        }
+        # Award points and update the streak in one conditional update
+        user = award_challenge_points(user_object_id, challenge_id, challenge.get("points", 0))
+        if not user:
+            if not users_collection.count_documents({"_id": user_object_id}, limit=1):
+                return jsonify({"error": "User not found"}), 404
+            return jsonify({"error": "Challenge already completed today"}), 400
         
-        users_collection.update_one(
-            {"_id": user_object_id},
-            {
-                "$push": {"completed_challenges": completion_record},
-                "$inc": {"total_points": total_points, "points": total_points},
-                "$set": {"streaks": streak, "updated_at": datetime.utcnow().isoformat()}
-            }
-        )
+        total_points = user["last_points_earned"]
+        streak = user["streaks"]
+        note_points_changed()
         
-        # Update team points if user is part of a team
+        # Record the completion and update team points together
+        writes = [lambda: record_completion(
+            user_object_id, challenge_id, challenge.get("name"),
+            total_points, streak, datetime.utcnow().isoformat()
+        )]
         team_id = user.get("team_id")
         if team_id:
-            try:
-                teams_collection.update_one(
-                    {"_id": ObjectId(team_id)},
-                    {
-                        "$inc": {"total_team_points": total_points},
-                        "$set": {"updated_at": datetime.utcnow().isoformat()}
-                    }
-                )
-            except Exception as e:
-                # Log team update error but don't fail the request
-                print(f"Error updating team points: {str(e)}")
+            writes.append(lambda: add_team_points(team_id, total_points))
+        
+        results = db.run_parallel(*writes)
+        for result in results:
+            if isinstance(result, Exception):
+                # Log write error but don't fail the request
+                logger.error("completion_write_failed", challenge_id=challenge_id, error=str(result))
+        
+        # The completion was already recorded today: undo the points
+        if results[0] is False:
+            revoke_challenge_points(user_object_id, challenge_id, user)
+            if team_id and results[-1] is True:
+                add_team_points(team_id, -total_points)
+            return jsonify({"error": "Challenge already completed today"}), 400
         
         return jsonify({
             "message": "Challenge completed successfully",
             "points_earned": total_points,
             "current_streak": streak,
-            "total_points": user.get("total_points", 0) + total_points
+            "total_points": user.get("total_points", 0)
         }), 200
         
     except Exception as e:
-        # Log the error
+        logger.error("complete_challenge_failed", error=str(e))
         return jsonify({"error": "An error occurred while completing the challenge"}), 500
+
+
+# Get a page of a user's completed challenges, newest first
+@challenges_bp.route('/history', methods=['GET'])
+def get_history():
+    request_user, error = require_user()
+    if error:
+        return error
+    user_id = str(request_user.id)
+
+    params, error = page_params(HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT)
+    if error:
+        return error
+    limit, position = params
+    before = position.get("at") if position else None
+
+    history, cursor = next_cursor(
+        get_completion_history(user_id, limit + 1, before), limit,
+        lambda completion: {"at": completion["completed_at"]}
+    )
+
+    return jsonify({"completed_challenges": history, "next_cursor": cursor}), 200
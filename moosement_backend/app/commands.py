@@ -0,0 +1,200 @@
+# commands.py
+import csv
+import datetime
+import os
+import sys
+
+import click
+from bson import ObjectId
+
+from app.imports import FORMATS, company_teams_query, import_employees, registered_query
+from models import db
+from models.assignments import assign_daily_challenges, assignment_id
+from models.challenges import seed_challenges
+from models.completions import HISTORY_SORT, completed_days_query, history_query
+from models.exercises import ROLLUP_SORT, daily_activity_query
+from models.indexes import ensure_indexes
+from models.invites import claimed_query, newcomers_query, usable_invites_query
+from models.leaderboards import PAGE_SORT, SNAPSHOT_ID, build_snapshots, company_scope, page_query
+from models.rewards import seed_rewards
+from models.teams import LEADERBOARD_SORT, REVERSE_SORT, ahead_of_query, behind_query, team_filter
+from models.users import broken_streaks_query, reset_broken_streaks, users_query
+
+# One sample of each query the endpoints run, with placeholder values, built
+# with the same query builders the models use so the audit cannot drift:
+# (endpoint, collection, filter, sort)
+_AUDIT_ID = ObjectId()
+_AUDIT_DAY = datetime.date(2025, 1, 1)
+_AUDIT_TEAM = {"total_team_points": 100, "team_id": "audit"}
+QUERY_SHAPES = [
+    ("users_bp.register", db.USERS, {"email": "audit@example.com"}, None),
+    ("users_bp.login", db.USERS, {"email": "audit@example.com"}, None),
+    ("users_bp.activate", db.USERS, {"email": "audit@example.com", "activation_hash": "audit", "password": None}, None),
+    ("users_bp.update_profile", db.USERS, {"email": "audit@example.com", "_id": {"$ne": _AUDIT_ID}}, None),
+    ("users_bp.import_users", db.USERS, registered_query(["audit@example.com"]), None),
+    ("users_bp.import_users", db.TEAMS, company_teams_query("audit", ["audit"]), None),
+    ("users_bp.import_status", db.IMPORT_JOBS, {"_id": _AUDIT_ID, "company_id": "audit"}, None),
+    ("users_bp.get_user_points", db.USERS, {"_id": _AUDIT_ID}, None),
+    ("sync_bp.sync_batch", db.USERS, users_query([_AUDIT_ID, ObjectId()]), None),
+    ("sync_bp.sync_batch", db.COMPLETIONS, completed_days_query([_AUDIT_ID], ["2025-01-01"]), None),
+    ("reset-streaks", db.USERS, broken_streaks_query(_AUDIT_DAY), None),
+    ("challenges_bp.get_todays_challenges", db.DAILY_ASSIGNMENTS,
+     {"_id": assignment_id(_AUDIT_ID, _AUDIT_DAY.isoformat())}, None),
+    ("challenges_bp.get_history", db.COMPLETIONS, history_query(_AUDIT_ID, "2025-01-01T00:00:00"), HISTORY_SORT),
+    ("teams_bp.get_team_points", db.TEAMS, {"team_id": "audit"}, None),
+    ("teams_bp.join_team_route", db.TEAMS, {"team_id": "audit"}, None),
+    ("teams_bp.accept_invite", db.INVITES, usable_invites_query(["audit"]), None),
+    ("teams_bp.accept_bulk_invites", db.INVITES, usable_invites_query(["audit", "audit-2"], "audit"), None),
+    ("teams_bp.accept_bulk_invites", db.INVITES, claimed_query("audit"), None),
+    ("teams_bp.accept_bulk_invites", db.USERS, newcomers_query([_AUDIT_ID], "audit"), None),
+    ("teams_bp.get_leaderboard", db.TEAMS, {}, LEADERBOARD_SORT),
+    ("teams_bp.get_leaderboard", db.TEAMS, behind_query(_AUDIT_TEAM), LEADERBOARD_SORT),
+    ("teams_bp.get_team_standing", db.TEAMS, team_filter(str(_AUDIT_ID)), None),
+    ("teams_bp.get_team_standing", db.TEAMS, ahead_of_query(_AUDIT_TEAM), REVERSE_SORT),
+    ("leaderboards_bp.get_individual_leaderboard", db.LEADERBOARD_SNAPSHOTS, {"_id": SNAPSHOT_ID}, None),
+    ("leaderboards_bp.get_individual_leaderboard", db.LEADERBOARD_ENTRIES,
+     page_query(_AUDIT_ID, company_scope("audit"), 0), PAGE_SORT),
+    ("exercises_bp.get_user_activity", db.DAILY_ACTIVITY, daily_activity_query("user", "audit", 7), ROLLUP_SORT),
+    ("exercises_bp.get_team_activity", db.DAILY_ACTIVITY, daily_activity_query("team", "audit", 7), ROLLUP_SORT),
+]
+
+
+def _stages(plan):
+    """
+    Yields every stage name in an explain plan tree.
+    """
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+def register_commands(app):
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_command():
+        """Create any missing collections and indexes."""
+        failures = ensure_indexes()
+        for collection, error in failures:
+            click.echo(f"FAILED {collection}: {error}", err=True)
+        if failures:
+            sys.exit(1)
+        click.echo("All indexes are in place.")
+
+    @app.cli.command("seed-rewards")
+    def seed_rewards_command():
+        """Add any missing default rewards."""
+        click.echo(f"Inserted {seed_rewards()} rewards.")
+
+    @app.cli.command("seed-challenges")
+    def seed_challenges_command():
+        """Add any missing default challenges."""
+        click.echo(f"Inserted {seed_challenges()} challenges.")
+
+    @app.cli.command("seed")
+    def seed_command():
+        """Create indexes and add the default rewards and challenges."""
+        failures = ensure_indexes()
+        for collection, error in failures:
+            click.echo(f"FAILED {collection}: {error}", err=True)
+        click.echo(f"Inserted {seed_rewards()} rewards and {seed_challenges()} challenges.")
+        if failures:
+            sys.exit(1)
+
+    @app.cli.command("set-points")
+    @click.argument("email")
+    @click.argument("points", type=int)
+    def set_points_command(email, points):
+        """Set a user's points balance (e.g. a demo account)."""
+        result = db.get_collection(db.USERS).update_one(
+            {"email": email}, {"$set": {"total_points": points, "points": points}}
+        )
+        if not result.matched_count:
+            click.echo(f"User with email {email} not found", err=True)
+            sys.exit(1)
+        click.echo(f"Set points for {email} to {points}.")
+
+    @app.cli.command("set-role")
+    @click.argument("email")
+    @click.argument("role", type=click.Choice(["employee", "admin"]))
+    def set_role_command(email, role):
+        """Make a user a company admin (who can import employees) or an employee."""
+        result = db.get_collection(db.USERS).update_one({"email": email}, {"$set": {"role": role}})
+        if not result.matched_count:
+            click.echo(f"User with email {email} not found", err=True)
+            sys.exit(1)
+        click.echo(f"Set role for {email} to {role}.")
+
+    @app.cli.command("import-employees")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--company-id", required=True, help="Company the employees belong to.")
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), help="File format (default: from the extension).")
+    @click.option("--chunk-size", type=int, help="Rows per batch (default IMPORT_CHUNK_SIZE).")
+    def import_employees_command(path, company_id, fmt, chunk_size):
+        """
+        Create the employees in a CSV or JSON Lines file.
+
+        Progress and row errors go to stderr. Activation codes of accounts
+        imported without a password are written to stdout as CSV.
+        """
+        fmt = fmt or ("jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson") else "csv")
+
+        def progress(report):
+            click.echo(
+                f"{report['rows']} rows: {report['created']} created, "
+                f"{report['duplicates']} duplicates, {report['failed']} failed", err=True
+            )
+
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            try:
+                report = import_employees(stream, fmt, company_id, chunk_size, progress)
+            except (ValueError, RuntimeError) as e:
+                click.echo(str(e), err=True)
+                sys.exit(1)
+        for error in report["errors"]:
+            click.echo(f"line {error['line']}: {error['email'] or '-'}: {error['error']}", err=True)
+        if report["activations"]:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(["email", "code"])
+            writer.writerows((activation["email"], activation["code"]) for activation in report["activations"])
+
+    @app.cli.command("build-leaderboards")
+    def build_leaderboards_command():
+        """Rebuild the individual leaderboard snapshots (run from cron)."""
+        snapshot = build_snapshots()
+        click.echo(f"Built leaderboard snapshot {snapshot['snapshot_id']} at {snapshot['built_at']}.")
+
+    @app.cli.command("reset-streaks")
+    def reset_streaks_command():
+        """Reset streaks broken since the last run (run nightly from cron)."""
+        reset = reset_broken_streaks()
+        click.echo(f"Reset {reset} broken streaks.")
+
+    @app.cli.command("assign-challenges")
+    @click.option("--day", type=click.DateTime(formats=["%Y-%m-%d"]), help="UTC day to assign (default today).")
+    def assign_challenges_command(day):
+        """Pick every user's challenges for the day (run nightly from cron)."""
+        assigned = assign_daily_challenges(day.date() if day else None)
+        click.echo(f"Assigned challenges to {assigned} users.")
+
+    @app.cli.command("audit-queries")
+    def audit_queries_command():
+        """Explain each endpoint's queries and flag collection scans."""
+        flagged = 0
+        for endpoint, collection_name, query, sort in QUERY_SHAPES:
+            cursor = db.get_collection(collection_name).find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = cursor.limit(1).explain().get("queryPlanner", {}).get("winningPlan", {})
+            stages = set(_stages(plan))
+            if "COLLSCAN" in stages:
+                flagged += 1
+                click.echo(f"COLLSCAN  {endpoint:36} {collection_name} {query}")
+            else:
+                click.echo(f"ok        {endpoint:36} {collection_name} ({', '.join(sorted(stages))})")
+        if flagged:
+            click.echo(f"{flagged} queries scan a whole collection.", err=True)
+            sys.exit(1)
@@ -0,0 +1,120 @@
+# compression.py
+import gzip
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+
+def choose_encoding(accept_encodings):
+    """
+    Picks br when the client takes it and brotli is installed, else gzip.
+    Takes request.accept_encodings. Returns None if the client accepts neither.
+    """
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def encode(body, encoding, gzip_level, brotli_quality):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def should_compress(response, min_bytes):
+    """
+    Whether a response is worth compressing: a complete, uncompressed body of
+    a text type that is at least min_bytes long.
+    """
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    length = response.content_length
+    return length is not None and length >= min_bytes
+
+
+def mark_compressed(response, encoding, body):
+    """
+    Swaps in the compressed body and sets the headers that go with it.
+    """
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    # The bytes differ from the identity body, so a strong ETag no longer
+    # names them; a weak one still matches If-None-Match
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return body
+
+
+def compress_snapshot(response, snapshot, key, body, accept_encodings, config):
+    """
+    Compresses a cached catalog body once per snapshot and encoding, instead
+    of on every request. Shared by the WSGI and async tiers.
+    """
+    min_bytes = config["COMPRESS_MIN_BYTES"]
+    if not min_bytes or len(body) < min_bytes:
+        return
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encodings)
+    if not encoding:
+        return
+    compressed = snapshot.rendered.get((key, encoding))
+    if compressed is None:
+        compressed = encode(body.encode("utf-8"), encoding, config["COMPRESS_GZIP_LEVEL"], config["COMPRESS_BROTLI_QUALITY"])
+        snapshot.rendered[(key, encoding)] = compressed
+    response.set_data(mark_compressed(response, encoding, compressed))
+
+
+def init_app(app):
+    """
+    Compresses large Flask responses with br or gzip, as the client accepts.
+    """
+    from flask import request
+
+    settings = (app.config["COMPRESS_GZIP_LEVEL"], app.config["COMPRESS_BROTLI_QUALITY"])
+    min_bytes = app.config["COMPRESS_MIN_BYTES"]
+
+    @app.after_request
+    def _compress(response):
+        if not min_bytes or not should_compress(response, min_bytes):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding:
+            response.set_data(mark_compressed(response, encoding, encode(response.get_data(), encoding, *settings)))
+        return response
+
+
+def init_async_app(app):
+    """
+    init_app() for the Quart app in app/aio.
+    """
+    from quart import request
+
+    settings = (app.config["COMPRESS_GZIP_LEVEL"], app.config["COMPRESS_BROTLI_QUALITY"])
+    min_bytes = app.config["COMPRESS_MIN_BYTES"]
+
+    @app.after_request
+    async def _compress(response):
+        if not min_bytes or response.status_code in (204, 206, 304) or response.status_code < 200:
+            return response
+        if "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        body = await response.get_data()
+        if len(body) < min_bytes:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding:
+            response.set_data(mark_compressed(response, encoding, encode(body, encoding, *settings)))
+        return response
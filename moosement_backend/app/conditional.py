@@ -0,0 +1,40 @@
+# conditional.py
+import hashlib
+
+from flask import current_app, request
+
+from app.compression import compress_snapshot
+
+
+def render_snapshot(snapshot, key, build_payload, dumps):
+    """
+    Returns (body, etag) for a snapshot, serializing it the first time a key
+    is asked for. Shared by the WSGI and async tiers.
+    """
+    rendered = snapshot.rendered.get(key)
+    if rendered is None:
+        body = dumps(build_payload(snapshot.documents))
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        rendered = snapshot.rendered[key] = (body, etag)
+    return rendered
+
+
+def catalog_response(snapshot, build_payload, variant=None):
+    """
+    Returns a JSON response for a cached catalog snapshot.
+
+    The body is built and serialized once per snapshot, endpoint and variant
+    (e.g. the page being requested), and compressed once per encoding. The
+    ETag is a hash of the body, so every worker hands out the same tag for the
+    same data. A request whose If-None-Match matches gets 304 Not Modified.
+    """
+    key = (request.endpoint, variant)
+    body, etag = render_snapshot(snapshot, key, build_payload, current_app.json.dumps)
+
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Clients must revalidate, which is cheap
+    response = response.make_conditional(request)
+    if response.status_code == 200:
+        compress_snapshot(response, snapshot, key, body, request.accept_encodings, current_app.config)
+    return response
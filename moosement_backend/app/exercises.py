@@ -0,0 +1,127 @@
+# exercises.py
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from models import db
+from models.exercises import (
+    calculate_points, build_event, record_events, get_daily_activity, is_exercise_type, HISTORY_MAX_DAYS,
+)
+from models.teams import add_team_points
+from models.leaderboards import note_points_changed
+from app.session import require_user
+from logs import logger
+
+# Initialize blueprint
+exercises_bp = Blueprint("exercises_bp", __name__)
+
+users_collection = db.collection(db.USERS)
+
+
+# Log an exercise and award points for it
+@exercises_bp.route('/log', methods=['POST'])
+def log_exercise():
+    try:
+        data = request.get_json()
+        exercise_type = data.get("exercise_type")
+        value = data.get("value")  # distance in miles, laps, or time in minutes
+
+        request_user, error = require_user()
+        if error:
+            return error
+        user_id = request_user.id
+
+        if not all([exercise_type, value]):
+            return jsonify({"error": "Missing required fields"}), 400
+        if not is_exercise_type(exercise_type):
+            return jsonify({"error": "Unknown exercise_type"}), 400
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            return jsonify({"error": "value must be a positive number"}), 400
+
+        points_earned = calculate_points(exercise_type, value)
+        now = datetime.utcnow()
+
+        # Award the points and get the user's team in one round trip
+        user = users_collection.find_one_and_update(
+            {"_id": user_id},
+            {
+                "$inc": {"total_points": points_earned, "points": points_earned},
+                "$set": {"updated_at": now.isoformat()}
+            },
+            projection={"_id": 0, "team_id": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        note_points_changed()
+
+        # Store the event, roll it up and update team points together
+        team_id = user.get("team_id")
+        event = build_event(user_id, team_id, exercise_type, value, points_earned, now)
+        writes = [lambda: record_events([event])]
+        if team_id:
+            writes.append(lambda: add_team_points(team_id, points_earned))
+        for result in db.run_parallel(*writes):
+            if isinstance(result, Exception):
+                # Log write error but don't fail the request
+                logger.error("exercise_write_failed", user_id=str(user_id), error=str(result))
+
+        return jsonify({
+            "message": "Exercise logged successfully",
+            "exercise": exercise_type,
+            "value": value,
+            "points_earned": points_earned
+        })
+    except Exception as e:
+        logger.error("log_exercise_failed", error=str(e))
+        return jsonify({"error": "An error occurred while logging the exercise"}), 500
+
+
+def _activity_response(scope, owner_id):
+    """
+    Returns the daily rollups for a user or team plus the weekly total.
+    """
+    try:
+        days = int(request.args.get("days", 7))
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    days = max(1, min(days, HISTORY_MAX_DAYS))
+
+    # One read covers both the requested days and the last 7 for the weekly total
+    daily = get_daily_activity(scope, owner_id, max(days, 7))
+    week_start = (datetime.utcnow().date() - timedelta(days=6)).isoformat()
+    week_total = sum(day["points"] for day in daily if day["day"] >= week_start)
+    oldest_day = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+    daily = [day for day in daily if day["day"] >= oldest_day]
+
+    return jsonify({
+        f"{scope}_id": owner_id,
+        "days": daily,
+        "week_total_points": week_total
+    }), 200
+
+
+# Get a user's daily exercise totals
+@exercises_bp.route('/history', methods=['GET'])
+def get_user_activity():
+    request_user, error = require_user()
+    if error:
+        return error
+    return _activity_response("user", str(request_user.id))
+
+
+# Get a team's daily exercise totals
+@exercises_bp.route('/team_history', methods=['GET'])
+def get_team_activity():
+    request_user, error = require_user()
+    if error:
+        return error
+
+    # Only the user's current team (not the token's); team_id may be left out
+    membership = request_user.membership()
+    own_team = membership.team_id if membership else None
+    team_id = request.args.get("team_id") or own_team
+    if not team_id:
+        return jsonify({"error": "User is not on a team"}), 404
+    if team_id != own_team:
+        return jsonify({"error": "Not a member of this team"}), 403
+    return _activity_response("team", team_id)
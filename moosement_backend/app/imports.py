@@ -0,0 +1,312 @@
+# imports.py
+import csv
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import secrets
+import threading
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import config
+from app.passwords import hash_passwords
+from logs import logger
+from models import db
+from models.import_jobs import DONE, FAILED, create_job, update_job
+
+users_collection = db.collection(db.USERS)
+teams_collection = db.collection(db.TEAMS)
+
+# Bulk employee import for onboarding a company. Rows are read from a CSV or
+# JSON Lines stream in chunks, so a file of any size uses a chunk's worth of
+# memory. Per chunk: one query for emails already registered, one parallel
+# batch of password hashes, one unordered insert_many and one bulk write for
+# team members. The unique email index is what finally keeps emails unique.
+#
+# Columns: name, email (required), password, department, team (a team name
+# in the company; missing teams are created). Rows without a password become
+# invite-only accounts that are activated with a one-time code.
+#
+# The CLI imports in the foreground. Over HTTP the body is spooled to a file
+# and imported by a background thread; progress and the report are kept on
+# an import job (models/import_jobs.py) that the admin polls.
+
+FORMATS = ("csv", "jsonl")
+REQUIRED_COLUMNS = ("name", "email")
+DUPLICATE_KEY = 11000
+
+
+def activation_hash(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def read_rows(stream, fmt):
+    """
+    Yields (line number, row) from a CSV or JSON Lines text stream. A line
+    that cannot be parsed is yielded with an error message instead of a dict.
+    Raises ValueError for an unknown format or a CSV header without the
+    required columns.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"CSV header is missing: {', '.join(missing)}")
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, "Invalid JSON"
+                continue
+            yield number, row if isinstance(row, dict) else "Expected a JSON object"
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def _field(row, name):
+    value = row.get(name)
+    return str(value).strip() if value is not None else ""
+
+
+def _new_user(row, company_id, now):
+    """
+    The user document for a row, shaped like the ones /register creates,
+    and the row's plaintext password ("" for invite-only accounts).
+    """
+    name, email = _field(row, "name"), _field(row, "email")
+    if not name or not email:
+        raise ValueError("Missing name or email")
+    if "@" not in email:
+        raise ValueError("Invalid email")
+    user = {
+        "_id": ObjectId(),
+        "name": name,
+        "email": email,
+        "password": None,
+        "points": 0,
+        "joined_date": now,
+        "company_id": company_id,
+        "department": _field(row, "department") or None,
+        "team_id": None,
+        "total_points": 0,
+        "streaks": 0,
+        "role": "employee",
+        "redeemed_rewards": [],
+        "team_rank": None,
+        "user_avatar": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    return user, _field(row, "password")
+
+
+def registered_query(emails):
+    return {"email": {"$in": list(emails)}}
+
+
+def company_teams_query(company_id, names):
+    return {"company_id": company_id, "name": {"$in": list(names)}}
+
+
+def _resolve_teams(names, company_id, team_ids, now):
+    """
+    Fills team_ids (team name -> team_id) for the given names, creating the
+    company's teams that do not exist yet. Teams are upserted by (company_id,
+    name), which the company_team_name index keeps unique, so an import
+    running at the same time or a rerun finds the same teams.
+    """
+    missing = {name for name in names if name not in team_ids}
+    if not missing:
+        return
+    teams_collection.bulk_write([
+        UpdateOne({"company_id": company_id, "name": name}, {"$setOnInsert": {
+            "team_id": str(ObjectId()),
+            "total_team_points": 0,
+            "created_at": now,
+            "updated_at": now,
+            "members": [],
+        }}, upsert=True)
+        for name in sorted(missing)
+    ], ordered=False)
+    for team in teams_collection.find(company_teams_query(company_id, missing), {"team_id": 1, "name": 1}):
+        team_ids.setdefault(team["name"], team.get("team_id") or str(team["_id"]))
+
+
+def _insert_users(users, report):
+    """
+    Inserts users with one unordered insert_many. Returns the indexes of the
+    users that failed; duplicate emails are counted as duplicates.
+    """
+    try:
+        users_collection.insert_many([user for user, _ in users], ordered=False)
+        return {}
+    except BulkWriteError as e:
+        failed = {}
+        for error in e.details.get("writeErrors", []):
+            duplicate = error.get("code") == DUPLICATE_KEY
+            failed[error["index"]] = "Email already registered" if duplicate else error.get("errmsg", "Insert failed")
+            report["duplicates" if duplicate else "failed"] += 1
+        return failed
+
+
+def _import_chunk(rows, company_id, seen, team_ids, report):
+    now = datetime.datetime.utcnow().isoformat()
+    users = []  # (user document, line number)
+    passwords = {}  # index in users -> plaintext
+    teams = {}  # index in users -> team name
+
+    for line, row in rows:
+        report["rows"] += 1
+        if isinstance(row, str):
+            report["failed"] += 1
+            report["errors"].append({"line": line, "email": None, "error": row})
+            continue
+        try:
+            user, password = _new_user(row, company_id, now)
+        except ValueError as e:
+            report["failed"] += 1
+            report["errors"].append({"line": line, "email": _field(row, "email") or None, "error": str(e)})
+            continue
+        if user["email"] in seen:
+            report["duplicates"] += 1
+            report["errors"].append({"line": line, "email": user["email"], "error": "Duplicate email in file"})
+            continue
+        seen.add(user["email"])
+        if password:
+            passwords[len(users)] = password
+        if _field(row, "team"):
+            teams[len(users)] = _field(row, "team")
+        users.append((user, line))
+
+    # Skip rows that are already registered before spending hashes on them
+    registered = {
+        user["email"] for user in users_collection.find(
+            registered_query(user["email"] for user, _ in users), {"email": 1, "_id": 0}
+        )
+    } if users else set()
+    kept = []
+    for index, (user, line) in enumerate(users):
+        if user["email"] in registered:
+            report["duplicates"] += 1
+            report["errors"].append({"line": line, "email": user["email"], "error": "Email already registered"})
+            continue
+        kept.append((index, user, line))
+    if not kept:
+        return
+
+    to_hash = [index for index, _, _ in kept if index in passwords]
+    hashes = dict(zip(to_hash, hash_passwords([passwords[index] for index in to_hash])))
+    _resolve_teams({teams[index] for index, _, _ in kept if index in teams}, company_id, team_ids, now)
+
+    codes = {}
+    for index, user, _ in kept:
+        if index in hashes:
+            user["password"] = hashes[index]
+        else:
+            codes[index] = secrets.token_urlsafe(16)
+            user["activation_hash"] = activation_hash(codes[index])
+        if index in teams:
+            user["team_id"] = team_ids[teams[index]]
+
+    failed = _insert_users([(user, line) for _, user, line in kept], report)
+    members = {}
+    for position, (index, user, line) in enumerate(kept):
+        if position in failed:
+            report["errors"].append({"line": line, "email": user["email"], "error": failed[position]})
+            continue
+        report["created"] += 1
+        if index in codes:
+            report["activations"].append({"email": user["email"], "code": codes[index]})
+        if user["team_id"]:
+            members.setdefault(user["team_id"], []).append(str(user["_id"]))
+    if members:
+        teams_collection.bulk_write([
+            UpdateOne({"team_id": team_id}, {"$addToSet": {"members": {"$each": ids}}, "$set": {"updated_at": now}})
+            for team_id, ids in members.items()
+        ], ordered=False)
+
+
+def _require_email_index():
+    for index in users_collection.index_information().values():
+        if index.get("unique") and [field for field, _ in index["key"]] == ["email"]:
+            return
+    raise RuntimeError("The unique email index is missing; run `flask ensure-indexes` first")
+
+
+def import_employees(stream, fmt, company_id, chunk_size=None, progress=None):
+    """
+    Creates the employees listed in a CSV or JSON Lines text stream as users
+    of `company_id`. Emails already registered or repeated in the file are
+    skipped, so an interrupted import can simply be run again. `progress` is
+    called with the report after each chunk.
+
+    Returns the report: counts of rows, created, duplicates and failed, the
+    per-row errors ({"line", "email", "error"}), and the activation codes of
+    the invite-only accounts created ({"email", "code"}).
+    """
+    _require_email_index()
+    chunk_size = chunk_size or config.IMPORT_CHUNK_SIZE
+    report = {"rows": 0, "created": 0, "duplicates": 0, "failed": 0, "errors": [], "activations": []}
+    seen = set()
+    team_ids = {}
+    rows = read_rows(stream, fmt)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return report
+        _import_chunk(chunk, company_id, seen, team_ids, report)
+        if progress:
+            progress(report)
+
+
+def _counts(report):
+    return {key: report[key] for key in ("rows", "created", "duplicates", "failed")}
+
+
+def _job_report(report):
+    """
+    The report as stored on a job, with the per-row lists capped so a huge
+    file cannot outgrow a document. The CLI prints the full lists.
+    """
+    limit = config.IMPORT_JOB_REPORT_MAX_ITEMS
+    stored = dict(report, errors=report["errors"][:limit], activations=report["activations"][:limit])
+    stored["truncated"] = len(report["errors"]) > limit or len(report["activations"]) > limit
+    return stored
+
+
+def _run_job(job_id, path, fmt, company_id):
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            report = import_employees(
+                stream, fmt, company_id, progress=lambda report: update_job(job_id, progress=_counts(report))
+            )
+    except Exception as e:
+        logger.error("employee_import_failed", job_id=str(job_id), company_id=company_id, error=str(e))
+        update_job(job_id, status=FAILED, error=str(e))
+        return
+    finally:
+        os.remove(path)
+    update_job(job_id, status=DONE, progress=_counts(report), report=_job_report(report))
+    logger.info("employees_imported", job_id=str(job_id), company_id=company_id, **_counts(report))
+
+
+def start_import_job(path, fmt, company_id, created_by):
+    """
+    Imports the employees in the file at `path` in a background thread and
+    deletes the file afterwards. Returns the id of the job that tracks it.
+    A job whose process dies stays running; rerunning the import is safe.
+    """
+    job_id = create_job(company_id, created_by, fmt)
+    threading.Thread(
+        target=_run_job, args=(job_id, path, fmt, company_id), name="employee-import", daemon=True
+    ).start()
+    return job_id
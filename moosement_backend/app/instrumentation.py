@@ -0,0 +1,205 @@
+# instrumentation.py
+import threading
+import time
+
+from pymongo import monitoring
+
+import metrics
+from logs import logger
+
+# Commands that are connection housekeeping, not work done for the request
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions"}
+
+
+class RequestStats:
+    """
+    Database work done for one request. Commands may finish on run_parallel()
+    threads, so updates take a lock.
+    """
+
+    __slots__ = ("endpoint", "started", "commands", "db_seconds", "documents", "_lock", "_pending")
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.commands = []  # (command name, collection, seconds, ok)
+        self.db_seconds = 0.0
+        self.documents = 0
+        self._lock = threading.Lock()
+        self._pending = {}  # request_id -> collection
+
+    def started_command(self, request_id, collection):
+        with self._lock:
+            self._pending[request_id] = collection
+
+    def finished_command(self, request_id, name, seconds, documents, ok):
+        with self._lock:
+            collection = self._pending.pop(request_id, None)
+            self.commands.append((name, collection, seconds, ok))
+            self.db_seconds += seconds
+            self.documents += documents
+
+
+def _documents_in(reply):
+    """
+    Number of documents a command reply carries back.
+    """
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(batch) if batch is not None else 0
+    if reply.get("value") is not None:  # findAndModify
+        return 1
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Attributes every MongoDB command to the request that issued it.
+    """
+
+    def started(self, event):
+        stats = metrics.current_request.get()
+        if stats is None or event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        stats.started_command(event.request_id, collection if isinstance(collection, str) else None)
+
+    def succeeded(self, event):
+        self._finished(event, _documents_in(event.reply), True)
+
+    def failed(self, event):
+        self._finished(event, 0, False)
+
+    def _finished(self, event, documents, ok):
+        stats = metrics.current_request.get()
+        if stats is None or event.command_name in IGNORED_COMMANDS:
+            return
+        seconds = event.duration_micros / 1e6
+        stats.finished_command(event.request_id, event.command_name, seconds, documents, ok)
+        metrics.inc("mongo_commands_total", endpoint=stats.endpoint, command=event.command_name)
+        if not ok:
+            metrics.inc("mongo_commands_failed_total", endpoint=stats.endpoint, command=event.command_name)
+
+
+# Registered at import: only clients created afterwards report to a listener,
+# and app/__init__.py imports this module before anything connects
+monitoring.register(CommandMetrics())
+
+_slow_request_seconds = 0.0
+
+
+def configure(slow_request_ms):
+    """
+    Sets the slow-request threshold; 0 turns the slow-request log off.
+    """
+    global _slow_request_seconds
+    _slow_request_seconds = slow_request_ms / 1000
+
+
+def start_request(endpoint):
+    """
+    Starts collecting for a request. Returns (stats, token for finish_request).
+    """
+    stats = RequestStats(endpoint or "none")
+    return stats, metrics.current_request.set(stats)
+
+
+def finish_request(stats, token, method, status, response_bytes):
+    """
+    Records a finished request and logs it if it was slow.
+    """
+    metrics.current_request.reset(token)
+    elapsed = time.perf_counter() - stats.started
+    endpoint = stats.endpoint
+
+    metrics.inc("http_requests_total", endpoint=endpoint, method=method, status=status)
+    metrics.observe("http_request_duration_seconds", elapsed, endpoint=endpoint)
+    metrics.observe("http_request_db_seconds", stats.db_seconds, endpoint=endpoint)
+    metrics.inc("mongo_command_seconds_total", stats.db_seconds, endpoint=endpoint)
+    metrics.inc("mongo_documents_returned_total", stats.documents, endpoint=endpoint)
+    if response_bytes is not None:
+        metrics.inc("http_response_bytes_total", response_bytes, endpoint=endpoint)
+
+    if _slow_request_seconds and elapsed >= _slow_request_seconds:
+        logger.warning(
+            "slow_request",
+            method=method,
+            status=status,
+            ms=round(elapsed * 1000, 1),
+            db_ms=round(stats.db_seconds * 1000, 1),
+            commands=[
+                {"command": name, "collection": collection, "ms": round(seconds * 1000, 1), "ok": ok}
+                for name, collection, seconds, ok in stats.commands
+            ],
+        )
+
+
+_watched_buffers = set()
+
+
+def watch_buffer(buffer):
+    """
+    Exposes a PointsBuffer's stats() as gauges labelled with its name.
+    """
+    if buffer.name in _watched_buffers:
+        return
+    _watched_buffers.add(buffer.name)
+
+    def collect():
+        return [
+            (f"write_behind_{key}", "gauge", {"buffer": buffer.name}, value)
+            for key, value in sorted(buffer.stats().items())
+        ]
+    metrics.register_collector(collect)
+
+
+def init_app(app):
+    """
+    Instruments a Flask app: every request's latency, status, response size
+    and database commands are recorded in metrics.
+    """
+    from flask import g, request
+
+    configure(app.config["SLOW_REQUEST_MS"])
+
+    @app.before_request
+    def _start():
+        g.request_stats = start_request(request.endpoint)
+
+    @app.after_request
+    def _finish(response):
+        started = g.pop("request_stats", None)
+        if started:
+            finish_request(*started, request.method, response.status_code, response.calculate_content_length())
+        return response
+
+
+def init_async_app(app):
+    """
+    init_app() for the Quart app in app/aio.
+    """
+    from quart import g, request
+
+    configure(app.config["SLOW_REQUEST_MS"])
+
+    @app.before_request
+    async def _start():
+        g.request_stats = start_request(request.endpoint)
+
+    @app.after_request
+    async def _finish(response):
+        started = g.pop("request_stats", None)
+        if started:
+            finish_request(*started, request.method, response.status_code, response.content_length)
+        return response
+
+
+metrics.describe("http_requests_total", "Requests served, by endpoint, method and status.")
+metrics.describe("http_request_duration_seconds", "Request latency.")
+metrics.describe("http_request_db_seconds", "Time spent in MongoDB commands per request.")
+metrics.describe("http_response_bytes_total", "Response body bytes sent.")
+metrics.describe("mongo_commands_total", "MongoDB commands issued, by endpoint and command.")
+metrics.describe("mongo_commands_failed_total", "MongoDB commands that failed.")
+metrics.describe("mongo_command_seconds_total", "Time spent in MongoDB commands.")
+metrics.describe("mongo_documents_returned_total", "Documents returned by MongoDB commands.")
@@ -0,0 +1,71 @@
+# json_provider.py
+import datetime
+import decimal
+import json
+import uuid
+
+from bson import Decimal128, ObjectId
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder with the same output types
+    orjson = None
+
+
+def _default(value):
+    """
+    Types the encoder does not know. orjson handles datetime, date and UUID
+    itself; the stdlib fallback needs them here.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+else:
+    def dumps_bytes(obj):
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    JSON for jsonify(), request.get_json() and cached catalog bodies.
+
+    Encodes with orjson when it is installed. ObjectId, Decimal/Decimal128 and
+    datetime values are handled by the encoder, so handlers can return
+    documents without converting ids and dates by hand. Datetimes are ISO
+    8601, like the strings the models store; ids and decimals become strings.
+    Keys are not sorted and output is always compact. Works for the Quart
+    app too, which uses Flask's provider interface.
+    """
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # Callers asking for indent etc. get the stdlib encoder
+            kwargs.setdefault("default", _default)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,54 @@
+# leaderboards.py
+from bson import ObjectId
+from flask import Blueprint, request, jsonify
+from models.leaderboards import company_scope, get_page, SnapshotExpired, PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+from app.pagination import page_params, next_cursor
+from app.session import require_user
+
+# Initialize blueprint
+leaderboards_bp = Blueprint("leaderboards_bp", __name__)
+
+
+# API route for the individual leaderboard within the user's company or one
+# of its departments. Served from the latest snapshot; built_at says how fresh
+# it is. The cursor pins the snapshot, so a rebuild while paging does not
+# repeat or skip users.
+@leaderboards_bp.route("/individual", methods=["GET"])
+def get_individual_leaderboard():
+    request_user, error = require_user()
+    if error:
+        return error
+
+    # Only the user's current company (not the token's); company_id may be left out
+    membership = request_user.membership()
+    own_company = membership.company_id if membership else None
+    company_id = request.args.get("company_id") or own_company
+    department = request.args.get("department")
+    if not company_id:
+        return jsonify({"error": "User is not in a company"}), 404
+    if company_id != own_company:
+        return jsonify({"error": "Not a member of this company"}), 403
+
+    params, error = page_params(PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT)
+    if error:
+        return error
+    limit, position = params
+    after = int(position.get("pos", 0)) if position else 0
+    snapshot_id = ObjectId(position["sid"]) if position and ObjectId.is_valid(position.get("sid")) else None
+
+    try:
+        entries, snapshot = get_page(company_scope(company_id, department), max(after, 0), limit + 1, snapshot_id)
+    except SnapshotExpired:
+        return jsonify({"error": "The leaderboard has been rebuilt; start again from the first page"}), 410
+    built_at = snapshot["built_at"] if snapshot else None
+    entries, cursor = next_cursor(
+        entries, limit, lambda entry: {"pos": entry["position"], "sid": str(snapshot["snapshot_id"])}
+    )
+
+    return jsonify({
+        "company_id": company_id,
+        "department": department,
+        "leaderboard": entries,
+        "built_at": built_at,
+        "next_cursor": cursor
+    }), 200
@@ -0,0 +1,13 @@
+from models.completions import backfill_user_activity, migrate_embedded_completions
+from models.indexes import ensure_indexes
+
+# the unique index is what skips entries that were already moved
+ensure_indexes()
+
+# move embedded completion history into the completions collection
+migrated = migrate_embedded_completions()
+print(f"Migrated completion history for {migrated} users.")
+
+# set last_active_day/last_completed from that history so streaks carry over
+backfilled = backfill_user_activity()
+print(f"Backfilled streak fields for {backfilled} users.")
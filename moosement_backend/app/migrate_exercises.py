@@ -0,0 +1,9 @@
+from models.exercises import migrate_logged_exercises
+from models.indexes import ensure_indexes
+
+# events must go into the time-series collection, so create it first
+ensure_indexes()
+
+# move embedded exercise logs into the exercise event collection and rollups
+migrated = migrate_logged_exercises()
+print(f"Migrated exercise logs for {migrated} users.")
@@ -0,0 +1,5 @@
+from models.invites import migrate_embedded_invites
+
+# move invite codes embedded in team documents into the invites collection
+migrated = migrate_embedded_invites()
+print(f"Migrated {migrated} invites.")
@@ -0,0 +1,13 @@
+# monitoring.py
+from flask import Blueprint, Response
+
+import metrics
+
+# Initialize blueprint
+monitoring_bp = Blueprint("monitoring_bp", __name__)
+
+
+# Prometheus scrape endpoint for this worker's metrics
+@monitoring_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
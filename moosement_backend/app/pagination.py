@@ -0,0 +1,81 @@
+# pagination.py
+from flask import current_app, jsonify, request
+from itsdangerous import BadSignature, URLSafeSerializer
+
+CURSOR_SALT = "moosement-cursor"
+
+
+def cursor_serializer(app):
+    serializer = app.extensions.get("cursor_serializer")
+    if serializer is None:
+        serializer = URLSafeSerializer(app.config["SECRET_KEY"], salt=CURSOR_SALT)
+        app.extensions["cursor_serializer"] = serializer
+    return serializer
+
+
+def encode_cursor(position):
+    """
+    Turns the sort key of the last item on a page into an opaque token.
+    Tokens are signed, so clients cannot forge a position.
+    """
+    return cursor_serializer(current_app).dumps(position)
+
+
+def read_page(args, serializer, default, maximum):
+    """
+    Reads limit and cursor from query args. Returns ((limit, position), None)
+    or (None, (error message, status)). Shared by the WSGI and async tiers.
+    """
+    try:
+        limit = int(args.get("limit", default))
+    except ValueError:
+        return None, ("limit must be an integer", 400)
+    limit = max(1, min(limit, maximum))
+
+    token = args.get("cursor")
+    if not token:
+        return (limit, None), None
+    try:
+        position = serializer.loads(token)
+    except BadSignature:
+        return None, ("Invalid cursor", 400)
+    if not isinstance(position, dict):
+        return None, ("Invalid cursor", 400)
+    return (limit, position), None
+
+
+def split_page(items, limit, position_of, serializer):
+    """
+    Given up to limit + 1 items, returns (page, next cursor). The cursor is
+    None on the last page.
+    """
+    if len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    return page, serializer.dumps(position_of(page[-1]))
+
+
+def page_params(default=None, maximum=None):
+    """
+    Reads ?limit= and ?cursor= for a keyset-paginated list.
+    Returns ((limit, position), None) or (None, error response). position is
+    the decoded cursor, or None for the first page.
+    """
+    params, error = read_page(
+        request.args,
+        cursor_serializer(current_app),
+        default or current_app.config["PAGE_SIZE_DEFAULT"],
+        maximum or current_app.config["PAGE_SIZE_MAX"],
+    )
+    if error:
+        message, status = error
+        return None, (jsonify({"error": message}), status)
+    return params, None
+
+
+def next_cursor(items, limit, position_of):
+    """
+    Given up to limit + 1 items, returns (page, next cursor). The cursor is
+    None on the last page.
+    """
+    return split_page(items, limit, position_of, cursor_serializer(current_app))
@@ -0,0 +1,206 @@
+# passwords.py
+import asyncio
+import collections
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+import config
+
+# Hashing is CPU bound, so it runs in a small process pool instead of on the
+# request thread. At most `max_pending` hashes may be queued or running; beyond
+# that callers get HashingBusy straight away instead of piling up.
+_settings = {
+    "PASSWORD_HASH_METHOD": config.PASSWORD_HASH_METHOD,
+    "PASSWORD_HASH_WORKERS": config.PASSWORD_HASH_WORKERS,
+    "PASSWORD_HASH_MAX_PENDING": config.PASSWORD_HASH_MAX_PENDING,
+    "PASSWORD_HASH_TIMEOUT_SECONDS": config.PASSWORD_HASH_TIMEOUT_SECONDS,
+}
+
+_pool = None
+_pool_pid = None
+_slots = threading.BoundedSemaphore(_settings["PASSWORD_HASH_MAX_PENDING"])
+_lock = threading.Lock()
+_hash_prefix = None  # The method and cost as they appear in a hash, set by configure()
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already waiting, or one took too long."""
+
+
+def init_app(app):
+    for key in _settings:
+        app.config.setdefault(key, _settings[key])
+    configure(**{key: app.config[key] for key in _settings})
+
+
+def _method_prefix(method):
+    """
+    The method as werkzeug writes it at the front of a hash, with its default
+    cost filled in: "scrypt" is written out as "scrypt:32768:8:1".
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        if not args:
+            args = ["32768", "8", "1"]
+        elif len(args) != 3:
+            raise ValueError("'scrypt' takes 3 arguments.")
+        return ":".join([name, *(str(int(arg)) for arg in args)])
+    if name == "pbkdf2":
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' takes 2 arguments.")
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"{name}:{hash_name}:{iterations}"
+    raise ValueError(f"Invalid hash method '{method}'.")
+
+
+def configure(**settings):
+    global _slots, _hash_prefix
+    _settings.update(settings)
+    _slots = threading.BoundedSemaphore(_settings["PASSWORD_HASH_MAX_PENDING"])
+    _hash_prefix = _method_prefix(_settings["PASSWORD_HASH_METHOD"])
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _lock:
+            if _pool is None or _pool_pid != pid:
+                # spawn keeps the workers free of the parent's threads and sockets
+                _pool = ProcessPoolExecutor(
+                    max_workers=_settings["PASSWORD_HASH_WORKERS"],
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def _submit(function, *args):
+    """
+    Takes a pending slot, waiting up to half the timeout for one, and queues
+    the call in the pool. The slot is freed when the call finishes.
+    """
+    slots = _slots
+    if not slots.acquire(timeout=_settings["PASSWORD_HASH_TIMEOUT_SECONDS"] / 2):
+        raise HashingBusy()
+    try:
+        future = _get_pool().submit(function, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def _result(future):
+    try:
+        return future.result(timeout=_settings["PASSWORD_HASH_TIMEOUT_SECONDS"])
+    except FutureTimeout:
+        future.cancel()
+        raise HashingBusy()
+
+
+def _run(function, *args):
+    if _settings["PASSWORD_HASH_WORKERS"] <= 0:
+        return function(*args)
+    return _result(_submit(function, *args))
+
+
+async def _run_async(function, *args):
+    """
+    _run() for the async tier. The event loop must not block, so a full
+    queue raises HashingBusy at once instead of waiting for a slot.
+    """
+    if _settings["PASSWORD_HASH_WORKERS"] <= 0:
+        return await asyncio.to_thread(function, *args)
+
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        future = _get_pool().submit(function, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), _settings["PASSWORD_HASH_TIMEOUT_SECONDS"])
+    except asyncio.TimeoutError:
+        raise HashingBusy()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, _settings["PASSWORD_HASH_METHOD"])
+
+
+def hash_passwords(passwords):
+    """
+    Hashes a batch of passwords (e.g. a bulk import), in order. Each hash
+    takes a pending slot like hash_password() does, and a batch keeps at most
+    half of the slots, so logins and registrations still get through while
+    it runs. Raises HashingBusy if a slot does not come free in time.
+    """
+    method = _settings["PASSWORD_HASH_METHOD"]
+    if _settings["PASSWORD_HASH_WORKERS"] <= 0:
+        return [generate_password_hash(password, method) for password in passwords]
+
+    window = max(1, _settings["PASSWORD_HASH_MAX_PENDING"] // 2)
+    in_flight = collections.deque()
+    hashes = []
+    try:
+        for password in passwords:
+            if len(in_flight) >= window:
+                hashes.append(_result(in_flight.popleft()))
+            in_flight.append(_submit(generate_password_hash, password, method))
+        while in_flight:
+            hashes.append(_result(in_flight.popleft()))
+    finally:
+        for future in in_flight:
+            future.cancel()
+    return hashes
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+async def hash_password_async(password):
+    return await _run_async(generate_password_hash, password, _settings["PASSWORD_HASH_METHOD"])
+
+
+async def verify_password_async(password_hash, password):
+    return await _run_async(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """
+    True if the hash was made with a different method or cost than configured.
+    """
+    if _hash_prefix is None:
+        configure()
+    return password_hash.split("$", 1)[0] != _hash_prefix
+
+
+def _reset_after_fork():
+    global _lock, _slots
+    _lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(_settings["PASSWORD_HASH_MAX_PENDING"])
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def shutdown():
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_pid = None
@@ -0,0 +1,139 @@
+# session.py
+import secrets
+
+from bson import ObjectId
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from logs import logger
+from models import db
+from models.users import UserMembership
+
+users_collection = db.collection(db.USERS)
+
+TOKEN_SALT = "moosement-session"
+
+
+def init_app(app):
+    if not app.config.get("SECRET_KEY"):
+        # Tokens will not survive a restart or work across workers
+        logger.warning("secret_key_missing", detail="using a random key for this process")
+        app.config["SECRET_KEY"] = secrets.token_hex(32)
+    app.extensions["session_serializer"] = URLSafeTimedSerializer(app.config["SECRET_KEY"], salt=TOKEN_SALT)
+
+
+def sign_token(serializer, user_id, team_id=None, company_id=None):
+    return serializer.dumps({
+        "uid": str(user_id),
+        "tid": str(team_id) if team_id else None,
+        "cid": str(company_id) if company_id else None,
+    })
+
+
+def issue_token(user_id, team_id=None, company_id=None):
+    """
+    Signs a session token carrying the user's id, team and company.
+    """
+    return sign_token(current_app.extensions["session_serializer"], user_id, team_id, company_id)
+
+
+class RequestUser:
+    """
+    The user making the current request.
+
+    id, team_id and company_id come from the session token and cost no
+    database read; team_id and company_id are only a hint, see membership().
+    Other fields are loaded on demand with load(), which only reads the
+    fields of the given record and remembers it for the rest of the request.
+    """
+
+    __slots__ = ("id", "team_id", "company_id", "_records")
+
+    def __init__(self, user_id, team_id=None, company_id=None):
+        self.id = ObjectId(user_id)
+        self.team_id = team_id
+        self.company_id = company_id
+        self._records = {}
+
+    def load(self, record, slices=None):
+        """
+        Returns the user as the given Record class (only its fields are read),
+        or None if the user does not exist. Cached for the rest of the request.
+        """
+        key = (record, repr(sorted(slices.items())) if slices else None)
+        if key not in self._records:
+            self._records[key] = record.find_one(users_collection, {"_id": self.id}, slices=slices)
+        return self._records[key]
+
+    def membership(self):
+        """
+        The user's current team and company, read from the database, or None
+        if the user does not exist. The token's team and company are the ones
+        at sign-in and go stale when the user changes team (an accepted
+        invite, a bulk accept), so anything that grants access to a team uses
+        this instead.
+        """
+        return self.load(UserMembership)
+
+
+def token_from_header(headers):
+    header = headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        return header[len("Bearer "):].strip()
+    return None
+
+
+def _user_id_from_request(field):
+    user_id = request.args.get(field)
+    if user_id is None:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            user_id = data.get(field)
+    return user_id
+
+
+def resolve_user(token, user_id, serializer, max_age, user_class=RequestUser):
+    """
+    Works out the requesting user from a session token. A user id sent
+    alongside it, as older clients do, must be the token's. Returns (user,
+    None) or (None, (error message, status)). Shared by the WSGI and async
+    tiers.
+    """
+    if not token:
+        # A bare user id proves nothing, so it is never enough on its own
+        return None, ("A session token is required", 401)
+    try:
+        claims = serializer.loads(token, max_age=max_age)
+    except SignatureExpired:
+        return None, ("Session expired", 401)
+    except BadSignature:
+        return None, ("Invalid session token", 401)
+
+    if user_id and user_id != claims["uid"]:
+        return None, ("Token does not match user", 403)
+    return user_class(claims["uid"], claims.get("tid"), claims.get("cid")), None
+
+
+def require_user(field="user_id"):
+    """
+    Resolves the user for this request. Returns (RequestUser, None) or
+    (None, error response).
+
+    The user comes from the Bearer session token. If the query string or
+    JSON body also carries `field`, as older clients send, it must match.
+    """
+    if "request_user" in g:
+        return g.request_user, None
+
+    user, error = resolve_user(
+        token_from_header(request.headers),
+        _user_id_from_request(field),
+        current_app.extensions["session_serializer"],
+        current_app.config["SESSION_TOKEN_MAX_AGE_SECONDS"],
+    )
+    if error:
+        message, status = error
+        return None, (jsonify({"error": message}), status)
+
+    g.request_user = user
+    return user, None
@@ -0,0 +1,268 @@
+# sync.py
+from flask import Blueprint, request, jsonify
+from datetime import datetime, date, timedelta, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from logs import logger
+from models import db
+from models.challenges import get_challenge
+from models.exercises import calculate_points, build_event, record_events, is_exercise_type
+from models.users import get_users_activity, streak_points
+from models.completions import get_completed_days, insert_completions
+from models.teams import add_team_points_bulk
+from models.leaderboards import note_points_changed
+from app.session import require_user
+
+# Initialize blueprint
+sync_bp = Blueprint("sync_bp", __name__)
+
+users_collection = db.collection(db.USERS)
+
+SYNC_MAX_ITEMS = 200
+SYNC_MAX_AGE_DAYS = 7  # Oldest offline activity we accept
+SYNC_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _parse_timestamp(value, now):
+    """
+    Parses an ISO timestamp sent by the client into naive UTC.
+    Items without a timestamp are treated as happening now.
+    """
+    if value is None:
+        return now
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _validate_item(item, user_id, now):
+    """
+    Checks one sync item for the signed-in user. Returns (parsed item, None)
+    or (None, error message).
+    """
+    if not isinstance(item, dict):
+        return None, "Item must be an object"
+
+    # Items may still carry the user_id older clients sent, but only their own
+    if item.get("user_id") not in (None, str(user_id)):
+        return None, "Item is for another user"
+
+    try:
+        timestamp = _parse_timestamp(item.get("completed_at") or item.get("logged_at"), now)
+    except (TypeError, ValueError):
+        return None, "Invalid timestamp"
+    if timestamp > now + SYNC_CLOCK_SKEW:
+        return None, "Timestamp is in the future"
+    if timestamp < now - timedelta(days=SYNC_MAX_AGE_DAYS):
+        return None, "Timestamp is too old to sync"
+
+    parsed = {"user_id": user_id, "timestamp": timestamp, "day": timestamp.date().isoformat()}
+
+    item_type = item.get("type")
+    if item_type == "completion":
+        challenge_id = item.get("challenge_id")
+        if not challenge_id or not ObjectId.is_valid(challenge_id):
+            return None, "Invalid ID format"
+        challenge = get_challenge(challenge_id)
+        if not challenge:
+            return None, "Challenge not found"
+        parsed.update(type=item_type, challenge_id=str(challenge_id), challenge=challenge)
+    elif item_type == "exercise":
+        exercise_type = item.get("exercise_type")
+        value = item.get("value")
+        if not exercise_type or isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            return None, "Missing required fields"
+        if not is_exercise_type(exercise_type):
+            return None, "Unknown exercise_type"
+        parsed.update(type=item_type, exercise_type=exercise_type, value=value)
+    else:
+        return None, "Unknown item type"
+
+    return parsed, None
+
+
+def _next_streak(state, day):
+    """
+    Advances a user's streak for a completion on `day`. Items older than the
+    last active day do not move the streak.
+    """
+    last_day = state["last_active_day"]
+    if last_day and day <= last_day:
+        return state["streaks"] or 1
+
+    if last_day and (date.fromisoformat(day) - date.fromisoformat(last_day)).days == 1:
+        streak = state["streaks"] + 1
+    else:  # Streak broken
+        streak = 1
+    state["streaks"] = streak
+    state["last_active_day"] = day
+    return streak
+
+
+def _apply_items(parsed_items, results, now):
+    """
+    Applies validated items in three round trips: read the users and the
+    completions they already have, write every user with one bulk_write, then
+    store completions, exercise events and one $inc per team together.
+    """
+    user_ids = {item["user_id"] for item in parsed_items}
+    days = {item["day"] for item in parsed_items if item["type"] == "completion"}
+    users, completed = db.run_parallel(
+        lambda: get_users_activity(user_ids),
+        lambda: get_completed_days(user_ids, days) if days else set(),
+    )
+    for result in (users, completed):
+        if isinstance(result, Exception):
+            raise result
+
+    # One pass in time order so streaks build up the way they would have live
+    states = {}
+    for item in sorted(parsed_items, key=lambda item: item["timestamp"]):
+        index = item["index"]
+        user = users.get(item["user_id"])
+        if not user:
+            results[index] = {"index": index, "status": "error", "error": "User not found"}
+            continue
+
+        state = states.get(item["user_id"])
+        if state is None:
+            state = states[item["user_id"]] = {
+                "user": user,
+                "streaks": user.get("streaks", 0),
+                "last_active_day": user.get("last_active_day"),
+                "last_completed": dict(user.get("last_completed") or {}),
+                "changed_challenges": set(),
+                "points": 0,
+                "completions": [],
+                "exercises": [],
+                "indexes": [],
+            }
+
+        if item["type"] == "completion":
+            challenge_id = item["challenge_id"]
+            key = (item["user_id"], challenge_id, item["day"])
+            last_day = state["last_completed"].get(challenge_id)
+            if key in completed or last_day == item["day"]:
+                results[index] = {"index": index, "status": "error", "error": "Challenge already completed that day"}
+                continue
+            completed.add(key)
+
+            streak = _next_streak(state, item["day"])
+            points = streak_points(item["challenge"].get("points", 0), streak)
+            if not last_day or item["day"] > last_day:
+                state["last_completed"][challenge_id] = item["day"]
+                state["changed_challenges"].add(challenge_id)
+            state["completions"].append({
+                "user_id": item["user_id"],
+                "challenge_id": challenge_id,
+                "challenge_name": item["challenge"].get("name"),
+                "day": item["day"],
+                "points_earned": points,
+                "streak": streak,
+                "completed_at": item["timestamp"].isoformat(),
+            })
+            results[index] = {"index": index, "status": "ok", "points_earned": points, "streak": streak}
+        else:
+            points = calculate_points(item["exercise_type"], item["value"])
+            state["exercises"].append(build_event(
+                item["user_id"], user.get("team_id"), item["exercise_type"],
+                item["value"], points, item["timestamp"],
+            ))
+            results[index] = {"index": index, "status": "ok", "points_earned": points}
+
+        state["points"] += points
+        state["indexes"].append(index)
+
+    if not states:
+        return
+
+    # Each user update only applies if the document has not changed since we
+    # read it, so a concurrent completion cannot be double counted
+    now_iso = now.isoformat()
+    operations = []
+    for user_id, state in states.items():
+        update = {
+            "$inc": {"total_points": state["points"], "points": state["points"]},
+            "$set": {"updated_at": now_iso},
+        }
+        if state["completions"]:
+            update["$set"]["streaks"] = state["streaks"]
+            update["$set"]["last_active_day"] = state["last_active_day"]
+            for challenge_id in state["changed_challenges"]:
+                update["$set"][f"last_completed.{challenge_id}"] = state["last_completed"][challenge_id]
+        operations.append(UpdateOne({"_id": user_id, "updated_at": state["user"].get("updated_at")}, update))
+
+    result = users_collection.bulk_write(operations, ordered=False)
+    if result.matched_count < len(operations):
+        # Only on conflict: find out which users took the update
+        applied = {
+            user["_id"] for user in
+            users_collection.find({"_id": {"$in": list(states)}, "updated_at": now_iso}, {"_id": 1})
+        }
+        for user_id in list(states):
+            if user_id not in applied:
+                for index in states.pop(user_id)["indexes"]:
+                    results[index] = {"index": index, "status": "conflict", "error": "User changed during sync, retry"}
+
+    note_points_changed(len(states))
+
+    completions = []
+    events = []
+    points_by_team = {}
+    for state in states.values():
+        completions.extend(state["completions"])
+        events.extend(state["exercises"])
+        team_id = state["user"].get("team_id")
+        if team_id:
+            points_by_team[team_id] = points_by_team.get(team_id, 0) + state["points"]
+
+    for result in db.run_parallel(
+        lambda: insert_completions(completions),
+        lambda: record_events(events),
+        lambda: add_team_points_bulk(points_by_team),
+    ):
+        if isinstance(result, Exception):
+            # Log write error but don't fail the sync; user points are already saved
+            logger.error("sync_side_effects_failed", error=str(result))
+
+
+# Apply a batch of offline challenge completions and exercise logs
+@sync_bp.route("/batch", methods=["POST"])
+def sync_batch():
+    try:
+        data = request.get_json()
+        items = data.get("items") if isinstance(data, dict) else None
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Missing field: items"}), 400
+        if len(items) > SYNC_MAX_ITEMS:
+            return jsonify({"error": f"At most {SYNC_MAX_ITEMS} items per sync"}), 400
+
+        # Points and streaks are only ever credited to the signed-in user
+        request_user, error = require_user()
+        if error:
+            return error
+
+        now = datetime.utcnow()
+        results = [None] * len(items)
+        parsed_items = []
+        for index, item in enumerate(items):
+            parsed, error = _validate_item(item, request_user.id, now)
+            if error:
+                results[index] = {"index": index, "status": "error", "error": error}
+                continue
+            parsed["index"] = index
+            parsed_items.append(parsed)
+
+        if parsed_items:
+            _apply_items(parsed_items, results, now)
+
+        return jsonify({
+            "results": results,
+            "applied": sum(1 for result in results if result["status"] == "ok"),
+        }), 200
+
+    except Exception as e:
+        logger.error("sync_batch_failed", error=str(e))
+        return jsonify({"error": "An error occurred while syncing"}), 500
@@ -1,24 +1,24 @@
-from flask import Blueprint, request, jsonify
-from models.teams import create_team, join_team
-from models.users import get_user_by_id
+from flask import Blueprint, current_app, request, jsonify, url_for
+from models.teams import create_team, join_team, get_top_teams, get_team_rank
+from models.invites import create_invites, accept_invite as use_invite, accept_invites as use_invites
 from bson import ObjectId
-from config import MONGO_URI
+from pymongo.errors import DuplicateKeyError
+from logs import logger
+from models import db
+from app.session import issue_token, require_user
+from models.users import UserRole
+from app.pagination import page_params, next_cursor
 
-from pymongo import MongoClient, DESCENDING
-from pymongo.server_api import ServerApi
-
-import shortuuid
-import certifi
-
-client = MongoClient(MONGO_URI, server_api=ServerApi('1'), tls=True, tlsCAFile=certifi.where())
-
-db = client["moosement"]
-users_collection = db["user_data"]
-challenges_collection = db["challenge_data"]
-teams_collection = db["team_data"]
+users_collection = db.collection(db.USERS)
+challenges_collection = db.collection(db.CHALLENGES)
+teams_collection = db.collection(db.TEAMS)
 
 teams_bp = Blueprint("teams_bp", __name__)
 
+LEADERBOARD_DEFAULT_LIMIT = 100
+LEADERBOARD_MAX_LIMIT = 500
+LEADERBOARD_MAX_NEIGHBOURS = 25
+
 
 @teams_bp.route("/create", methods=["POST"])
 def create_team_route():
@@ -29,20 +29,24 @@ def create_team_route():
     name = data.get("name")
     company_id = data.get("company_id")
 
-    creator_id = ObjectId(data.get("creator_id"))
-
-    if not name or not company_id or not creator_id:
+    if not name or not company_id:
         return jsonify({"error": "Missing required fields"}), 400
 
-    try:
-        user = users_collection.find_one({"_id": creator_id})
-    except Exception as e:
-    # if not user:
-        return jsonify({"error": "User does not exist"}), 404
+    request_user, error = require_user("creator_id")
+    if error:
+        return error
 
-    if user:
+    creator_id = request_user.id
+    try:
         team_id = create_team(name, company_id, creator_id)
-        return jsonify({"message": "Team created successfully", "team_id": list(team_id)}), 201
+    except DuplicateKeyError:
+        return jsonify({"error": "The company already has a team with that name"}), 409
+
+    response = {"message": "Team created successfully", "team_id": list(team_id)}
+    # The user's team changed, so hand back a token that says so
+    team = teams_collection.find_one({"_id": ObjectId(team_id)}, {"team_id": 1})
+    response["token"] = issue_token(creator_id, team["team_id"], request_user.company_id)
+    return jsonify(response), 201
 
 
 @teams_bp.route("/join", methods=["POST"])
@@ -51,19 +55,20 @@ def join_team_route():
     Allows a user to join an existing team.
     """
     data = request.json
-    user_id = data.get("user_id")
     team_id = data.get("team_id")
 
-    if not user_id or not team_id:
+    request_user, error = require_user()
+    if error:
+        return error
+    if not team_id:
         return jsonify({"error": "Missing required fields"}), 400
-
-    user = get_user_by_id(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    user_id = str(request_user.id)
 
     success = join_team(user_id, team_id)
     if success:
-        return jsonify({"message": "User added to the team successfully"}), 200
+        response = {"message": "User added to the team successfully"}
+        response["token"] = issue_token(user_id, team_id, request_user.company_id)
+        return jsonify(response), 200
     return jsonify({"error": "Team not found or user already in team"}), 400
 
 @teams_bp.route("/points", methods=["GET"])
@@ -72,7 +77,7 @@ def get_team_points():
 
     # check that a team_id to get standings for was received
     if "team_id" not in data:
-            return jsonify({"error": f"Missing field: team_id"}), 400
+            return jsonify({"error": "Missing field: team_id"}), 400
 
     team_id = data["team_id"]
 
@@ -86,86 +91,172 @@ def get_team_points():
         "team_total_points": team["total_team_points"]
     }), 200
 
-def update_leaderboard():
-    # Lists all the teams but sorted in descending order by their number of team points
-    teams = list(teams_collection.find({}, {"_id": 0, "team_id": 1, "total_team_points": 1}).sort("total_team_points", DESCENDING))
-
-    # Iterates through all the teams setting a rank for them
-    for index, team in enumerate(teams):
-        rank = index + 1
-        teams_collection.update_one(
-            {"team_id": team["team_id"]},
-            {"$set": {"team_standing": rank}}
-        )
-
-# API route to update the leaderboard based off of the current points each team has
+# API route for the leaderboard. Standings come straight from the points index,
+# so reading the top of the board never rewrites any team documents.
 @teams_bp.route("/new_leaderboard", methods=["GET"])
 def get_leaderboard():
-    update_leaderboard()
-    # Sorts the teams by their now updated standing to output as a list repreenting the leaderboard
-    leaderboard = list(teams_collection.find({}, {"_id": 0, "name": 1, "team_id": 1, "total_team_points": 1, "team_standing": 1}).sort("team_standing", 1))
-
-    return jsonify({"leaderboard": leaderboard})
+    params, error = page_params(LEADERBOARD_DEFAULT_LIMIT, LEADERBOARD_MAX_LIMIT)
+    if error:
+        return error
+    limit, position = params
+    after = None
+    if position:
+        after = {
+            "total_team_points": position.get("p"),
+            "team_id": position.get("t"),
+            "team_standing": position.get("s", 0)
+        }
+
+    leaderboard, cursor = next_cursor(
+        get_top_teams(limit + 1, after), limit,
+        lambda team: {"p": team["total_team_points"], "t": team["team_id"], "s": team["team_standing"]}
+    )
+
+    return jsonify({"leaderboard": leaderboard, "next_cursor": cursor})
+
+# API route to get a single team's standing and the teams around it
+@teams_bp.route("/rank", methods=["GET"])
+def get_team_standing():
+    team_id = request.args.get("team_id")
+    if not team_id:
+        return jsonify({"error": "Missing parameter: team_id"}), 400
 
-@teams_bp.route('/invite', methods=['POST'])
-def invite_member():
     try:
-        data = request.get_json()
+        neighbours = int(request.args.get("neighbours", 0))
+    except ValueError:
+        return jsonify({"error": "neighbours must be an integer"}), 400
+    neighbours = max(0, min(neighbours, LEADERBOARD_MAX_NEIGHBOURS))
+
+    rank = get_team_rank(team_id, neighbours)
+    if not rank:
+        return jsonify({"error": "Invalid team"}), 404
+
+    return jsonify(rank), 200
 
-        user_id = ObjectId(data.get("user_id"))
+def _invite_json(invite):
+    return {
+        "code": invite["_id"],
+        "invite_link": url_for('teams_bp.accept_invite', invite_code=invite["_id"], _external=True),
+        "expires_at": invite["expires_at"],
+    }
 
-        if not user_id:
-            return jsonify({"error": "User ID is required"}), 400
 
+def _inviting_team():
+    """
+    The signed-in user and their current membership (team_id, company_id).
+    Returns (request_user, membership, None) or (None, None, error response).
+    """
+    request_user, error = require_user()
+    if error:
+        return None, None, error
+
+    # Read from the database: the token's team may be from before a team change
+    membership = request_user.membership()
+    if membership is None:
+        return None, None, (jsonify({"error": "User not found"}), 404)
+    if not membership.team_id:
+        return None, None, (jsonify({"error": "User is not part of a team"}), 400)
+    return request_user, membership, None
 
-        user = users_collection.find_one({"_id": user_id})
-        if not user:
-            return jsonify({"error": "User not found"}), 404
 
-        team_id = user.get("team_id")
-        if not team_id:
-            return jsonify({"error": "User is not part of a team"}), 400
+def _admin_team():
+    """
+    _inviting_team() for the bulk invite routes, which are for company admins
+    only, the same rule as the employee import.
+    """
+    request_user, membership, error = _inviting_team()
+    if error:
+        return None, None, error
+    admin = request_user.load(UserRole)
+    if admin is None or admin.role != "admin" or not admin.company_id:
+        return None, None, (jsonify({"error": "Only company admins can manage bulk invites"}), 403)
+    return request_user, membership, None
 
-        invite_code = shortuuid.uuid()
-        invite_link = url_for('accept_invite', invite_code=invite_code, _external=True)
 
-        teams_collection.update_one(
-            {"_id": ObjectId(team_id)},
-            {"$push": {"invites": {"code": invite_code, "created_by": user_id}}}
-        )
+@teams_bp.route('/invite', methods=['POST'])
+def invite_member():
+    try:
+        request_user, membership, error = _inviting_team()
+        if error:
+            return error
+
+        invite = create_invites(membership.team_id, request_user.id, company_id=membership.company_id)[0]
 
         return jsonify({
             "message": "Invite link generated successfully",
-            "invite_link": invite_link
+            **_invite_json(invite)
         }), 200
     except Exception as e:
+        logger.error("invite_failed", error=str(e))
         return jsonify({"error": "An error occurred while generating the invite"}), 500
 
 @teams_bp.route('/accept_invite/<invite_code>', methods=['POST'])
 def accept_invite(invite_code):
     try:
-        data = request.get_json()
-        new_user_id = data.get("user_id")
-
-        if not new_user_id:
-            return jsonify({"error": "User ID is required"}), 400
-
-        team = teams_collection.find_one({"invites.code": invite_code})
-        if not team:
-            return jsonify({"error": "Invalid invite code"}), 404
-
-        team_id = team["_id"]
-
-        users_collection.update_one(
-            {"_id": ObjectId(new_user_id)},
-            {"$set": {"team_id": str(team_id)}}
-        )
-
-        teams_collection.update_one(
-            {"_id": team_id},
-            {"$pull": {"invites": {"code": invite_code}}}
-        )
-
-        return jsonify({"message": "User successfully joined the team"}), 200
+        request_user, error = require_user()
+        if error:
+            return error
+        new_user_id = request_user.id
+
+        # Consumes the code and updates the user and team
+        invite = use_invite(invite_code, new_user_id)
+        if not invite:
+            return jsonify({"error": "Invalid or expired invite code"}), 404
+
+        response = {"message": "User successfully joined the team"}
+        response["token"] = issue_token(new_user_id, invite["team_id"], request_user.company_id)
+        return jsonify(response), 200
     except Exception as e:
+        logger.error("accept_invite_failed", invite_code=invite_code, error=str(e))
         return jsonify({"error": "An error occurred while accepting the invite"}), 500
+
+# Onboarding a department: generate many invites in one request
+@teams_bp.route('/invites/bulk', methods=['POST'])
+def create_bulk_invites():
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data.get("count", 1))
+        ttl_hours = int(data["ttl_hours"]) if data.get("ttl_hours") else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "count and ttl_hours must be integers"}), 400
+    if not 1 <= count <= current_app.config["INVITE_BULK_MAX"]:
+        return jsonify({"error": f"count must be between 1 and {current_app.config['INVITE_BULK_MAX']}"}), 400
+    if ttl_hours is not None and ttl_hours < 1:
+        return jsonify({"error": "ttl_hours must be positive"}), 400
+
+    request_user, membership, error = _admin_team()
+    if error:
+        return error
+
+    invites = create_invites(
+        membership.team_id, request_user.id, count,
+        company_id=membership.company_id, department=data.get("department"), ttl_hours=ttl_hours,
+    )
+    return jsonify({"invites": [_invite_json(invite) for invite in invites]}), 201
+
+# Put many users on the requester's team with that team's invite codes
+@teams_bp.route('/invites/bulk_accept', methods=['POST'])
+def accept_bulk_invites():
+    data = request.get_json(silent=True) or {}
+    pairs = data.get("invites")
+    if not isinstance(pairs, list) or not pairs:
+        return jsonify({"error": "invites must be a non-empty list of {code, user_id}"}), 400
+    if len(pairs) > current_app.config["INVITE_BULK_MAX"]:
+        return jsonify({"error": f"At most {current_app.config['INVITE_BULK_MAX']} invites per request"}), 400
+
+    assignments = {}
+    for pair in pairs:
+        code = pair.get("code") if isinstance(pair, dict) else None
+        user_id = pair.get("user_id") if isinstance(pair, dict) else None
+        if not isinstance(code, str) or not ObjectId.is_valid(user_id):
+            return jsonify({"error": "Each invite needs a code and a valid user_id"}), 400
+        assignments[code] = str(user_id)
+    if len(set(assignments.values())) != len(assignments) or len(assignments) != len(pairs):
+        return jsonify({"error": "Each code and each user may appear only once"}), 400
+
+    request_user, membership, error = _admin_team()
+    if error:
+        return error
+
+    accepted, rejected = use_invites(membership.team_id, assignments)
+    return jsonify({"accepted": accepted, "rejected": rejected}), 200
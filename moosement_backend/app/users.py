@@ -1,25 +1,51 @@
 # users_bp.py
-from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+import os
+import tempfile
+
+from flask import Blueprint, current_app, request, jsonify, url_for
 
-from pymongo.server_api import ServerApi
 from datetime import datetime
-from werkzeug.security import generate_password_hash
-from werkzeug.security import check_password_hash
 from bson import ObjectId
-from config import MONGO_URI
-import certifi
-
-client = MongoClient(MONGO_URI, server_api=ServerApi('1'), tls=True, tlsCAFile=certifi.where())
+from pymongo.errors import DuplicateKeyError
+from logs import logger
+from models import db
+from app.imports import FORMATS, activation_hash, start_import_job
+from app.passwords import hash_password, verify_password, needs_rehash, HashingBusy
+from app.session import issue_token, require_user
+from app.pagination import page_params, next_cursor
+from models.import_jobs import RUNNING, get_job
+from models.users import UserPoints, UserCredentials, UserRole, current_streak
 
-db = client["moosement"]
-users_collection = db["user_data"]
-challenges_collection = db["challenge_data"]
-teams_collection = db["team_data"]
+users_collection = db.collection(db.USERS)
+challenges_collection = db.collection(db.CHALLENGES)
+teams_collection = db.collection(db.TEAMS)
 
 # Initialize the blueprint
 users_bp = Blueprint("users_bp", __name__)
 
+
+def _spool_body(suffix, max_bytes):
+    """
+    Copies the request body to a temporary file and returns its path, or
+    None (leaving no file behind) if the body is larger than max_bytes.
+    """
+    with tempfile.NamedTemporaryFile(prefix="import-", suffix=suffix, delete=False) as spool:
+        size = 0
+        while chunk := request.stream.read(64 * 1024):
+            size += len(chunk)
+            if size > max_bytes:
+                break
+            spool.write(chunk)
+    if size > max_bytes:
+        os.unlink(spool.name)
+        return None
+    return spool.name
+
+def _hashing_busy():
+    response = jsonify({"error": "Server is busy, please try again"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 # Route for user registration
 @users_bp.route('/register', methods=['POST'])
 def register():
@@ -37,7 +63,10 @@ def register():
     if users_collection.find_one({"email": email}):
         return jsonify({"error": "User with this email already exists"}), 409
 
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = hash_password(password)
+    except HashingBusy:
+        return _hashing_busy()
 
     new_user = {
         "name": name,
@@ -46,9 +75,9 @@ def register():
         "points": 0,
         "joined_date": data.get("joined_date") or datetime.utcnow().isoformat(),
         "company_id": data.get("company_id"),
+        "department": data.get("department"),
         "team_id": None,
         "total_points": 0,
-        "completed_challenges": [],
         "streaks": 0,
         "role": "employee",  # Default role
         "redeemed_rewards": [],  # Field name to match what frontend expects
@@ -58,7 +87,11 @@ def register():
         "updated_at": datetime.utcnow().isoformat()
     }
 
-    insert_result = users_collection.insert_one(new_user)
+    try:
+        insert_result = users_collection.insert_one(new_user)
+    except DuplicateKeyError:
+        # Registered by a concurrent request since the check above
+        return jsonify({"error": "User with this email already exists"}), 409
     return jsonify({"message": "User registered successfully", "user_id": str(insert_result.inserted_id)}), 201
 
 # Route for user login
@@ -75,18 +108,128 @@ def login():
     email = data["email"]
     password = data["password"]
 
-    user = users_collection.find_one({"email": email})
+    user = UserCredentials.find_one(users_collection, {"email": email})
     
     # If no user exists with that email, return an error
     if not user:
         return jsonify({"error": "Invalid email"}), 400
+    # Imported invite-only accounts have no password until they are activated
+    if not user.password:
+        return jsonify({"error": "Account has not been activated"}), 403
 
     # Unhashes the stored password and checks if it matches the plaintext password
-    if not check_password_hash(user["password"], password):
-        return jsonify({"error": "Invalid password"}), 400
+    try:
+        if not verify_password(user.password, password):
+            return jsonify({"error": "Invalid password"}), 400
+    except HashingBusy:
+        return _hashing_busy()
+
+    # Upgrade hashes made with older settings while we have the plaintext
+    if needs_rehash(user.password):
+        try:
+            users_collection.update_one(
+                {"_id": user._id, "password": user.password},
+                {"$set": {"password": hash_password(password)}}
+            )
+        except HashingBusy:
+            pass  # Upgrade on a later login instead
     
-    # If login credentials are valid, return a success message
-    return jsonify({"message": "User logged in successfully", "user_id": str(user["_id"])}), 200
+    # If login credentials are valid, return a success message and a session
+    # token so later requests can identify the user without a lookup
+    return jsonify({
+        "message": "User logged in successfully",
+        "user_id": str(user._id),
+        "token": issue_token(user._id, user.team_id, user.company_id)
+    }), 200
+
+# Route for imported invite-only accounts to set their password
+@users_bp.route('/activate', methods=['POST'])
+def activate():
+    data = request.get_json()
+
+    required_fields = ["email", "code", "password"]
+    for field in required_fields:
+        if field not in data:
+            return jsonify({"error": f"Missing field: {field}"}), 400
+
+    try:
+        hashed_password = hash_password(data["password"])
+    except HashingBusy:
+        return _hashing_busy()
+
+    # The code is used up with the same write that sets the password
+    result = users_collection.update_one(
+        {"email": data["email"], "activation_hash": activation_hash(str(data["code"])), "password": None},
+        {"$set": {"password": hashed_password, "updated_at": datetime.utcnow().isoformat()},
+         "$unset": {"activation_hash": ""}}
+    )
+    if not result.matched_count:
+        return jsonify({"error": "Invalid email or activation code"}), 400
+    return jsonify({"message": "Account activated successfully"}), 200
+
+def _company_admin():
+    """
+    The signed-in company admin and their role. Returns (request_user,
+    UserRole, None) or (None, None, error response).
+    """
+    request_user, error = require_user()
+    if error:
+        return None, None, error
+    admin = request_user.load(UserRole)
+    if admin is None or admin.role != "admin" or not admin.company_id:
+        return None, None, (jsonify({"error": "Only company admins can import employees"}), 403)
+    return request_user, admin, None
+
+
+# Route for company admins to onboard many employees at once
+@users_bp.route('/import', methods=['POST'])
+def import_users():
+    """
+    Starts importing employees of the admin's company from a CSV or JSON
+    Lines body (see app/imports.py). The body is copied to a temporary file
+    and imported in the background; poll the returned status_url.
+    """
+    request_user, admin, error = _company_admin()
+    if error:
+        return error
+
+    fmt = request.args.get("format") or ("jsonl" if request.mimetype in ("application/x-ndjson", "application/jsonl") else "csv")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+    max_bytes = current_app.config["IMPORT_MAX_BYTES"]
+    too_large = jsonify({"error": f"Import body must be at most {max_bytes} bytes"}), 413
+    if (request.content_length or 0) > max_bytes:
+        return too_large
+    path = _spool_body(f".{fmt}", max_bytes)
+    if path is None:
+        return too_large
+    try:
+        job_id = start_import_job(path, fmt, admin.company_id, request_user.id)
+    except Exception:
+        # The job never took ownership of the file
+        os.unlink(path)
+        raise
+    return jsonify({
+        "job_id": str(job_id),
+        "status": RUNNING,
+        "status_url": url_for("users_bp.import_status", job_id=str(job_id), _external=True),
+    }), 202
+
+
+@users_bp.route('/import/<job_id>', methods=['GET'])
+def import_status(job_id):
+    """
+    Progress of an import, and its report once it is done.
+    """
+    _, admin, error = _company_admin()
+    if error:
+        return error
+    job = get_job(job_id, admin.company_id)
+    if job is None:
+        return jsonify({"error": "Import not found"}), 404
+    job["job_id"] = str(job.pop("_id"))
+    return jsonify(job), 200
 
 @users_bp.route('/update', methods=['PUT'])
 def update_profile():
@@ -114,7 +257,8 @@ def update_profile():
         "email": str,
         "team_id": str,
         "user_avatar": str,
-        "company_id": str
+        "company_id": str,
+        "department": str
     }
 
     # Validate and prepare updates
@@ -140,36 +284,30 @@ def update_profile():
 # API route to get the total points for a user
 @users_bp.route("/points", methods=["GET"])
 def get_user_points():
-    # Get user_id from query parameters
-    user_id = request.args.get("user_id")
-
-    # Check that a user_id was received
-    if not user_id:
+    # Identify the user from the session token
+    request_user, error = require_user()
+    if error:
+        response, status = error
         return jsonify({
-            "error": "Missing parameter: user_id",
+            "error": response.get_json()["error"],
             "total_points": 0,
             "redeemed_rewards": []
-        }), 400
+        }), status
+    user_id = str(request_user.id)
+
+    params, error = page_params()
+    if error:
+        return error
+    limit, position = params
+    offset = int(position.get("o", 0)) if position else 0
 
     try:
-        # Debug print to see the actual user_id value
-        print(f"Looking up user with ID: {user_id}")
-        
-        # Make sure user_id is a valid format before trying to convert
-        if not ObjectId.is_valid(user_id):
-            print(f"Invalid ObjectId format: {user_id}")
-            return jsonify({
-                "error": "Invalid user ID format",
-                "total_points": 0,
-                "redeemed_rewards": []
-            }), 400
-            
-        # Look up the user
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
+        # Only the fields returned below, and one page of the rewards, are read
+        user = request_user.load(UserPoints, slices={"redeemed_rewards": [offset, limit + 1]})
 
         # If no user exists with that ID, return an error
         if not user:
-            print(f"No user found with ID: {user_id}")
+            logger.info("user_not_found", user_id=user_id)
             return jsonify({
                 "error": "User not found",
                 "total_points": 0,
@@ -177,7 +315,7 @@ def get_user_points():
             }), 404
 
         # Get the redeemed rewards if they exist
-        redeemed_rewards = user.get("redeemed_rewards", [])
+        redeemed_rewards = user.redeemed_rewards
         
         # If redeemed_rewards is None or not an array, set it to empty array
         if redeemed_rewards is None or not isinstance(redeemed_rewards, list):
@@ -193,17 +331,19 @@ def get_user_points():
             # Make sure points_spent exists
             if "points_spent" not in reward:
                 reward["points_spent"] = 0
-            
-        print(f"Found user with points: {user.get('total_points', 0)}")
-        
+        redeemed_rewards, cursor = next_cursor(redeemed_rewards, limit, lambda _: {"o": offset + limit})
+
+
         return jsonify({
             "user_id": user_id,
-            "total_points": user.get("total_points", 0),
-            "redeemed_rewards": redeemed_rewards
+            "total_points": user.total_points,
+            "current_streak": current_streak(user.streaks, user.last_active_day),
+            "redeemed_rewards": redeemed_rewards,
+            "next_cursor": cursor
         }), 200
         
     except Exception as e:
-        print(f"Error in get_user_points: {str(e)}")
+        logger.error("user_points_failed", user_id=user_id, error=str(e))
         return jsonify({
             "error": f"An error occurred: {str(e)}",
             "user_id": user_id,
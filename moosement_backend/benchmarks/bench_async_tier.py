@@ -0,0 +1,137 @@
+"""
+Requests per second for the WSGI and async (ASGI) serving modes.
+
+Starts each mode as a server with the same number of worker processes, then
+has `--concurrency` client threads call a mix of read endpoints for
+`--seconds` seconds over keep-alive connections. Both servers talk to the
+database in MONGO_URI, so point it at a test cluster with some data and pass
+an existing user and team. Needs gunicorn and hypercorn installed. Run from
+moosement_backend/:
+
+    python -m benchmarks.bench_async_tier --workers 2 --concurrency 64 \\
+        --user-id 65f... --team-id abc123
+"""
+import argparse
+import http.client
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+
+from itsdangerous import URLSafeTimedSerializer
+
+from app.session import TOKEN_SALT, sign_token
+
+SERVERS = {
+    # Threads per worker is the WSGI tier's concurrency limit
+    "wsgi": "gunicorn app.app:app --workers {workers} --threads {threads} --bind 127.0.0.1:{port}",
+    "asgi": "hypercorn app.asgi:app --workers {workers} --bind 127.0.0.1:{port}",
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/metrics")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def load(port, paths, concurrency, seconds, headers):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(offset):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine = []
+        index = offset
+        while time.monotonic() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - start)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run(mode, args, paths, headers):
+    command = SERVERS[mode].format(workers=args.workers, threads=args.threads, port=args.port)
+    server = subprocess.Popen(command.split(), env=os.environ.copy())
+    try:
+        wait_until_up(args.port)
+        load(args.port, paths, args.concurrency, 2, headers)  # Warm up pools and catalogs
+        latencies, errors = load(args.port, paths, args.concurrency, args.seconds, headers)
+    finally:
+        server.terminate()
+        server.wait()
+    latencies = [latency * 1000 for latency in latencies] or [0.0]
+    print(f"{mode}: {len(latencies) / args.seconds:8.1f} req/s  "
+          f"p50={percentile(latencies, 0.5):.1f}ms  p99={percentile(latencies, 0.99):.1f}ms  errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="threads per WSGI worker")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=int, default=15)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--team-id", required=True)
+    parser.add_argument("--modes", default="wsgi,asgi")
+    args = parser.parse_args()
+
+    # Both servers inherit this key, so one token works against either
+    secret_key = os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+    token = sign_token(URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT), args.user_id, args.team_id)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    paths = [
+        "/api/challenges/get_challenges",
+        "/api/teams/new_leaderboard?limit=20",
+        f"/api/teams/rank?team_id={args.team_id}&neighbours=5",
+        f"/api/users/points?user_id={args.user_id}",
+        f"/api/challenges/history?user_id={args.user_id}",
+    ]
+    print(f"workers={args.workers} threads={args.threads} concurrency={args.concurrency} seconds={args.seconds}",
+          file=sys.stderr)
+    for mode in args.modes.split(","):
+        run(mode, args, paths, headers)
+
+
+if __name__ == "__main__":
+    main()
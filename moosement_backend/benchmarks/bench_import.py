@@ -0,0 +1,67 @@
+"""
+Bulk employee import throughput.
+
+Generates `--rows` employees (a `--password-share` of them with passwords,
+the rest invite-only, spread over `--teams` teams) as CSV in memory and
+imports them with app.imports.import_employees, printing progress per
+chunk and rows per second. Writes to the configured database: run it
+against a scratch mongod (MONGO_URI) after `flask ensure-indexes`. The
+benchmark company's users and teams are removed afterwards. Run from
+moosement_backend/:
+
+    python -m benchmarks.bench_import --rows 50000 --password-share 0.5
+"""
+import argparse
+import io
+import time
+import uuid
+
+from app import passwords
+from app.imports import import_employees
+from models import db
+
+
+def employees_csv(rows, password_share, teams, run_id):
+    lines = ["name,email,password,department,team"]
+    with_password = int(rows * password_share)
+    for index in range(rows):
+        password = f"pw-{index}" if index < with_password else ""
+        lines.append(f"Employee {index},bench-{run_id}-{index}@example.com,{password},"
+                     f"Dept {index % 7},Team {index % teams}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--password-share", type=float, default=0.5)
+    parser.add_argument("--teams", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--method", default=passwords._settings["PASSWORD_HASH_METHOD"])
+    args = parser.parse_args()
+
+    passwords.configure(PASSWORD_HASH_METHOD=args.method)
+    run_id = uuid.uuid4().hex[:8]
+    company_id = f"bench-import-{run_id}"
+    body = employees_csv(args.rows, args.password_share, args.teams, run_id)
+
+    start = time.perf_counter()
+
+    def progress(report):
+        elapsed = time.perf_counter() - start
+        print(f"{report['rows']:>8} rows {elapsed:8.1f}s {report['rows'] / elapsed:8.0f} rows/s")
+
+    try:
+        report = import_employees(io.StringIO(body), "csv", company_id, args.chunk_size, progress)
+        elapsed = time.perf_counter() - start
+        print(f"method={args.method} rows={args.rows} password_share={args.password_share}")
+        print(f"created {report['created']}, duplicates {report['duplicates']}, failed {report['failed']} "
+              f"in {elapsed:.1f}s ({args.rows / elapsed:.0f} rows/s)")
+    finally:
+        db.get_collection(db.USERS).delete_many({"company_id": company_id})
+        db.get_collection(db.TEAMS).delete_many({"company_id": company_id})
+        passwords.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+JSON serialization and compression of the largest responses.
+
+Builds realistic payloads (an individual leaderboard page, a long
+redeemed_rewards list and the full challenge catalog) and times, per payload:
+
+- stdlib: Flask's default provider, after converting ObjectIds to strings
+  by hand the way handlers used to
+- fast: app.json_provider.FastJSONProvider on the raw documents
+
+then the gzip and br size and encode time of the fast output. No database
+is needed. Run from moosement_backend/:
+
+    python -m benchmarks.bench_json --repeat 200
+"""
+import argparse
+import datetime
+import random
+import time
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app import compression
+from app.json_provider import FastJSONProvider, orjson
+
+CATEGORIES = ["cardio", "strength", "mindfulness", "nutrition", "social"]
+
+
+def leaderboard_page(rng, size):
+    return {
+        "entries": [
+            {
+                "position": position,
+                "user_id": ObjectId(),
+                "name": f"Employee {rng.randrange(100000)}",
+                "department": rng.choice(["Engineering", "Sales", "Support", "Finance"]),
+                "total_points": rng.randrange(100, 50000),
+                "rank": position,
+            }
+            for position in range(1, size + 1)
+        ],
+        "built_at": datetime.datetime.utcnow().isoformat(),
+        "next_cursor": "eyJwb3MiOjIwMH0.signature",
+    }
+
+
+def redeemed_rewards(rng, size):
+    now = datetime.datetime.utcnow()
+    return {
+        "user_id": ObjectId(),
+        "total_points": rng.randrange(0, 5000),
+        "current_streak": rng.randrange(0, 30),
+        "redeemed_rewards": [
+            {
+                "reward_id": ObjectId(),
+                "reward_name": rng.choice(["Gift Card", "Late Start Pass", "Free Lunch Voucher"]),
+                "points_spent": rng.choice([150, 200, 300, 500]),
+                "redeemed_at": now - datetime.timedelta(days=index),
+            }
+            for index in range(size)
+        ],
+        "next_cursor": None,
+    }
+
+
+def challenge_catalog(rng, size):
+    return {
+        "challenges": [
+            {
+                "_id": ObjectId(),
+                "name": f"Challenge {index}",
+                "description": "Take a brisk walk around the block and log how far you went. " * 2,
+                "category": rng.choice(CATEGORIES),
+                "points": rng.choice([10, 20, 50, 100]),
+            }
+            for index in range(size)
+        ],
+        "next_cursor": None,
+    }
+
+
+def stringify(value):
+    """
+    The by-hand conversion the stdlib encoder needs.
+    """
+    if isinstance(value, dict):
+        return {key: stringify(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [stringify(item) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def timed(repeat, fn):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    payloads = {
+        "leaderboard (200)": leaderboard_page(rng, 200),
+        "redeemed_rewards (500)": redeemed_rewards(rng, 500),
+        "challenge catalog (300)": challenge_catalog(rng, 300),
+    }
+    print(f"encoder: {'orjson' if orjson else 'stdlib fallback'}; "
+          f"br: {'available' if compression.brotli else 'not installed'}")
+    print(f"{'payload':24} {'stdlib ms':>10} {'fast ms':>8} {'bytes':>8} {'gzip':>14} {'br':>14}")
+    for name, payload in payloads.items():
+        stdlib_time, _ = timed(args.repeat, lambda: stdlib.dumps(stringify(payload), separators=(",", ":")))
+        fast_time, body = timed(args.repeat, lambda: fast.dumps(payload))
+        body = body.encode("utf-8")
+        sizes = []
+        for encoding in ("gzip", "br"):
+            if encoding == "br" and compression.brotli is None:
+                sizes.append("-")
+                continue
+            encode_time, encoded = timed(
+                max(1, args.repeat // 10),
+                lambda: compression.encode(body, encoding, args.gzip_level, args.brotli_quality),
+            )
+            sizes.append(f"{len(encoded)} {encode_time * 1000:.2f}ms")
+        print(f"{name:24} {stdlib_time * 1000:>10.3f} {fast_time * 1000:>8.3f} {len(body):>8} "
+              f"{sizes[0]:>14} {sizes[1]:>14}")
+
+
+if __name__ == "__main__":
+    main()
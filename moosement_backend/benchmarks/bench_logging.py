@@ -0,0 +1,88 @@
+"""
+Cost of logging on the request thread: print() against logs.logger.
+
+Each of `--threads` threads logs `--records` records the way a handler
+would, inside a request context. The output stream sleeps `--write-delay-ms`
+per write to stand in for a slow or contended stdout (a pipe to a log
+shipper, a busy terminal). Reports the time the calling thread spends per
+record. print() pays every write; the logger only pays for a queue put, and
+nothing at all for records that sampling drops. Run from moosement_backend/:
+
+    python -m benchmarks.bench_logging --threads 16 --records 2000 --write-delay-ms 0.2
+"""
+import argparse
+import threading
+import time
+
+from logs import StructuredLogger
+
+
+class SlowStream:
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+def run(threads, records, log_one):
+    per_call = []
+    lock = threading.Lock()
+
+    def worker(index):
+        start = time.perf_counter()
+        for record in range(records):
+            log_one(index, record)
+        with lock:
+            per_call.append((time.perf_counter() - start) / records)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(per_call) / len(per_call), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--records", type=int, default=2000, help="records per thread")
+    parser.add_argument("--write-delay-ms", type=float, default=0.2)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    stream = SlowStream(args.write_delay_ms / 1000)
+
+    def with_print(index, record):
+        print(f"Redeem request: {{'reward_name': 'Gift Card', 'thread': {index}, 'n': {record}}}", file=stream)
+
+    def logger_for(sample_rate):
+        logger = StructuredLogger("bench-log", stream=stream)
+        logger.configure("info", "", f"bench={sample_rate}", args.threads * args.records)
+
+        def log_one(index, record):
+            # One record per simulated request, as in the redeem handler
+            token = logger.start_request("bench")
+            logger.info("reward_redeemed", reward="Gift Card", thread=index, n=record)
+            logger.finish_request(token)
+        return logger, log_one
+
+    print(f"{'variant':28} {'caller us/record':>17} {'wall s':>8}")
+    per_call, wall = run(args.threads, args.records, with_print)
+    print(f"{'print()':28} {per_call * 1e6:>17.1f} {wall:>8.2f}")
+    for rate in (1.0, args.sample_rate):
+        logger, log_one = logger_for(rate)
+        per_call, wall = run(args.threads, args.records, log_one)
+        print(f"{f'logger (sample {rate:g})':28} {per_call * 1e6:>17.1f} {wall:>8.2f}  {logger.stats()}")
+        logger.close()
+
+
+if __name__ == "__main__":
+    main()
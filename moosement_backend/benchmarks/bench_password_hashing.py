@@ -0,0 +1,57 @@
+"""
+Login hashing throughput, inline vs. the process pool.
+
+Simulates a burst of logins from `--threads` request threads and reports
+verifications per second, overall and per core. Run from moosement_backend/:
+
+    python -m benchmarks.bench_password_hashing --threads 16 --logins 200
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from app import passwords
+
+
+def run(threads, logins, method):
+    stored = generate_password_hash("correct horse battery staple", method)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(
+            lambda _: passwords.verify_password(stored, "correct horse battery staple"),
+            range(logins),
+        ))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--method", default=passwords._settings["PASSWORD_HASH_METHOD"])
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    passwords.configure(PASSWORD_HASH_METHOD=args.method, PASSWORD_HASH_MAX_PENDING=args.logins)
+
+    passwords.configure(PASSWORD_HASH_WORKERS=0)
+    inline = run(args.threads, args.logins, args.method)
+
+    passwords.configure(PASSWORD_HASH_WORKERS=args.workers)
+    run(args.threads, args.workers, args.method)  # Warm up the pool
+    pooled = run(args.threads, args.logins, args.method)
+    passwords.shutdown()
+
+    print(f"method={args.method} threads={args.threads} logins={args.logins} cores={cores}")
+    print(f"inline:  {inline:8.1f} logins/s  {inline / cores:8.1f} per core")
+    print(f"pooled:  {pooled:8.1f} logins/s  {pooled / cores:8.1f} per core  ({args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Concurrent reward redemption against a real MongoDB.
+
+Creates a limited reward and a set of users with enough points, then has
+every user tap "redeem" `--taps` times at once from `--threads` threads.
+Checks that nothing is oversold or double-spent and reports latency
+percentiles. Everything it creates is removed afterwards. Run from
+moosement_backend/ with MONGO_URI pointing at a test database:
+
+    python -m benchmarks.bench_reward_redemption --users 300 --stock 100 --taps 2
+"""
+import argparse
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db
+from models.rewards import redeem_reward, REDEEMED
+
+COST = 100
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def setup(users, stock):
+    name = f"bench-reward-{uuid.uuid4().hex[:8]}"
+    reward = {"name": name, "points_required": COST, "stock": stock}
+    reward["_id"] = db.get_collection(db.REWARDS).insert_one(dict(reward)).inserted_id
+    user_ids = db.get_collection(db.USERS).insert_many([
+        {"email": f"{name}-{index}@bench.invalid", "total_points": COST * 3, "redeemed_rewards": []}
+        for index in range(users)
+    ]).inserted_ids
+    return reward, user_ids
+
+
+def teardown(reward, user_ids):
+    db.get_collection(db.REWARDS).delete_one({"_id": reward["_id"]})
+    db.get_collection(db.USERS).delete_many({"_id": {"$in": user_ids}})
+
+
+def timed_redeem(user_id, reward):
+    start = time.perf_counter()
+    outcome, _ = redeem_reward(user_id, reward)
+    return outcome, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--taps", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=64)
+    args = parser.parse_args()
+
+    reward, user_ids = setup(args.users, args.stock)
+    try:
+        calls = [user_id for user_id in user_ids for _ in range(args.taps)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(lambda user_id: timed_redeem(user_id, reward), calls))
+        elapsed = time.perf_counter() - start
+
+        outcomes = Counter(outcome for outcome, _ in results)
+        latencies = [latency * 1000 for _, latency in results]
+        stock_left = db.get_collection(db.REWARDS).find_one({"_id": reward["_id"]})["stock"]
+        charged = Counter()
+        for user in db.get_collection(db.USERS).find({"_id": {"$in": user_ids}}, {"total_points": 1, "redeemed_rewards": 1}):
+            charged[len(user["redeemed_rewards"])] += 1
+            assert user["total_points"] == COST * 3 - COST * len(user["redeemed_rewards"]), "points double-spent"
+
+        expected = min(args.stock, args.users)
+        assert outcomes[REDEEMED] == expected, f"redeemed {outcomes[REDEEMED]}, expected {expected}"
+        assert stock_left == args.stock - expected, f"stock left {stock_left}"
+        assert set(charged) <= {0, 1}, "a user redeemed the same reward twice"
+
+        print(f"users={args.users} stock={args.stock} taps={args.taps} threads={args.threads}")
+        print(f"outcomes: {dict(outcomes)}  stock left: {stock_left}")
+        print(f"{len(calls) / elapsed:8.1f} redemptions/s  "
+              f"p50={percentile(latencies, 0.5):.1f}ms  p95={percentile(latencies, 0.95):.1f}ms  "
+              f"p99={percentile(latencies, 0.99):.1f}ms  max={max(latencies):.1f}ms")
+    finally:
+        teardown(reward, user_ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
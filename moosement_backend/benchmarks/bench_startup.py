@@ -0,0 +1,92 @@
+"""
+Worker cold start: import-to-first-response latency.
+
+Starts `--runs` fresh interpreters. Each one imports the app, calls
+create_app() and serves GET /metrics through the test client, timing each
+step, and reports how many MongoDB commands ran and whether a client was
+created before the first response. Both should be zero/no: seeding and
+index creation are `flask` commands, and connections open on first use.
+Run from moosement_backend/ with the usual Mongo settings in the
+environment (nothing is read or written):
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = r"""
+import json, time
+started = time.perf_counter()
+from pymongo import monitoring
+
+class Count(monitoring.CommandListener):
+    commands = 0
+    def started(self, event):
+        Count.commands += 1
+    def succeeded(self, event):
+        pass
+    def failed(self, event):
+        pass
+
+monitoring.register(Count())
+import contextlib, io
+with contextlib.redirect_stdout(io.StringIO()):
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    status = app.test_client().get("/metrics").status_code
+    responded = time.perf_counter()
+from models import db
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_response_ms": (responded - created) * 1000,
+    "total_ms": (responded - started) * 1000,
+    "status": status,
+    "mongo_commands": Count.commands,
+    "client_created": db._client is not None,
+}))
+"""
+
+STEPS = ["import_ms", "create_app_ms", "first_response_ms", "total_ms", "process_ms"]
+
+
+def run_once():
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    elapsed = (time.perf_counter() - start) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = elapsed  # Includes interpreter startup and exit
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    print(f"{'step':20} {'median':>9} {'max':>9}")
+    for step in STEPS:
+        values = [result[step] for result in results]
+        print(f"{step:20} {statistics.median(values):>7.1f}ms {max(values):>7.1f}ms")
+    commands = max(result["mongo_commands"] for result in results)
+    clients = sum(result["client_created"] for result in results)
+    print(f"MongoDB commands before first response: {commands}; runs that created a client: {clients}")
+    if any(result["status"] != 200 for result in results):
+        print("warning: GET /metrics did not return 200", file=sys.stderr)
+    if commands or clients:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
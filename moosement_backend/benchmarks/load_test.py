@@ -0,0 +1,254 @@
+"""
+Load test for the main API flows, run in-process through create_app().
+
+Seeds a database (see benchmarks/seed.py), then drives each scenario with
+`--concurrency` threads, each using its own Flask test client, and reports
+throughput and p50/p95/p99 latency per endpoint. Run from moosement_backend/:
+
+    # Local mongod (most representative)
+    python -m benchmarks.load_test --backend mongod --mongo-uri mongodb://localhost:27017
+
+    # In-memory stand-in (pip install mongomock) for quick relative checks
+    python -m benchmarks.load_test --backend mongomock --users 200 --years 1
+
+benchmarks/mongomock_backend.py fills in what mongomock lacks (guarded
+find_one_and_update, bulk_write, $setWindowFields), so every scenario runs
+its success path there too. The run fails if the leaderboard snapshot or
+daily assignment build fails, or if a scenario gets no 2xx responses.
+
+Record a baseline on a reference machine with --write-baseline, then pass
+--baseline benchmarks/baseline.json to exit non-zero when any scenario's p95
+or p99 is more than --tolerance above it.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SCENARIOS = ["register", "login", "complete", "redeem", "leaderboard", "individual_leaderboard", "points", "today"]
+
+
+def configure_backend(args):
+    """
+    Points the app at the benchmark database. Must run before anything imports
+    config or the models.
+    """
+    os.environ["MONGO_DB_NAME"] = args.db_name
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("MONGO_WRITE_CONCERN", "1")
+    if args.backend == "mongod":
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ.setdefault("MONGO_TLS", "false")
+        return
+
+    from benchmarks import mongomock_backend
+    mongomock_backend.install()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def build_calls(name, count, data, tokens, rng):
+    """
+    Returns `count` (method, path, kwargs) requests for a scenario.
+    """
+    users = data["users"]
+    calls = []
+    for index in range(count):
+        user_id, _, company_id = rng.choice(users)
+        auth = {"headers": {"Authorization": f"Bearer {tokens[user_id]}"}}
+        if name == "register":
+            calls.append(("POST", "/api/users/register", {"json": {
+                "name": f"New User {index}", "email": f"new-{index}-{rng.random()}@example.com",
+                "password": "bench-password", "company_id": company_id,
+            }}))
+        elif name == "login":
+            calls.append(("POST", "/api/users/login", {"json": {
+                "email": rng.choice(data["emails"]), "password": "bench-password",
+            }}))
+        elif name == "complete":
+            calls.append(("POST", "/api/challenges/complete", dict(auth, json={
+                "challenge_id": rng.choice(data["challenge_ids"]),
+            })))
+        elif name == "redeem":
+            calls.append(("POST", "/api/rewards/redeem", dict(auth, json={
+                "reward_name": rng.choice(data["reward_names"]),
+            })))
+        elif name == "leaderboard":
+            calls.append(("GET", "/api/teams/new_leaderboard?limit=50", {}))
+        elif name == "individual_leaderboard":
+            calls.append(("GET", f"/api/leaderboards/individual?company_id={company_id}", auth))
+        elif name == "points":
+            calls.append(("GET", "/api/users/points", auth))
+        elif name == "today":
+            calls.append(("GET", "/api/challenges/today", auth))
+    return calls
+
+
+def drive(app, calls, concurrency):
+    """
+    Runs the calls from `concurrency` threads. Returns (latencies in ms of
+    successful calls, status counts, wall time).
+    """
+    next_call = itertools.count()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        mine = []
+        seen = {}
+        while True:
+            index = next(next_call)
+            if index >= len(calls):
+                break
+            method, path, kwargs = calls[index]
+            start = time.perf_counter()
+            try:
+                status = client.open(path, method=method, **kwargs).status_code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            seen[status] = seen.get(status, 0) + 1
+            if isinstance(status, int) and status < 500:
+                mine.append(elapsed)
+        with lock:
+            latencies.extend(mine)
+            for status, count in seen.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of regression messages against the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get("scenarios", {}).get(name)
+        if not expected or result["ok"] == 0:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            limit = expected[metric] * (1 + tolerance)
+            if result[metric] > limit:
+                regressions.append(f"{name} {metric} {result[metric]:.1f} > {limit:.1f} (baseline {expected[metric]:.1f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongod")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="moosement_bench")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--teams", type=int, default=25)
+    parser.add_argument("--companies", type=int, default=3)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--completions-per-week", type=float, default=3)
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--baseline", help="fail if latency regresses against this file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional p95/p99 increase")
+    parser.add_argument("--write-baseline", nargs="?", const=DEFAULT_BASELINE, help="save results as the baseline")
+    args = parser.parse_args()
+
+    configure_backend(args)
+
+    # The app prints as it starts and serves; keep that out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app
+        from app.session import issue_token
+        from benchmarks.seed import seed
+        from models import db
+        from models.assignments import assign_daily_challenges
+        from models.indexes import ensure_indexes
+        from models.leaderboards import build_snapshots
+
+        app = create_app()
+    started = time.perf_counter()
+    data = seed(args.users, args.teams, args.companies, args.years, args.completions_per_week, args.seed)
+    if args.backend == "mongod":
+        # seed() drops the collections, so indexes are created afterwards
+        for collection, error in ensure_indexes():
+            print(f"could not create index on {collection}: {error}", file=sys.stderr)
+    print(f"seeded {len(data['users'])} users, {args.teams} teams, {data['completions']} completions "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    # Without these the leaderboard and today scenarios would only read empty results
+    build_snapshots()
+    assign_daily_challenges()
+
+    with app.app_context():
+        tokens = {user_id: issue_token(user_id, team_id, company_id) for user_id, team_id, company_id in data["users"]}
+
+    rng = random.Random(args.seed)
+    results = {}
+    failed = []
+    print(f"{'scenario':24} {'ok':>6} {'errors':>6} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name in args.scenarios.split(","):
+        calls = build_calls(name, args.requests, data, tokens, rng)
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, statuses, wall = drive(app, calls, args.concurrency)
+        errors = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 500)
+        result = {
+            "ok": len(latencies),
+            "errors": errors,
+            "throughput": len(latencies) / wall if wall else 0.0,
+            "p50_ms": percentile(latencies, 0.50) if latencies else 0.0,
+            "p95_ms": percentile(latencies, 0.95) if latencies else 0.0,
+            "p99_ms": percentile(latencies, 0.99) if latencies else 0.0,
+            "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        }
+        results[name] = result
+        print(f"{name:24} {result['ok']:>6} {errors:>6} {result['throughput']:>9.1f} "
+              f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms  {result['statuses']}")
+        if not any(isinstance(status, int) and 200 <= status < 300 for status in statuses):
+            failed.append(name)
+
+    db.get_client().drop_database(args.db_name)
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            json.dump({
+                "backend": args.backend,
+                "scale": {"users": args.users, "teams": args.teams, "years": args.years,
+                          "requests": args.requests, "concurrency": args.concurrency},
+                "scenarios": {name: {"p95_ms": round(r["p95_ms"], 2), "p99_ms": round(r["p99_ms"], 2)}
+                              for name, r in results.items() if r["ok"]},
+            }, f, indent=2)
+        print(f"wrote baseline to {args.write_baseline}", file=sys.stderr)
+
+    for name in failed:
+        print(f"FAILED {name} got no 2xx responses; its timings are for error paths", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+mongomock as a stand-in for MongoDB, for the load test and the tests.
+
+install() points models.db at an in-memory mongomock client and covers the
+features the app uses that mongomock lacks or gets wrong:
+
+- RawBSONDocument reads: records decode plain dicts instead
+- find_one_and_update(return_document=AFTER) re-runs the filter after the
+  update, so guarded updates (complete, redeem) come back as None; the
+  updated document is looked up by _id instead
+- find_one_and_update with a projection that leaves out _id returns None;
+  the projection is applied to the whole document instead
+- bulk_write with pymongo 4.9+ operations (mongomock passes them a `sort`
+  argument it does not accept); operations are applied one at a time
+- $setWindowFields with $rank/$documentNumber, and $merge, as used by the
+  leaderboard snapshot build
+- time-series collections are created as plain collections
+- the async tier's AsyncMongoClient: the same client behind awaitable
+  methods, so both apps see the same data
+
+Must run before anything imports config or the models.
+"""
+import os
+import types
+
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany
+
+
+def install(db_name=None):
+    """
+    Configures the app for mongomock and returns the client.
+    """
+    import mongomock
+
+    os.environ["MONGO_URI"] = "mongodb://mongomock"
+    os.environ["MONGO_TLS"] = "false"
+    if db_name:
+        os.environ["MONGO_DB_NAME"] = db_name
+
+    from bson.codec_options import CodecOptions
+    from models import db, records
+
+    client = mongomock.MongoClient()
+    db._create_client = lambda: client
+    async_client = _AsyncClient(client)
+    db.get_async_client = lambda: async_client
+    records.RAW_OPTIONS = CodecOptions()
+    records.Record._decode = classmethod(lambda cls, document: cls.from_document(document))
+
+    _patch_find_one_and_update(mongomock.Collection)
+    mongomock.Collection.bulk_write = _bulk_write
+    _patch_aggregate(mongomock.Collection)
+    _patch_create_collection(mongomock.Database)
+    return client
+
+
+class _AsyncClient:
+    """
+    The parts of AsyncMongoClient the app uses, over a mongomock client.
+    Calls run inline; nothing is awaited on I/O.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getitem__(self, name):
+        return _AsyncDatabase(self._client[name])
+
+    async def close(self):
+        pass
+
+
+class _AsyncDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return _AsyncCollection(self._database[name])
+
+
+class _AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def with_options(self, **kwargs):
+        return _AsyncCollection(self._collection.with_options(**kwargs))
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursor(self._collection.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class _AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit):
+        self._cursor.limit(limit)
+        return self
+
+    async def to_list(self, length=None):
+        documents = list(self._cursor)
+        return documents[:length] if length else documents
+
+    async def __aiter__(self):
+        for document in self._cursor:
+            yield document
+
+
+def _patch_find_one_and_update(collection_class):
+    original = collection_class.find_one_and_update
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE, **kwargs):
+        if return_document != ReturnDocument.AFTER or upsert:
+            document = original(self, filter, update, None, sort, upsert, return_document, **kwargs)
+            return _project(document, projection)
+        before = original(self, filter, update, {"_id": 1}, sort, upsert, ReturnDocument.BEFORE, **kwargs)
+        if before is None:
+            return None
+        return self.find_one({"_id": before["_id"]}, projection)
+
+    collection_class.find_one_and_update = find_one_and_update
+
+
+def _project(document, projection):
+    """
+    Applies a projection of top-level fields to a document.
+    """
+    if document is None or not projection:
+        return document
+    fields = {name: bool(value) for name, value in projection.items()}
+    include_id = fields.pop("_id", True)
+    if any(fields.values()):
+        projected = {name: document[name] for name in fields if name in document}
+    else:
+        projected = {name: value for name, value in document.items() if name not in fields and name != "_id"}
+    if include_id and "_id" in document:
+        projected["_id"] = document["_id"]
+    return projected
+
+
+def _bulk_write(self, requests, ordered=True, **kwargs):
+    result = types.SimpleNamespace(
+        inserted_count=0, matched_count=0, modified_count=0, deleted_count=0, upserted_count=0, upserted_ids={},
+    )
+    for index, op in enumerate(requests):
+        if isinstance(op, InsertOne):
+            self.insert_one(op._doc)
+            result.inserted_count += 1
+            continue
+        if isinstance(op, (DeleteOne, DeleteMany)):
+            delete = self.delete_one if isinstance(op, DeleteOne) else self.delete_many
+            result.deleted_count += delete(op._filter).deleted_count
+            continue
+        if isinstance(op, ReplaceOne):
+            outcome = self.replace_one(op._filter, op._doc, upsert=op._upsert)
+        elif isinstance(op, UpdateMany):
+            outcome = self.update_many(op._filter, op._doc, upsert=op._upsert)
+        else:
+            outcome = self.update_one(op._filter, op._doc, upsert=op._upsert)
+        result.matched_count += outcome.matched_count
+        result.modified_count += outcome.modified_count
+        if outcome.upserted_id is not None:
+            result.upserted_count += 1
+            result.upserted_ids[index] = outcome.upserted_id
+    return result
+
+
+def _field(document, path):
+    for part in path.lstrip("$").split("."):
+        document = document.get(part) if isinstance(document, dict) else None
+    return document
+
+
+def _partition_key(document, partition):
+    if isinstance(partition, dict):
+        return tuple(_field(document, value) for value in partition.values())
+    return _field(document, partition)
+
+
+def _window_fields(documents, stage):
+    """
+    $setWindowFields for a single sortBy field with $rank and $documentNumber
+    outputs, the only form the app uses.
+    """
+    (sort_field, direction), = stage["sortBy"].items()
+    partitions = {}
+    for document in documents:
+        partitions.setdefault(_partition_key(document, stage.get("partitionBy")), []).append(document)
+    output = []
+    for members in partitions.values():
+        members.sort(key=lambda document: _field(document, sort_field) or 0, reverse=direction < 0)
+        rank, previous = 0, object()
+        for number, document in enumerate(members, 1):
+            value = _field(document, sort_field)
+            if value != previous:
+                rank, previous = number, value
+            for name, operator in stage["output"].items():
+                document[name] = rank if "$rank" in operator else number
+            output.append(document)
+    return output
+
+
+def _patch_aggregate(collection_class):
+    original = collection_class.aggregate
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        stages = [next(iter(stage)) for stage in pipeline]
+        if "$setWindowFields" not in stages and "$merge" not in stages:
+            return original(self, pipeline, *args, **kwargs)
+        merge = pipeline[-1]["$merge"] if stages[-1] == "$merge" else None
+        if merge:
+            pipeline, stages = pipeline[:-1], stages[:-1]
+        if "$setWindowFields" in stages:
+            split = stages.index("$setWindowFields")
+            documents = _window_fields(list(original(self, pipeline[:split])), pipeline[split]["$setWindowFields"])
+            scratch = self.database.get_collection(f"__window_{self.name}")
+            scratch.drop()
+            if documents:
+                scratch.insert_many(documents)
+            documents = list(original(scratch, pipeline[split + 1:])) if documents else []
+            scratch.drop()
+        else:
+            documents = list(original(self, pipeline))
+        if not merge:
+            return iter(documents)
+        target = self.database.get_collection(merge["into"])
+        for document in documents:
+            if "_id" in document:
+                target.replace_one({"_id": document["_id"]}, document, upsert=True)
+            else:
+                target.insert_one(document)
+        return iter([])
+
+    collection_class.aggregate = aggregate
+
+
+def _patch_create_collection(database_class):
+    original = database_class.create_collection
+
+    def create_collection(self, name, **kwargs):
+        kwargs.pop("timeseries", None)
+        return original(self, name, **kwargs)
+
+    database_class.create_collection = create_collection
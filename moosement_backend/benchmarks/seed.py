@@ -0,0 +1,131 @@
+"""
+Seeds a benchmark database with users, teams and years of completions.
+
+Data is generated from a fixed random seed, so two runs at the same scale
+produce the same documents. Everything in the target database's app
+collections is dropped first; never point this at production.
+"""
+import datetime
+import random
+
+from bson import ObjectId
+from werkzeug.security import generate_password_hash
+
+import config
+from models import db
+from models.challenges import DEFAULT_CHALLENGES as CHALLENGE_CATALOG
+from models.rewards import DEFAULT_REWARDS
+
+PASSWORD = "bench-password"
+DEPARTMENTS = ["engineering", "sales", "marketing", "finance", "operations"]
+CHALLENGE_POINTS = [10, 20, 30, 50]
+BATCH_SIZE = 10000
+
+
+def _insert_batches(collection, documents):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def seed(users=500, teams=25, companies=3, years=1, completions_per_week=3, random_seed=1234):
+    """
+    Drops and refills the app collections. Returns the ids the load test
+    needs: users (with team and company), challenge ids and reward names.
+    """
+    rng = random.Random(random_seed)
+    database = db.get_db()
+    for name in (db.USERS, db.TEAMS, db.CHALLENGES, db.REWARDS, db.COMPLETIONS,
+                 db.LEADERBOARD_ENTRIES, db.LEADERBOARD_SNAPSHOTS):
+        database.drop_collection(name)
+
+    challenges = [dict(challenge, points=rng.choice(CHALLENGE_POINTS)) for challenge in CHALLENGE_CATALOG]
+    database[db.CHALLENGES].insert_many(challenges)
+    rewards = [dict(reward) for reward in DEFAULT_REWARDS]
+    rewards.append({"name": "Flash Campaign Hoodie", "points_required": 100, "stock": max(1, users // 10)})
+    database[db.REWARDS].insert_many(rewards)
+
+    company_ids = [f"company-{index}" for index in range(companies)]
+    team_docs = [{
+        "team_id": f"team-{index:04d}",
+        "name": f"Team {index}",
+        "company_id": company_ids[index % companies],
+        "total_team_points": 0,
+        "members": [],
+    } for index in range(teams)]
+
+    # One hash for everyone; hashing each user would dominate seeding time
+    password_hash = generate_password_hash(PASSWORD, config.PASSWORD_HASH_METHOD)
+    today = datetime.datetime.utcnow().date()
+    days = years * 365
+    user_docs = []
+    completions = []
+    for index in range(users):
+        team = team_docs[index % teams] if teams else None
+        user = {
+            "_id": ObjectId(),
+            "name": f"Bench User {index}",
+            "email": f"bench-{index}@example.com",
+            "password": password_hash,
+            "company_id": team["company_id"] if team else company_ids[index % companies],
+            "department": rng.choice(DEPARTMENTS),
+            "team_id": team["team_id"] if team else None,
+            "role": "employee",
+            "redeemed_rewards": [],
+            "streaks": 0,
+            "last_active_day": None,
+            "last_completed": {},
+            "total_points": 0,
+            "points": 0,
+            "created_at": (today - datetime.timedelta(days=days)).isoformat(),
+            "updated_at": today.isoformat(),
+        }
+        user_docs.append(user)
+
+    for user in user_docs:
+        seen = set()
+        for _ in range(int(days / 7 * completions_per_week)):
+            day = (today - datetime.timedelta(days=rng.randrange(1, days + 1))).isoformat()
+            challenge = rng.choice(challenges)
+            if (day, challenge["_id"]) in seen:
+                continue
+            seen.add((day, challenge["_id"]))
+            completions.append({
+                "user_id": user["_id"],
+                "challenge_id": str(challenge["_id"]),
+                "challenge_name": challenge["name"],
+                "day": day,
+                "points_earned": challenge["points"],
+                "streak": 1,
+                "completed_at": f"{day}T12:00:00",
+            })
+            user["points"] += challenge["points"]
+            user["last_active_day"] = max(user["last_active_day"] or day, day)
+        user["total_points"] = user["points"]
+
+    _insert_batches(database[db.USERS], user_docs)
+    _insert_batches(database[db.COMPLETIONS], completions)
+
+    totals = {}
+    for user in user_docs:
+        if user["team_id"]:
+            totals[user["team_id"]] = totals.get(user["team_id"], 0) + user["total_points"]
+    for team in team_docs:
+        team["total_team_points"] = totals.get(team["team_id"], 0)
+        team["members"] = [str(user["_id"]) for user in user_docs if user["team_id"] == team["team_id"]]
+    if team_docs:
+        database[db.TEAMS].insert_many(team_docs)
+
+    return {
+        "users": [(user["_id"], user["team_id"], user["company_id"]) for user in user_docs],
+        "emails": [user["email"] for user in user_docs],
+        "companies": company_ids,
+        "challenge_ids": [str(challenge["_id"]) for challenge in challenges],
+        "reward_names": [reward["name"] for reward in rewards],
+        "completions": len(completions),
+    }
@@ -0,0 +1,252 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+import metrics
+
+# Structured logging for request handlers. log() only checks the level and
+# sampling and puts a dict on a bounded queue; a background thread turns
+# records into JSON lines and writes them in batches, so a handler never
+# waits on stdout. When the queue is full records are dropped and counted.
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+# (correlation id, endpoint, keep records below WARNING) for the request
+# being served; None outside a request
+current_request = contextvars.ContextVar("current_log_request", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+def parse_endpoint_settings(text, parse_value):
+    """
+    Parses "endpoint=value,endpoint=value" from config into a dict.
+    """
+    settings = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        endpoint, _, value = item.partition("=")
+        settings[endpoint.strip()] = parse_value(value.strip())
+    return settings
+
+
+class StructuredLogger:
+    """
+    Queues log records and writes them as JSON lines from a background thread.
+
+    Each endpoint can have its own minimum level and a sample rate for
+    records below WARNING; warnings and errors are always kept. Sampling is
+    decided once per request, so a sampled request keeps all its records.
+    A forked child starts with an empty queue and its own writer thread.
+    """
+
+    def __init__(self, name, stream=None):
+        self.name = name
+        self.stream = stream  # None writes to whatever sys.stdout is at the time
+        self.level = INFO
+        self.endpoint_levels = {}
+        self.sample_rates = {}
+        self.queue_size = 10000
+        self.batch_size = 256
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._queue = queue.Queue(self.queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._stopping = False
+        self._stats = {"written": 0, "dropped": 0, "sampled_out": 0, "write_errors": 0}
+
+    def configure(self, level, endpoint_levels, sample_rates, queue_size):
+        self.level = LEVELS[level.lower()]
+        self.endpoint_levels = parse_endpoint_settings(endpoint_levels, lambda value: LEVELS[value.lower()])
+        self.sample_rates = parse_endpoint_settings(sample_rates, float)
+        if queue_size != self.queue_size:
+            self.queue_size = queue_size
+            self._queue = queue.Queue(queue_size)
+
+    def start_request(self, endpoint, request_id=None):
+        """
+        Sets the correlation id and sampling decision for a request. Returns a
+        token for finish_request().
+        """
+        rate = self.sample_rates.get(endpoint, 1.0)
+        sampled = rate >= 1.0 or random.random() < rate
+        # Client-supplied ids are trimmed so they cannot bloat every log line
+        request_id = (request_id or "")[:64] or uuid.uuid4().hex
+        return current_request.set((request_id, endpoint or "none", sampled))
+
+    def finish_request(self, token):
+        current_request.reset(token)
+
+    def log(self, level, event, **fields):
+        context = current_request.get()
+        endpoint = context[1] if context else None
+        if level < self.endpoint_levels.get(endpoint, self.level):
+            return
+        if level < WARNING and context and not context[2]:
+            with self._lock:
+                self._stats["sampled_out"] += 1
+            return
+        record = {"ts": time.time(), "level": LEVEL_NAMES[level], "event": event}
+        if context:
+            record["request_id"], record["endpoint"] = context[0], endpoint
+        record.update(fields)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        self._ensure_thread()
+
+    def debug(self, event, **fields):
+        self.log(DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        self.log(INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self.log(WARNING, event, **fields)
+
+    def error(self, event, **fields):
+        self.log(ERROR, event, **fields)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != pid:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+                self._thread_pid = pid
+                self._thread.start()
+
+    def _drain(self, first):
+        """
+        Writes `first` and whatever else is already queued, up to a batch.
+        """
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+        stream = self.stream or sys.stdout
+        try:
+            stream.write(lines)
+            stream.flush()
+        except Exception:
+            with self._lock:
+                self._stats["write_errors"] += 1
+            return
+        with self._lock:
+            self._stats["written"] += len(batch)
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                record = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            self._drain(record)
+
+    def close(self):
+        """
+        Stops the writer thread and writes anything still queued.
+        """
+        self._stopping = True
+        while True:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._drain(record)
+
+
+logger = StructuredLogger("app-log")
+
+
+def collect():
+    return [(f"log_records_{key}", "gauge", {}, value) for key, value in sorted(logger.stats().items())]
+
+
+metrics.register_collector(collect)
+
+
+def _configure(config):
+    logger.configure(
+        config["LOG_LEVEL"], config["LOG_ENDPOINT_LEVELS"], config["LOG_SAMPLE_RATES"], config["LOG_QUEUE_SIZE"]
+    )
+
+
+def init_app(app):
+    """
+    Gives every Flask request a correlation id (from X-Request-ID, or a new
+    one), echoed back in the response, and applies per-endpoint sampling.
+    """
+    from flask import g, request
+
+    _configure(app.config)
+
+    @app.before_request
+    def _start():
+        g.log_token = logger.start_request(request.endpoint, request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    def _echo(response):
+        context = current_request.get()
+        if context:
+            response.headers[REQUEST_ID_HEADER] = context[0]
+        return response
+
+    @app.teardown_request
+    def _finish(_):
+        token = g.pop("log_token", None)
+        if token:
+            logger.finish_request(token)
+
+
+def init_async_app(app):
+    """
+    init_app() for the Quart app in app/aio.
+    """
+    from quart import g, request
+
+    _configure(app.config)
+
+    @app.before_request
+    async def _start():
+        g.log_token = logger.start_request(request.endpoint, request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    async def _echo(response):
+        context = current_request.get()
+        if context:
+            response.headers[REQUEST_ID_HEADER] = context[0]
+        return response
+
+    @app.teardown_request
+    async def _finish(_):
+        token = g.pop("log_token", None)
+        if token:
+            logger.finish_request(token)
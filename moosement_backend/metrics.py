@@ -0,0 +1,125 @@
+import contextvars
+import threading
+
+from flask import has_request_context, request
+
+# In-process metrics, exposed in Prometheus text format on /metrics.
+# Each worker process keeps its own counters.
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_buckets = {}  # name -> upper bounds
+_collectors = []  # callables returning [(name, type, labels dict, value)]
+_help = {}
+
+# Upper bounds in seconds for latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The RequestStats of the request being served. Set by app/instrumentation.py;
+# database threads started by db.run_parallel() run in a copy of this context.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def inc(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """
+    Records one value in a histogram.
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _buckets.setdefault(name, buckets)
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(_buckets[name]) + 2)
+        for index, bound in enumerate(_buckets[name]):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def register_collector(collector):
+    """
+    Adds a callable that is asked for current values at scrape time, for
+    state that lives elsewhere (e.g. buffer sizes). It returns a list of
+    (name, type, labels dict, value).
+    """
+    _collectors.append(collector)
+
+
+def current_endpoint():
+    """
+    The endpoint being served, or "none" outside a request.
+    """
+    stats = current_request.get()
+    if stats is not None:
+        return stats.endpoint
+    if has_request_context() and request.endpoint:
+        return request.endpoint
+    return "none"
+
+
+def observe_read(documents, size):
+    """
+    Counts documents and bytes read from Mongo against the current endpoint.
+    """
+    endpoint = current_endpoint()
+    inc("mongo_documents_read_total", documents, endpoint=endpoint)
+    inc("mongo_bytes_read_total", size, endpoint=endpoint)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _header(lines, name, kind):
+    if name in _help:
+        lines.append(f"# HELP {name} {_help[name]}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render():
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(series)) for key, series in _histograms.items())
+        buckets = dict(_buckets)
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            _header(lines, name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), series in histograms:
+        if name not in seen:
+            seen.add(name)
+            _header(lines, name, "histogram")
+        for bound, count in zip(buckets[name], series):
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {series[-1]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {series[-2]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {series[-1]}")
+
+    for collector in _collectors:
+        for name, kind, labels, value in collector():
+            if name not in seen:
+                seen.add(name)
+                _header(lines, name, kind)
+            lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+describe("mongo_documents_read_total", "Documents read from MongoDB through model records.")
+describe("mongo_bytes_read_total", "BSON bytes read from MongoDB through model records.")
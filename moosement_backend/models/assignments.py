@@ -0,0 +1,220 @@
+import datetime
+import hashlib
+import random
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, ReplaceOne
+
+import config
+from models import db
+from models.challenges import challenge_catalog
+
+users_collection = db.collection(db.USERS)
+assignments_collection = db.collection(db.DAILY_ASSIGNMENTS)
+
+# Each user's challenges for the day are picked by a nightly batch
+# (`flask assign-challenges`) and stored as one small document, so reading
+# "today's challenges" is a single _id lookup plus the in-memory catalog.
+
+# Daily Assignment Schema (for reference)
+ASSIGNMENT_SCHEMA = {
+    "_id": str,  # "<YYYY-MM-DD>:<user id>"
+    "day": str,  # UTC date, YYYY-MM-DD
+    "challenge_ids": list,  # In display order, the team's shared challenge first
+    "shared_id": str,  # Challenge everyone on the user's team has today (nullable)
+    "expires_at": datetime.datetime,  # Removed by the TTL index after this
+}
+
+# Indexes for assignments (created by models.indexes.ensure_indexes). Reads
+# go through _id; this one only lets MongoDB drop old days.
+INDEXES = [
+    IndexModel([("expires_at", ASCENDING)], name="expiry", expireAfterSeconds=0),
+]
+
+DEFAULT_CATEGORY = "general"
+
+# ---- Selection ----
+
+def assignment_id(user_id, day):
+    return f"{day}:{user_id}"
+
+
+def _rng(*parts):
+    """
+    A generator seeded from the parts, so the same user and day always get
+    the same picks in any process (hash() is randomized per process).
+    """
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def shared_challenge(team_id, day, challenge_ids):
+    """
+    The challenge a whole team shares on a day, or None without a team.
+    """
+    if not team_id or not challenge_ids:
+        return None
+    return _rng("team", team_id, day).choice(challenge_ids)
+
+
+def pick_challenges(challenges, recent, count, rng, shared=None):
+    """
+    Picks `count` challenge ids from catalog documents, starting with
+    `shared`. Challenges in `recent` (ids done in the last few days) are only
+    used when there are not enough others. Picks rotate through categories,
+    so a day mixes kinds of exercise instead of taking several of one.
+    """
+    categories = {str(c["_id"]): c.get("category") or DEFAULT_CATEGORY for c in challenges}
+    picked = [shared] if shared else []
+    used = {categories.get(shared)} if shared else set()
+
+    fresh = [cid for cid in categories if cid not in recent and cid != shared]
+    stale = [cid for cid in categories if cid in recent and cid != shared]
+    for pool in (fresh, stale):
+        by_category = {}
+        for cid in pool:
+            by_category.setdefault(categories[cid], []).append(cid)
+        for ids in by_category.values():
+            rng.shuffle(ids)
+        order = sorted(by_category)
+        rng.shuffle(order)
+        order.sort(key=lambda category: category in used)  # Unused categories first
+        while len(picked) < count and any(by_category.values()):
+            for category in order:
+                if by_category[category] and len(picked) < count:
+                    picked.append(by_category[category].pop())
+                    used.add(category)
+    return picked
+
+
+def _build_assignment(user, day, challenges, challenge_ids, count, since, shared_by_team):
+    """
+    The assignment document for one user. `user` needs _id, team_id and
+    last_completed.
+    """
+    team_id = user.get("team_id")
+    if team_id not in shared_by_team:
+        shared_by_team[team_id] = shared_challenge(team_id, day, challenge_ids)
+    shared = shared_by_team[team_id]
+    recent = {cid for cid, completed in (user.get("last_completed") or {}).items() if completed >= since}
+    picked = pick_challenges(challenges, recent, count, _rng("user", user["_id"], day), shared)
+    expires_at = datetime.datetime.combine(
+        datetime.date.fromisoformat(day), datetime.time()
+    ) + datetime.timedelta(days=config.ASSIGNMENT_RETENTION_DAYS)
+    return {
+        "_id": assignment_id(user["_id"], day),
+        "day": day,
+        "challenge_ids": picked,
+        "shared_id": shared,
+        "expires_at": expires_at,
+    }
+
+
+def _window(day):
+    day = day or datetime.datetime.utcnow().date()
+    since = (day - datetime.timedelta(days=config.ASSIGNMENT_RECENT_DAYS)).isoformat()
+    return day.isoformat(), since
+
+
+SELECTION_PROJECTION = {"_id": 1, "team_id": 1, "last_completed": 1}
+
+# ---- Helper Functions ----
+
+def assign_daily_challenges(day=None, count=None, batch_size=1000):
+    """
+    Picks every user's challenges for `day` (default today, UTC) and writes
+    them with batched, unordered bulk writes. Recent history comes from the
+    last_completed map already on each user, so the job is one pass over
+    users. Picks are deterministic, so rerunning for the same day rewrites
+    the same sets unless the catalog or history changed. Returns the number
+    of users assigned.
+    """
+    day, since = _window(day)
+    count = count or config.DAILY_CHALLENGE_COUNT
+    challenges = challenge_catalog.reload().documents
+    if not challenges:
+        return 0
+    challenge_ids = sorted(str(challenge["_id"]) for challenge in challenges)
+    shared_by_team = {}
+
+    assigned = 0
+    batch = []
+    for user in users_collection.find({}, SELECTION_PROJECTION, batch_size=batch_size):
+        assignment = _build_assignment(user, day, challenges, challenge_ids, count, since, shared_by_team)
+        batch.append(ReplaceOne({"_id": assignment["_id"]}, assignment, upsert=True))
+        if len(batch) >= batch_size:
+            assignments_collection.bulk_write(batch, ordered=False)
+            assigned += len(batch)
+            batch = []
+    if batch:
+        assignments_collection.bulk_write(batch, ordered=False)
+        assigned += len(batch)
+    return assigned
+
+
+def _fallback_assignment(user, day, since, snapshot):
+    """
+    Builds an assignment for a user the batch has not covered (e.g. one who
+    registered today).
+    """
+    return _build_assignment(
+        user, day, snapshot.documents, sorted(snapshot.ids), config.DAILY_CHALLENGE_COUNT, since, {}
+    )
+
+
+def _insert_if_missing(assignment):
+    fields = {key: value for key, value in assignment.items() if key != "_id"}
+    return {"_id": assignment["_id"]}, {"$setOnInsert": fields}
+
+
+def todays_assignment(user_id, day=None):
+    """
+    Returns the user's assignment for today: one _id lookup. A user the
+    nightly batch missed gets one built and stored on the spot. Returns None
+    if the user does not exist.
+    """
+    day, since = _window(day)
+    assignment = assignments_collection.find_one({"_id": assignment_id(user_id, day)})
+    if assignment is not None:
+        return assignment
+    user = users_collection.find_one({"_id": ObjectId(user_id)}, SELECTION_PROJECTION)
+    if user is None:
+        return None
+    # $setOnInsert keeps an assignment the batch wrote in the meantime
+    assignment = _fallback_assignment(user, day, since, challenge_catalog.snapshot())
+    assignments_collection.update_one(*_insert_if_missing(assignment), upsert=True)
+    return assignment
+
+
+async def todays_assignment_async(user_id, day=None):
+    """
+    todays_assignment() on the async client.
+    """
+    day, since = _window(day)
+    collection = db.get_async_collection(db.DAILY_ASSIGNMENTS)
+    assignment = await collection.find_one({"_id": assignment_id(user_id, day)})
+    if assignment is not None:
+        return assignment
+    user = await db.get_async_collection(db.USERS).find_one({"_id": ObjectId(user_id)}, SELECTION_PROJECTION)
+    if user is None:
+        return None
+    assignment = _fallback_assignment(user, day, since, await challenge_catalog.snapshot_async())
+    await collection.update_one(*_insert_if_missing(assignment), upsert=True)
+    return assignment
+
+
+def resolve_assignment(assignment, snapshot):
+    """
+    Turns an assignment's ids into challenge details from a catalog snapshot.
+    Challenges removed from the catalog since the assignment are skipped.
+    """
+    challenges = []
+    for challenge_id in assignment["challenge_ids"]:
+        challenge = snapshot.by_key.get(challenge_id)
+        if challenge is None:
+            continue
+        details = {key: value for key, value in challenge.items() if key != "_id"}
+        details["challenge_id"] = challenge_id
+        details["shared"] = challenge_id == assignment.get("shared_id")
+        challenges.append(details)
+    return challenges
@@ -0,0 +1,122 @@
+import bisect
+import threading
+import time
+
+import config
+from models import db
+
+
+class CatalogSnapshot:
+    """
+    One loaded copy of a catalog collection. `rendered` holds response bodies
+    built from this snapshot so they are serialized once, not per request.
+    """
+
+    __slots__ = ("documents", "ids", "by_key", "version", "loaded_at", "rendered")
+
+    def __init__(self, documents, by_key, version, loaded_at):
+        self.documents = documents  # Sorted by _id
+        self.ids = [str(document["_id"]) for document in documents]
+        self.by_key = by_key
+        self.version = version
+        self.loaded_at = loaded_at
+        self.rendered = {}
+
+    def page_after(self, after_id, limit):
+        """
+        Returns up to `limit` documents whose _id sorts after `after_id`
+        (from the start if None).
+        """
+        start = bisect.bisect_right(self.ids, after_id) if after_id else 0
+        return self.documents[start:start + limit]
+
+
+class CatalogCache:
+    """
+    In-process cache of a small collection that is read on every request but
+    only written when it is seeded (challenges, rewards).
+
+    Entries expire after `ttl` seconds, which bounds how stale another worker
+    can be after a write. Writers in this process call invalidate() so the next
+    read reloads right away.
+    """
+
+    def __init__(self, collection_name, key="_id", ttl=None, miss_reload_seconds=30):
+        self.collection_name = collection_name
+        self.collection = db.collection(collection_name)
+        self.key = key
+        self.ttl = config.CATALOG_TTL_SECONDS if ttl is None else ttl
+        self.miss_reload_seconds = miss_reload_seconds
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """
+        Reads the whole collection and replaces the cached snapshot.
+        """
+        return self._install(list(self.collection.find({}).sort("_id", 1)))
+
+    async def reload_async(self):
+        """
+        reload() on the async client.
+        """
+        cursor = db.get_async_collection(self.collection_name).find({}).sort("_id", 1)
+        return self._install(await cursor.to_list())
+
+    def _install(self, documents):
+        by_key = {str(document.get(self.key)): document for document in documents}
+        with self._lock:
+            self._version += 1
+            snapshot = CatalogSnapshot(documents, by_key, self._version, time.monotonic())
+            self._snapshot = snapshot
+        return snapshot
+
+    def snapshot(self):
+        """
+        Returns the cached snapshot, reloading it if missing or expired.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > self.ttl:
+            snapshot = self.reload()
+        return snapshot
+
+    async def snapshot_async(self):
+        """
+        snapshot() for the async tier; only a reload touches the database.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > self.ttl:
+            snapshot = await self.reload_async()
+        return snapshot
+
+    def get(self, key):
+        """
+        Returns one document by key, or None. An unknown key reloads the
+        catalog at most once per miss_reload_seconds, so new entries show up
+        before the TTL runs out without letting bad keys hammer the database.
+        """
+        key = str(key)
+        snapshot = self.snapshot()
+        document = snapshot.by_key.get(key)
+        if document is None and time.monotonic() - snapshot.loaded_at > self.miss_reload_seconds:
+            document = self.reload().by_key.get(key)
+        return document
+
+    async def get_async(self, key):
+        """
+        get() for the async tier.
+        """
+        key = str(key)
+        snapshot = await self.snapshot_async()
+        document = snapshot.by_key.get(key)
+        if document is None and time.monotonic() - snapshot.loaded_at > self.miss_reload_seconds:
+            document = (await self.reload_async()).by_key.get(key)
+        return document
+
+    def invalidate(self):
+        """
+        Drops the cached snapshot; call after writing to the collection.
+        """
+        with self._lock:
+            self._snapshot = None
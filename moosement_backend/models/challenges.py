@@ -0,0 +1,73 @@
+from pymongo import UpdateOne
+
+from models import db
+from models.catalog import CatalogCache
+
+# The challenge catalog is small and only changes when it is seeded, so it is
+# kept in memory and completions can look challenges up without a round trip.
+challenge_catalog = CatalogCache(db.CHALLENGES, key="_id")
+
+# Seeded by `flask seed-challenges`. The category spreads each day's
+# assignment across kinds of exercise (see models/assignments.py).
+DEFAULT_CHALLENGES = [
+    {"name": "Step Sprint", "description": "Take 5,000 steps before lunch.", "category": "cardio"},
+    {"name": "Stairway to Success", "description": "Use the stairs exclusively and hit 20 flights by the end of the day.", "category": "cardio"},
+    {"name": "Deskercise Challenge", "description": "Complete 10 desk-friendly exercises throughout the day.", "category": "strength"},
+    {"name": "Walk & Talk", "description": "Take a 10-minute walking meeting instead of sitting.", "category": "cardio"},
+    {"name": "Water Break Walks", "description": "Take a 2-minute walking break every time you drink water.", "category": "cardio"},
+    {"name": "Lunchtime Sweat", "description": "Complete a 15-minute workout during lunch.", "category": "cardio"},
+    {"name": "Standing Ovation", "description": "Stand for at least 5 minutes every hour.", "category": "mobility"},
+    {"name": "Push-up Power", "description": "Complete 50 push-ups throughout the workday.", "category": "strength"},
+    {"name": "Squat It Out", "description": "Do 10 squats every hour.", "category": "strength"},
+    {"name": "Plank Challenge", "description": "Accumulate 5 minutes of planking before the workday ends.", "category": "strength"},
+    {"name": "Calf Raise Count", "description": "Hit 100 calf raises throughout the day.", "category": "strength"},
+    {"name": "Wall Sit Warrior", "description": "Complete 5 minutes of wall sits throughout the day.", "category": "strength"},
+    {"name": "Chair Dips for Days", "description": "Complete 50 chair dips before the day ends.", "category": "strength"},
+    {"name": "Jumping Jack Attack", "description": "Do 20 jumping jacks every hour.", "category": "cardio"},
+    {"name": "Tight Core Tuesday", "description": "Engage your core by holding a 30-second stomach vacuum every hour.", "category": "strength"},
+    {"name": "Lunges All Day", "description": "Do 5 lunges every time you get up from your chair.", "category": "strength"},
+    {"name": "Skipping Steps", "description": "Skip every other step when taking the stairs.", "category": "cardio"},
+    {"name": "Balance Breaks", "description": "Stand on one foot for 30 seconds every time you check your phone.", "category": "mobility"},
+    {"name": "Quick Cardio Burst", "description": "Complete a 60-second cardio burst 3 times during the workday.", "category": "cardio"},
+    {"name": "Stretch & Breathe", "description": "Do a full-body stretch every 90 minutes.", "category": "mobility"},
+    {"name": "Elevator Ban", "description": "Take only the stairs all day.", "category": "cardio"},
+    {"name": "Desk to Door Dashes", "description": "Walk outside for fresh air at least three times.", "category": "cardio"},
+    {"name": "Seated Spine Stretch", "description": "Perform a 30-second seated spinal twist every hour to relieve tension.", "category": "mobility"},
+    {"name": "Deep Breathing Reset", "description": "Pause for 60 seconds of deep breathing every two hours to refresh your mind.", "category": "mindfulness"},
+    {"name": "Neck & Shoulder Release", "description": "Roll your shoulders and stretch your neck for 1 minute every hour.", "category": "mobility"},
+    {"name": "Mindful Walk", "description": "Take a slow, mindful 5-minute walk during your break, focusing on each step.", "category": "mindfulness"},
+    {"name": "Wrist & Hand Mobility", "description": "Stretch your wrists and fingers for 30 seconds every 90 minutes to avoid stiffness.", "category": "mobility"},
+    {"name": "Eye Relaxation", "description": "Follow the 20-20-20 rule: every 20 minutes, look at something 20 feet away for 20 seconds.", "category": "mindfulness"},
+    {"name": "Standing Hamstring Stretch", "description": "Perform a standing hamstring stretch for 30 seconds on each leg twice a day.", "category": "mobility"},
+    {"name": "Seated Forward Fold", "description": "Bend forward in your chair, reaching for your toes, and hold for 30 seconds to improve flexibility.", "category": "mobility"},
+    {"name": "Burst of Energy", "description": "Perform 30 seconds of high-intensity cardio every hour to keep your heart rate up.", "category": "cardio"}
+]
+
+# ---- Helper Functions ----
+
+def get_challenge(challenge_id):
+    """
+    Returns a challenge from the in-memory catalog, or None if it does not exist.
+    """
+    return challenge_catalog.get(challenge_id)
+
+
+def invalidate_catalog():
+    """
+    Drops the in-memory catalog so the next lookup reloads it.
+    """
+    challenge_catalog.invalidate()
+
+
+def seed_challenges(challenges=DEFAULT_CHALLENGES):
+    """
+    Inserts any of the given challenges not already present, matched by name.
+    Safe to run repeatedly. Returns the number inserted.
+    """
+    result = db.get_collection(db.CHALLENGES).bulk_write([
+        UpdateOne({"name": challenge["name"]}, {"$setOnInsert": dict(challenge)}, upsert=True)
+        for challenge in challenges
+    ], ordered=False)
+    if result.upserted_count:
+        invalidate_catalog()
+    return result.upserted_count
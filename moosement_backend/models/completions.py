@@ -0,0 +1,216 @@
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from models import db
+
+completions_collection = db.collection(db.COMPLETIONS)
+users_collection = db.collection(db.USERS)
+
+# Completion Schema (for reference)
+COMPLETION_SCHEMA = {
+    "user_id": ObjectId,  # User who completed the challenge
+    "challenge_id": str,  # Challenge that was completed
+    "challenge_name": str,
+    "day": str,  # UTC date of the completion, YYYY-MM-DD
+    "points_earned": int,
+    "streak": int,  # Streak after this completion
+    "completed_at": str,  # Timestamp
+}
+
+DUPLICATE_KEY = 11000
+
+HISTORY_PROJECTION = {"_id": 0, "user_id": 0, "day": 0}
+HISTORY_SORT = [("completed_at", DESCENDING)]  # Newest first
+HISTORY_DEFAULT_LIMIT = 20
+HISTORY_MAX_LIMIT = 100
+
+
+# Indexes for completions (created by models.indexes.ensure_indexes). The
+# unique index is what stops a challenge being completed twice in one day.
+INDEXES = [
+    IndexModel(
+        [("user_id", ASCENDING), ("challenge_id", ASCENDING), ("day", ASCENDING)],
+        unique=True,
+        name="one_completion_per_day",
+    ),
+    IndexModel([("user_id", ASCENDING), ("completed_at", DESCENDING)], name="user_history"),
+]
+
+# ---- Helper Functions ----
+
+def _completion_document(user_id, challenge_id, challenge_name, points_earned, streak, completed_at):
+    return {
+        "user_id": ObjectId(user_id),
+        "challenge_id": str(challenge_id),
+        "challenge_name": challenge_name,
+        "day": completed_at[:10],
+        "points_earned": points_earned,
+        "streak": streak,
+        "completed_at": completed_at,
+    }
+
+
+def record_completion(user_id, challenge_id, challenge_name, points_earned, streak, completed_at):
+    """
+    Stores a completion. Returns False if the user already completed this
+    challenge on the same day.
+    """
+    completion = _completion_document(user_id, challenge_id, challenge_name, points_earned, streak, completed_at)
+    try:
+        completions_collection.insert_one(completion)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def record_completion_async(user_id, challenge_id, challenge_name, points_earned, streak, completed_at):
+    """
+    record_completion() on the async client.
+    """
+    completion = _completion_document(user_id, challenge_id, challenge_name, points_earned, streak, completed_at)
+    try:
+        await db.get_async_collection(db.COMPLETIONS).insert_one(completion)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def completed_days_query(user_ids, days):
+    return {"user_id": {"$in": list(user_ids)}, "day": {"$in": list(days)}}
+
+
+def get_completed_days(user_ids, days):
+    """
+    Returns the (user_id, challenge_id, day) triples already recorded for the
+    given users on the given days, in one indexed query.
+    """
+    completions = completions_collection.find(
+        completed_days_query(user_ids, days),
+        {"_id": 0, "user_id": 1, "challenge_id": 1, "day": 1},
+    )
+    return {(c["user_id"], c["challenge_id"], c["day"]) for c in completions}
+
+
+def insert_completions(completions):
+    """
+    Inserts many completion records, skipping any that already exist.
+    Returns the number inserted.
+    """
+    if not completions:
+        return 0
+    try:
+        return len(completions_collection.insert_many(completions, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        return e.details.get("nInserted", 0)
+
+
+def get_last_completion(user_id):
+    """
+    Returns the user's most recent completion, or None.
+    """
+    return completions_collection.find_one(history_query(user_id), HISTORY_PROJECTION, sort=HISTORY_SORT)
+
+
+def history_query(user_id, before=None):
+    query = {"user_id": ObjectId(user_id)}
+    if before:
+        query["completed_at"] = {"$lt": before}
+    return query
+
+
+def get_completion_history(user_id, limit=HISTORY_DEFAULT_LIMIT, before=None):
+    """
+    Returns one page of a user's completions, newest first. Pass the
+    completed_at of the last item as `before` to get the next page; the
+    (user_id, completed_at) index makes every page cost the same.
+    """
+    cursor = (
+        completions_collection.find(history_query(user_id, before), HISTORY_PROJECTION)
+        .sort(HISTORY_SORT)
+        .limit(limit)
+    )
+    return list(cursor)
+
+
+async def get_completion_history_async(user_id, limit=HISTORY_DEFAULT_LIMIT, before=None):
+    """
+    get_completion_history() on the async client.
+    """
+    cursor = (
+        db.get_async_collection(db.COMPLETIONS).find(history_query(user_id, before), HISTORY_PROJECTION)
+        .sort(HISTORY_SORT)
+        .limit(limit)
+    )
+    return await cursor.to_list()
+
+
+def migrate_embedded_completions(batch_size=500):
+    """
+    Copies completions stored in users' completed_challenges arrays into the
+    completions collection and removes the arrays. Safe to run more than once.
+    Returns the number of users migrated.
+    """
+    migrated = 0
+    users = users_collection.find(
+        {"completed_challenges.0": {"$exists": True}},
+        {"completed_challenges": 1},
+        batch_size=batch_size,
+    )
+    for user in users:
+        documents = []
+        for completed in user["completed_challenges"]:
+            if not isinstance(completed, dict) or not completed.get("completed_at"):
+                continue
+            completed_at = completed["completed_at"]
+            documents.append({
+                "user_id": user["_id"],
+                "challenge_id": str(completed.get("challenge_id")),
+                "challenge_name": completed.get("challenge_name"),
+                "day": completed_at[:10],
+                "points_earned": completed.get("points_earned", 0),
+                "streak": completed.get("streak", 0),
+                "completed_at": completed_at,
+            })
+        if documents:
+            try:
+                completions_collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Already-migrated entries hit the unique index; any other
+                # failure stops before the user's history is removed
+                errors = e.details.get("writeErrors", [])
+                if e.details.get("writeConcernErrors") or any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+        users_collection.update_one({"_id": user["_id"]}, {"$unset": {"completed_challenges": ""}})
+        migrated += 1
+    return migrated
+
+
+def backfill_user_activity(batch_size=1000):
+    """
+    Sets last_active_day and last_completed on users from their recorded
+    completions, so streaks and the once-a-day check keep working for history
+    from before those fields existed. $max keeps any later day a completion
+    has written since. Safe to run more than once. Returns the number of
+    users updated.
+    """
+    pipeline = [
+        {"$group": {"_id": {"user_id": "$user_id", "challenge_id": "$challenge_id"}, "day": {"$max": "$day"}}},
+        {"$group": {
+            "_id": "$_id.user_id",
+            "last_active_day": {"$max": "$day"},
+            "days": {"$push": {"challenge_id": "$_id.challenge_id", "day": "$day"}},
+        }},
+    ]
+    updated = 0
+    batch = []
+    for user in completions_collection.aggregate(pipeline, allowDiskUse=True):
+        fields = {"last_active_day": user["last_active_day"]}
+        for completed in user["days"]:
+            fields[f"last_completed.{completed['challenge_id']}"] = completed["day"]
+        batch.append(UpdateOne({"_id": user["_id"]}, {"$max": fields}))
+        if len(batch) >= batch_size:
+            updated += users_collection.bulk_write(batch, ordered=False).matched_count
+            batch = []
+    if batch:
+        updated += users_collection.bulk_write(batch, ordered=False).matched_count
+    return updated
@@ -0,0 +1,218 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import AsyncMongoClient
+from pymongo.mongo_client import MongoClient
+from pymongo.server_api import ServerApi
+from werkzeug.local import LocalProxy
+
+import config
+
+# Collection names
+USERS = "user_data"
+TEAMS = "team_data"
+CHALLENGES = "challenge_data"
+REWARDS = "rewards_data"
+COMPLETIONS = "challenge_completions"
+EXERCISE_EVENTS = "exercise_events"
+DAILY_ACTIVITY = "daily_activity"
+LEADERBOARD_ENTRIES = "leaderboard_entries"
+LEADERBOARD_SNAPSHOTS = "leaderboard_snapshots"
+DAILY_ASSIGNMENTS = "daily_assignments"
+INVITES = "invites"
+IMPORT_JOBS = "import_jobs"
+
+# Settings used to build the client. create_app() overrides these from
+# app.config through init_app(); scripts fall back to the values in config.py.
+_settings = {
+    "MONGO_URI": config.MONGO_URI,
+    "MONGO_TLS": config.MONGO_TLS,
+    "MONGO_DB_NAME": config.MONGO_DB_NAME,
+    "MONGO_MAX_POOL_SIZE": config.MONGO_MAX_POOL_SIZE,
+    "MONGO_MIN_POOL_SIZE": config.MONGO_MIN_POOL_SIZE,
+    "MONGO_MAX_IDLE_TIME_MS": config.MONGO_MAX_IDLE_TIME_MS,
+    "MONGO_CONNECT_TIMEOUT_MS": config.MONGO_CONNECT_TIMEOUT_MS,
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    "MONGO_SOCKET_TIMEOUT_MS": config.MONGO_SOCKET_TIMEOUT_MS,
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    "MONGO_WRITE_CONCERN": config.MONGO_WRITE_CONCERN,
+    "MONGO_JOURNAL": config.MONGO_JOURNAL,
+}
+
+_client = None
+_client_pid = None
+_async_client = None
+_async_client_pid = None
+_lock = threading.Lock()
+
+# Threads for issuing independent writes at the same time
+PARALLEL_WORKERS = 8
+_executor = None
+_executor_pid = None
+
+
+def init_app(app):
+    """
+    Copies the Mongo settings from the Flask config. No connection is opened
+    here; the client is created on first use in each worker process.
+    """
+    for key in _settings:
+        app.config.setdefault(key, _settings[key])
+    configure(**{key: app.config[key] for key in _settings})
+    app.extensions["mongo"] = get_client
+
+
+def configure(**settings):
+    """
+    Updates client settings. Takes effect the next time a client is created.
+    """
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise KeyError(f"Unknown Mongo settings: {', '.join(sorted(unknown))}")
+    _settings.update(settings)
+
+
+def _write_concern(value):
+    """
+    Env values are strings, but a node count must be passed as an int.
+    """
+    return int(value) if str(value).isdigit() else value
+
+
+def _client_options():
+    options = {
+        "server_api": ServerApi('1'),
+        "tls": _settings["MONGO_TLS"],
+        "maxPoolSize": _settings["MONGO_MAX_POOL_SIZE"],
+        "minPoolSize": _settings["MONGO_MIN_POOL_SIZE"],
+        "maxIdleTimeMS": _settings["MONGO_MAX_IDLE_TIME_MS"],
+        "connectTimeoutMS": _settings["MONGO_CONNECT_TIMEOUT_MS"],
+        "serverSelectionTimeoutMS": _settings["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+        "socketTimeoutMS": _settings["MONGO_SOCKET_TIMEOUT_MS"],
+        "waitQueueTimeoutMS": _settings["MONGO_WAIT_QUEUE_TIMEOUT_MS"],
+        "w": _write_concern(_settings["MONGO_WRITE_CONCERN"]),
+        "journal": _settings["MONGO_JOURNAL"],
+    }
+    if _settings["MONGO_TLS"]:
+        import certifi  # Only needed for TLS; keeps it off the import path otherwise
+        options["tlsCAFile"] = certifi.where()
+    return options
+
+
+def _create_client():
+    return MongoClient(_settings["MONGO_URI"], **_client_options())
+
+
+def get_client():
+    """
+    Returns this process's MongoClient, creating it on first use.
+    A client inherited through fork() is never reused; the child builds its own.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = _create_client()
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    return get_client()[_settings["MONGO_DB_NAME"]]
+
+
+def get_collection(name):
+    return get_db()[name]
+
+
+def collection(name):
+    """
+    Returns a proxy that resolves to the named collection on each access, so
+    modules can hold collections at import time without connecting.
+    """
+    return LocalProxy(lambda: get_collection(name))
+
+
+def get_async_client():
+    """
+    Returns this process's AsyncMongoClient for the async tier (app/aio),
+    creating it on first use. It is only used from the serving event loop.
+    """
+    global _async_client, _async_client_pid
+    pid = os.getpid()
+    if _async_client is None or _async_client_pid != pid:
+        _async_client = AsyncMongoClient(_settings["MONGO_URI"], **_client_options())
+        _async_client_pid = pid
+    return _async_client
+
+
+def get_async_collection(name):
+    return get_async_client()[_settings["MONGO_DB_NAME"]][name]
+
+
+async def close_async():
+    global _async_client, _async_client_pid
+    if _async_client is not None and _async_client_pid == os.getpid():
+        await _async_client.close()
+    _async_client = None
+    _async_client_pid = None
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=PARALLEL_WORKERS, thread_name_prefix="mongo")
+                _executor_pid = pid
+    return _executor
+
+
+def run_parallel(*calls):
+    """
+    Runs independent database calls at the same time so they cost one round
+    trip of latency instead of one each. Returns their results in order;
+    a call that raised returns its exception instead.
+    """
+    # Each call runs in a copy of the caller's context, so per-request
+    # state (e.g. metrics) follows it onto the pool thread
+    futures = [_get_executor().submit(contextvars.copy_context().run, call) for call in calls]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def close():
+    """
+    Closes this process's client (e.g. at shutdown).
+    """
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def _reset_after_fork():
+    # The parent's sockets must not be shared; drop the reference without closing.
+    global _client, _client_pid, _lock, _executor, _executor_pid, _async_client, _async_client_pid
+    _client = None
+    _client_pid = None
+    _async_client = None
+    _async_client_pid = None
+    _executor = None
+    _executor_pid = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
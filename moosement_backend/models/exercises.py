@@ -0,0 +1,194 @@
+import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+from models import db
+
+events_collection = db.collection(db.EXERCISE_EVENTS)
+daily_collection = db.collection(db.DAILY_ACTIVITY)
+users_collection = db.collection(db.USERS)
+
+# Points awarded per unit of each exercise type
+EXERCISE_MULTIPLIERS = {
+    "running": 10,  # points per mile
+    "walking": 5,   # points per mile
+    "cycling": 8,   # points per mile
+    "swimming": 5, # points per lap 25m
+    "rowing": 12,   # points per 500m
+    "strength_training": 5,  # points per 10 min
+    "yoga": 3,      # points per 10 min
+    "other": 4      # points per 10 min
+}
+
+# Exercise Event Schema (for reference)
+EXERCISE_EVENT_SCHEMA = {
+    "logged_at": datetime.datetime,  # Time field of the time-series collection
+    "meta": dict,  # {"user_id": ObjectId, "team_id": str}
+    "exercise_type": str,
+    "value": float,  # distance in miles, laps, or time in minutes
+    "points_earned": int,
+}
+
+# Daily Rollup Schema (for reference), one per user or team per day
+DAILY_ACTIVITY_SCHEMA = {
+    "scope": str,  # "user" or "team"
+    "owner_id": str,  # User or team ID
+    "day": str,  # UTC date, YYYY-MM-DD
+    "points": int,
+    "exercise_count": int,
+    "by_type": dict,  # exercise_type -> {"value": float, "points": int}
+}
+
+ROLLUP_PROJECTION = {"_id": 0, "scope": 0, "owner_id": 0}
+ROLLUP_SORT = [("day", DESCENDING)]  # Newest first
+HISTORY_MAX_DAYS = 90
+
+
+def ensure_event_collection():
+    """
+    Creates the exercise event time-series collection (no-op if it exists).
+    Falls back to a plain collection on servers without time-series support.
+    """
+    database = db.get_db()
+    try:
+        database.create_collection(
+            db.EXERCISE_EVENTS,
+            timeseries={"timeField": "logged_at", "metaField": "meta", "granularity": "minutes"},
+        )
+    except CollectionInvalid:
+        pass  # Already exists
+    except OperationFailure:
+        database.create_collection(db.EXERCISE_EVENTS)
+
+
+# Indexes for exercise data (created by models.indexes.ensure_indexes)
+EVENT_INDEXES = [
+    IndexModel([("meta.user_id", ASCENDING), ("logged_at", DESCENDING)], name="user_events"),
+]
+DAILY_INDEXES = [
+    IndexModel(
+        [("scope", ASCENDING), ("owner_id", ASCENDING), ("day", DESCENDING)],
+        unique=True,
+        name="owner_day",
+    ),
+]
+
+# ---- Helper Functions ----
+
+def is_exercise_type(exercise_type):
+    return isinstance(exercise_type, str) and exercise_type in EXERCISE_MULTIPLIERS
+
+
+def calculate_points(exercise_type, value):
+    """
+    Converts a logged exercise (distance in miles, laps, or time in minutes)
+    into points.
+    """
+    multiplier = EXERCISE_MULTIPLIERS.get(exercise_type, EXERCISE_MULTIPLIERS["other"])
+    if exercise_type in ["running", "walking", "cycling"]:
+        return int(value * multiplier)
+    elif exercise_type in ["swimming", "rowing"]:
+        return int(value * multiplier)
+    else:  # timed activities
+        return int((value / 10) * multiplier)
+
+
+def build_event(user_id, team_id, exercise_type, value, points_earned, logged_at):
+    return {
+        "logged_at": logged_at,
+        "meta": {"user_id": ObjectId(user_id), "team_id": team_id},
+        "exercise_type": exercise_type,
+        "value": value,
+        "points_earned": points_earned,
+    }
+
+
+def _rollup_update(scope, owner_id, day, exercise_type, value, points_earned, count):
+    # Unknown types are bucketed as "other" so client input never becomes a field name
+    bucket = exercise_type if exercise_type in EXERCISE_MULTIPLIERS else "other"
+    return UpdateOne(
+        {"scope": scope, "owner_id": str(owner_id), "day": day},
+        {"$inc": {
+            "points": points_earned,
+            "exercise_count": count,
+            f"by_type.{bucket}.value": value,
+            f"by_type.{bucket}.points": points_earned,
+        }},
+        upsert=True,
+    )
+
+
+def record_events(events):
+    """
+    Stores exercise events and folds them into the per-user and per-team
+    daily rollups. Events for the same owner, day and type are merged into a
+    single $inc before writing.
+    """
+    if not events:
+        return
+    merged = {}
+    for event in events:
+        day = event["logged_at"].date().isoformat()
+        owners = [("user", event["meta"]["user_id"])]
+        if event["meta"].get("team_id"):
+            owners.append(("team", event["meta"]["team_id"]))
+        for scope, owner_id in owners:
+            key = (scope, str(owner_id), day, event["exercise_type"])
+            totals = merged.setdefault(key, [0, 0, 0])
+            totals[0] += event["value"]
+            totals[1] += event["points_earned"]
+            totals[2] += 1
+
+    operations = [
+        _rollup_update(scope, owner_id, day, exercise_type, value, points, count)
+        for (scope, owner_id, day, exercise_type), (value, points, count) in merged.items()
+    ]
+    for result in db.run_parallel(
+        lambda: events_collection.insert_many(events, ordered=False),
+        lambda: daily_collection.bulk_write(operations, ordered=False),
+    ):
+        if isinstance(result, Exception):
+            raise result
+
+
+def daily_activity_query(scope, owner_id, days):
+    since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=days - 1)).isoformat()
+    return {"scope": scope, "owner_id": str(owner_id), "day": {"$gte": since}}
+
+
+def get_daily_activity(scope, owner_id, days):
+    """
+    Returns the last `days` daily rollups for a user or team, newest first.
+    """
+    cursor = daily_collection.find(daily_activity_query(scope, owner_id, days), ROLLUP_PROJECTION).sort(ROLLUP_SORT)
+    return list(cursor)
+
+
+def migrate_logged_exercises(batch_size=500):
+    """
+    Moves exercises stored in users' logged_exercises arrays into the event
+    collection and rollups, then removes the arrays. Run it once; a user
+    interrupted between the two steps would be counted twice on a rerun.
+    Returns the number of users migrated.
+    """
+    migrated = 0
+    users = users_collection.find(
+        {"logged_exercises.0": {"$exists": True}},
+        {"logged_exercises": 1, "team_id": 1},
+        batch_size=batch_size,
+    )
+    for user in users:
+        events = []
+        for exercise in user["logged_exercises"]:
+            if not isinstance(exercise, dict) or not exercise.get("logged_at"):
+                continue
+            events.append(build_event(
+                user["_id"], user.get("team_id"), exercise.get("exercise_type", "other"),
+                exercise.get("value", 0), exercise.get("points_earned", 0),
+                datetime.datetime.fromisoformat(exercise["logged_at"]),
+            ))
+        record_events(events)
+        users_collection.update_one({"_id": user["_id"]}, {"$unset": {"logged_exercises": ""}})
+        migrated += 1
+    return migrated
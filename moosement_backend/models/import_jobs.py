@@ -0,0 +1,65 @@
+import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+
+import config
+from models import db
+
+jobs_collection = db.collection(db.IMPORT_JOBS)
+
+# Import Job Schema (for reference), one per employee import started over HTTP
+IMPORT_JOB_SCHEMA = {
+    "_id": ObjectId,
+    "company_id": str,  # Company the employees are imported into
+    "created_by": str,  # Admin who started the import
+    "format": str,  # "csv" or "jsonl"
+    "status": str,  # RUNNING, DONE or FAILED
+    "progress": dict,  # rows, created, duplicates and failed so far
+    "report": dict,  # The import report once done (see app/imports.py)
+    "error": str,  # Why the job failed
+    "created_at": datetime.datetime,
+    "updated_at": datetime.datetime,  # Bumped after every chunk
+}
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Indexes for import jobs (created by models.indexes.ensure_indexes). Jobs
+# hold activation codes, so they are removed after IMPORT_JOB_TTL_HOURS.
+INDEXES = [
+    IndexModel([("created_at", ASCENDING)], name="expiry", expireAfterSeconds=config.IMPORT_JOB_TTL_HOURS * 3600),
+]
+
+# ---- Helper Functions ----
+
+def create_job(company_id, created_by, fmt):
+    """
+    Records a new running import job. Returns its id.
+    """
+    now = datetime.datetime.utcnow()
+    return jobs_collection.insert_one({
+        "company_id": company_id,
+        "created_by": str(created_by),
+        "format": fmt,
+        "status": RUNNING,
+        "progress": {},
+        "created_at": now,
+        "updated_at": now,
+    }).inserted_id
+
+
+def update_job(job_id, **fields):
+    jobs_collection.update_one(
+        {"_id": job_id}, {"$set": {**fields, "updated_at": datetime.datetime.utcnow()}}
+    )
+
+
+def get_job(job_id, company_id):
+    """
+    Returns one of a company's import jobs, or None.
+    """
+    if not ObjectId.is_valid(job_id):
+        return None
+    return jobs_collection.find_one({"_id": ObjectId(job_id), "company_id": company_id})
@@ -0,0 +1,43 @@
+from pymongo.errors import OperationFailure
+
+from models import db, assignments, completions, exercises, import_jobs, invites, leaderboards, rewards, teams, users
+
+# Every index the app's queries rely on, by collection. Each model module
+# declares the indexes for its own queries.
+REQUIRED_INDEXES = {
+    db.USERS: users.INDEXES,
+    db.TEAMS: teams.INDEXES,
+    db.REWARDS: rewards.INDEXES,
+    db.COMPLETIONS: completions.INDEXES,
+    db.EXERCISE_EVENTS: exercises.EVENT_INDEXES,
+    db.DAILY_ACTIVITY: exercises.DAILY_INDEXES,
+    db.LEADERBOARD_ENTRIES: leaderboards.INDEXES,
+    db.DAILY_ASSIGNMENTS: assignments.INDEXES,
+    db.INVITES: invites.INDEXES,
+    db.IMPORT_JOBS: import_jobs.INDEXES,
+}
+
+
+def ensure_indexes():
+    """
+    Creates any missing collections and indexes. Existing ones are left as
+    they are, so this is safe to run on every startup.
+
+    A failure (e.g. duplicate emails blocking the unique index) is reported
+    rather than raised, so one bad index does not stop the others.
+    Returns a list of (collection, error message) pairs.
+    """
+    failures = []
+    try:
+        exercises.ensure_event_collection()
+    except OperationFailure as e:
+        failures.append((db.EXERCISE_EVENTS, str(e)))
+
+    for name, indexes in REQUIRED_INDEXES.items():
+        collection = db.get_collection(name)
+        for index in indexes:
+            try:
+                collection.create_indexes([index])
+            except OperationFailure as e:
+                failures.append((name, str(e)))
+    return failures
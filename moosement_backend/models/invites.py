@@ -0,0 +1,237 @@
+import datetime
+import uuid
+
+import shortuuid
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+import config
+from models import db
+from models.teams import team_filter
+
+invites_collection = db.collection(db.INVITES)
+users_collection = db.collection(db.USERS)
+teams_collection = db.collection(db.TEAMS)
+
+# Invite Schema (for reference)
+INVITE_SCHEMA = {
+    "_id": str,  # The invite code; the _id index keeps codes unique
+    "team_id": str,  # Team the invite joins, as stored in users' team_id
+    "company_id": str,  # Company of the inviting team (nullable)
+    "department": str,  # Set on the user when accepted (nullable)
+    "created_by": str,  # User who generated the invite
+    "created_at": datetime.datetime,
+    "expires_at": datetime.datetime,  # Removed by the TTL index after this
+    "claim": str,  # Set while a bulk accept is using the invite
+}
+
+# Indexes for invites (created by models.indexes.ensure_indexes). MongoDB's
+# TTL monitor only runs about once a minute, so reads also check expires_at.
+INDEXES = [
+    IndexModel([("expires_at", ASCENDING)], name="expiry", expireAfterSeconds=0),
+    IndexModel([("claim", ASCENDING)], name="claim", sparse=True),
+]
+
+# Reasons accept_invites() gives for rejecting an item
+INVALID_CODE = "Invalid or expired invite code"
+NOT_A_NEWCOMER = "User is not in the team's company or is already on a team"
+
+# ---- Helper Functions ----
+
+def create_invites(team_id, created_by, count=1, company_id=None, department=None, ttl_hours=None):
+    """
+    Generates `count` single-use invite codes for a team with one insert.
+    Returns the invite documents.
+    """
+    now = datetime.datetime.utcnow()
+    expires_at = now + datetime.timedelta(hours=ttl_hours or config.INVITE_TTL_HOURS)
+    invites = [{
+        "_id": shortuuid.uuid(),
+        "team_id": str(team_id),
+        "company_id": company_id,
+        "department": department,
+        "created_by": str(created_by),
+        "created_at": now,
+        "expires_at": expires_at,
+    } for _ in range(count)]
+    invites_collection.insert_many(invites, ordered=False)
+    return invites
+
+
+def _membership_writes(invites_by_user, user_guard=None):
+    """
+    The user updates and the team update that put users on the teams of
+    their invites. Both are idempotent, so a retried accept converges.
+    `user_guard` is added to each user update's filter.
+    """
+    user_updates = []
+    members_by_team = {}
+    for user_id, invite in invites_by_user.items():
+        fields = {"team_id": invite["team_id"], "updated_at": datetime.datetime.utcnow().isoformat()}
+        if invite.get("department"):
+            fields["department"] = invite["department"]
+        user_updates.append(UpdateOne({"_id": ObjectId(user_id), **(user_guard or {})}, {"$set": fields}))
+        members_by_team.setdefault(invite["team_id"], []).append(str(user_id))
+    team_updates = [
+        UpdateOne(team_filter(team_id), {"$addToSet": {"members": {"$each": members}}})
+        for team_id, members in members_by_team.items()
+    ]
+    return user_updates, team_updates
+
+
+def _apply_membership(invites_by_user):
+    """
+    Writes the user and team sides of the memberships in parallel.
+    Raises the first error.
+    """
+    user_updates, team_updates = _membership_writes(invites_by_user)
+    results = db.run_parallel(
+        lambda: users_collection.bulk_write(user_updates, ordered=False),
+        lambda: teams_collection.bulk_write(team_updates, ordered=False),
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results[0].matched_count
+
+
+def newcomers_query(user_ids, company_id):
+    """
+    Matches the given users who belong to the company and are not on a team yet.
+    """
+    return {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}, "company_id": company_id, "team_id": None}
+
+
+def _apply_newcomers(invites_by_user, company_id):
+    """
+    Puts users on the teams of their invites, but only users of the company
+    who are still not on a team: the user updates repeat that check, and the
+    team side is written for the users who were moved. Returns their ids.
+    """
+    user_updates, _ = _membership_writes(invites_by_user, {"company_id": company_id, "team_id": None})
+    moved = set(invites_by_user)
+    if users_collection.bulk_write(user_updates, ordered=False).matched_count < len(user_updates):
+        # Someone joined a team since they were checked; see who was moved
+        moved = {
+            str(user["_id"]) for user in users_collection.find(
+                {"_id": {"$in": [ObjectId(user_id) for user_id in invites_by_user]}}, {"team_id": 1}
+            )
+            if user.get("team_id") == invites_by_user[str(user["_id"])]["team_id"]
+        }
+    if moved:
+        _, team_updates = _membership_writes({user_id: invites_by_user[user_id] for user_id in moved})
+        teams_collection.bulk_write(team_updates, ordered=False)
+    return moved
+
+
+def usable_invites_query(codes, team_id=None):
+    """
+    Matches the given invite codes that have not expired or been claimed,
+    optionally only those of one team.
+    """
+    query = {"_id": {"$in": list(codes)}}
+    if team_id is not None:
+        query["team_id"] = str(team_id)
+    query.update({"expires_at": {"$gt": datetime.datetime.utcnow()}, "claim": {"$exists": False}})
+    return query
+
+
+def claimed_query(claim):
+    return {"claim": claim}
+
+
+def accept_invite(code, user_id):
+    """
+    Uses an invite for one user. The invite is consumed with a single
+    find_one_and_delete, so a code can only ever be accepted once; the user
+    and team are then updated in parallel. If those writes fail the invite is
+    put back so it can be retried. Returns the invite, or None if the code is
+    unknown, expired or already used.
+    """
+    invite = invites_collection.find_one_and_delete(usable_invites_query([code]))
+    if invite is None:
+        return None
+    try:
+        _apply_membership({user_id: invite})
+    except Exception:
+        invites_collection.insert_one(invite)
+        raise
+    return invite
+
+
+def accept_invites(team_id, assignments):
+    """
+    Uses many of a team's invites at once, e.g. to onboard a department.
+    `assignments` maps invite codes to user ids. Only users of the team's
+    company who are not on a team yet can be placed.
+
+    Eligible users are read first. Their invites are claimed with one
+    update_many, so concurrent accepts cannot use the same code. The claimed
+    ones are read back, the members are written with one bulk write per
+    collection, and the used invites are deleted. Invites of users who were
+    not moved after all are released. Returns (accepted codes, rejected
+    items as {"code", "error"}).
+    """
+    team = teams_collection.find_one(team_filter(team_id), {"_id": 0, "company_id": 1})
+    company_id = team.get("company_id") if team else None
+    eligible = set()
+    if company_id:
+        newcomers = users_collection.find(newcomers_query(assignments.values(), company_id), {"_id": 1})
+        eligible = {str(user["_id"]) for user in newcomers}
+    codes = [code for code, user_id in assignments.items() if user_id in eligible]
+    rejected = [{"code": code, "error": NOT_A_NEWCOMER} for code in assignments if code not in codes]
+    if not codes:
+        return [], rejected
+
+    claim = uuid.uuid4().hex
+    invites_collection.update_many(usable_invites_query(codes, team_id), {"$set": {"claim": claim}})
+    claimed = {invite["_id"]: invite for invite in invites_collection.find(claimed_query(claim))}
+    rejected += [{"code": code, "error": INVALID_CODE} for code in codes if code not in claimed]
+    if not claimed:
+        return [], rejected
+    try:
+        moved = _apply_newcomers({assignments[code]: invite for code, invite in claimed.items()}, company_id)
+    except Exception:
+        invites_collection.update_many(claimed_query(claim), {"$unset": {"claim": ""}})
+        raise
+
+    left_out = [code for code in claimed if assignments[code] not in moved]
+    if left_out:
+        invites_collection.update_many({"_id": {"$in": left_out}, "claim": claim}, {"$unset": {"claim": ""}})
+        rejected += [{"code": code, "error": NOT_A_NEWCOMER} for code in left_out]
+    invites_collection.delete_many(claimed_query(claim))
+    return [code for code in claimed if code not in left_out], rejected
+
+
+def migrate_embedded_invites(batch_size=500):
+    """
+    Moves codes from teams' embedded invites arrays into the invites
+    collection and removes the arrays. Old codes get a fresh expiry. Safe to
+    run more than once. Returns the number of invites moved.
+    """
+    now = datetime.datetime.utcnow()
+    expires_at = now + datetime.timedelta(hours=config.INVITE_TTL_HOURS)
+    moved = 0
+    teams = teams_collection.find(
+        {"invites.0": {"$exists": True}},
+        {"invites": 1, "team_id": 1, "company_id": 1},
+        batch_size=batch_size,
+    )
+    for team in teams:
+        operations = [
+            UpdateOne({"_id": invite["code"]}, {"$setOnInsert": {
+                # Invites used to be keyed by the team's _id
+                "team_id": str(team["_id"]),
+                "company_id": team.get("company_id"),
+                "department": None,
+                "created_by": str(invite.get("created_by")),
+                "created_at": now,
+                "expires_at": expires_at,
+            }}, upsert=True)
+            for invite in team["invites"]
+            if isinstance(invite, dict) and invite.get("code")
+        ]
+        if operations:
+            moved += invites_collection.bulk_write(operations, ordered=False).upserted_count
+        teams_collection.update_one({"_id": team["_id"]}, {"$unset": {"invites": ""}})
+    return moved
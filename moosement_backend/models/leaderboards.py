@@ -0,0 +1,214 @@
+import datetime
+import threading
+import time
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+import config
+from logs import logger
+from models import db
+
+users_collection = db.collection(db.USERS)
+entries_collection = db.collection(db.LEADERBOARD_ENTRIES)
+snapshots_collection = db.collection(db.LEADERBOARD_SNAPSHOTS)
+
+# Individual rankings are computed by an aggregation over all users and stored
+# as a snapshot. Reads page through the snapshot instead of ranking live.
+SNAPSHOT_ID = "individual"  # _id of the pointer document for the current snapshot
+BUILD_LEASE_SECONDS = 300  # A crashed build stops blocking others after this
+PAGE_DEFAULT_LIMIT = 50
+PAGE_MAX_LIMIT = 200
+PAGE_SORT = [("position", ASCENDING)]
+
+# Leaderboard Entry Schema (for reference)
+LEADERBOARD_ENTRY_SCHEMA = {
+    "snapshot_id": ObjectId,  # Build that produced the entry
+    "scope": str,  # "company:<id>" or "company:<id>:department:<name>"
+    "rank": int,  # Competition rank; tied users share a rank
+    "position": int,  # 1-based place in the scope, unique; used for paging
+    "user_id": ObjectId,
+    "name": str,
+    "department": str,
+    "total_points": int,
+}
+
+# Indexes for leaderboard entries (created by models.indexes.ensure_indexes)
+INDEXES = [
+    IndexModel(
+        [("snapshot_id", ASCENDING), ("scope", ASCENDING), ("position", ASCENDING)],
+        unique=True,
+        name="snapshot_page",
+    ),
+]
+
+
+class SnapshotExpired(Exception):
+    """Raised when a page is asked of a snapshot that has been removed."""
+
+
+_changes = 0
+_last_trigger = 0.0
+_lock = threading.Lock()
+
+
+def company_scope(company_id, department=None):
+    if department:
+        return f"company:{company_id}:department:{department}"
+    return f"company:{company_id}"
+
+
+def _ranking_pipeline(snapshot_id, partition, scope, match):
+    """
+    Ranks users by total_points within each partition and merges the ranked
+    rows into the entries collection under `snapshot_id`.
+    """
+    return [
+        {"$match": match},
+        {"$setWindowFields": {
+            "partitionBy": partition,
+            "sortBy": {"total_points": -1},
+            "output": {"rank": {"$rank": {}}, "position": {"$documentNumber": {}}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "snapshot_id": {"$literal": snapshot_id},
+            "scope": scope,
+            "rank": 1,
+            "position": 1,
+            "user_id": "$_id",
+            "name": 1,
+            "department": 1,
+            "total_points": {"$ifNull": ["$total_points", 0]},
+        }},
+        {"$merge": {"into": db.LEADERBOARD_ENTRIES, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def build_snapshots():
+    """
+    Builds company and department rankings as a new snapshot, points readers
+    at it, then removes older snapshots. Returns the snapshot pointer document.
+    """
+    snapshot_id = ObjectId()
+    started = datetime.datetime.utcnow()
+
+    users_collection.aggregate(_ranking_pipeline(
+        snapshot_id,
+        "$company_id",
+        {"$concat": ["company:", "$company_id"]},
+        {"company_id": {"$type": "string"}},
+    ))
+    users_collection.aggregate(_ranking_pipeline(
+        snapshot_id,
+        {"company_id": "$company_id", "department": "$department"},
+        {"$concat": ["company:", "$company_id", ":department:", "$department"]},
+        {"company_id": {"$type": "string"}, "department": {"$type": "string"}},
+    ))
+
+    # Switch readers over in one write; the freshness time is when the build
+    # started, since changes made during the build may be missing. The old
+    # snapshot is remembered so cursors into it keep working.
+    previous = snapshots_collection.find_one_and_update(
+        {"_id": SNAPSHOT_ID},
+        [
+            {"$set": {
+                "previous_snapshot_id": "$snapshot_id",
+                "previous_built_at": "$built_at",
+                "snapshot_id": snapshot_id,
+                "built_at": started.isoformat(),
+            }},
+            {"$project": {"building_until": 0}},
+        ],
+        upsert=True,
+    )
+
+    # Keep the previous snapshot for readers that fetched the old pointer
+    keep = [snapshot_id]
+    if previous and previous.get("snapshot_id"):
+        keep.append(previous["snapshot_id"])
+    entries_collection.delete_many({"snapshot_id": {"$nin": keep}})
+    return {"snapshot_id": snapshot_id, "built_at": started.isoformat()}
+
+
+def _claim_build():
+    """
+    Takes the build lease if no other worker holds it and the current snapshot
+    is older than the minimum rebuild interval.
+    """
+    now = datetime.datetime.utcnow()
+    oldest_allowed = (now - datetime.timedelta(seconds=config.LEADERBOARD_MIN_REBUILD_SECONDS)).isoformat()
+    try:
+        snapshots_collection.find_one_and_update(
+            {
+                "_id": SNAPSHOT_ID,
+                "$and": [
+                    {"$or": [{"building_until": {"$exists": False}}, {"building_until": {"$lt": now.isoformat()}}]},
+                    {"$or": [{"built_at": {"$exists": False}}, {"built_at": {"$lt": oldest_allowed}}]},
+                ],
+            },
+            {"$set": {"building_until": (now + datetime.timedelta(seconds=BUILD_LEASE_SECONDS)).isoformat()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False  # The pointer exists and the filter did not match: someone else is building
+    return True
+
+
+def _rebuild_in_background():
+    try:
+        if _claim_build():
+            build_snapshots()
+    except Exception as e:
+        logger.error("leaderboard_build_failed", error=str(e))
+
+
+def note_points_changed(count=1):
+    """
+    Records that user points changed. After enough changes in this process,
+    and no more often than the minimum rebuild interval, a rebuild is started
+    in the background. A lease in the snapshot document makes sure only one
+    worker builds at a time.
+    """
+    global _changes, _last_trigger
+    with _lock:
+        _changes += count
+        now = time.monotonic()
+        if _changes < config.LEADERBOARD_REBUILD_AFTER_CHANGES:
+            return
+        if now - _last_trigger < config.LEADERBOARD_MIN_REBUILD_SECONDS:
+            return
+        _changes = 0
+        _last_trigger = now
+    threading.Thread(target=_rebuild_in_background, name="leaderboard-build", daemon=True).start()
+
+
+def page_query(snapshot_id, scope, after):
+    return {"snapshot_id": snapshot_id, "scope": scope, "position": {"$gt": after}}
+
+
+def get_page(scope, after=0, limit=PAGE_DEFAULT_LIMIT, snapshot_id=None):
+    """
+    Returns one page of a snapshot for a scope, starting after the given
+    position. Later pages pass the snapshot_id of the first, so a rebuild in
+    between does not shift positions under the reader; the previous snapshot
+    is kept for that. Returns (entries, snapshot) where snapshot holds the
+    snapshot_id and built_at, or is None if no snapshot has been built yet.
+    Raises SnapshotExpired if `snapshot_id` is no longer kept.
+    """
+    pointer = snapshots_collection.find_one({"_id": SNAPSHOT_ID})
+    if not pointer or "snapshot_id" not in pointer:
+        return [], None
+    if snapshot_id is None or snapshot_id == pointer["snapshot_id"]:
+        snapshot = {"snapshot_id": pointer["snapshot_id"], "built_at": pointer["built_at"]}
+    elif snapshot_id == pointer.get("previous_snapshot_id"):
+        snapshot = {"snapshot_id": snapshot_id, "built_at": pointer.get("previous_built_at")}
+    else:
+        raise SnapshotExpired()
+    cursor = entries_collection.find(
+        page_query(snapshot["snapshot_id"], scope, after),
+        {"_id": 0, "snapshot_id": 0, "scope": 0},
+    ).sort(PAGE_SORT).limit(limit)
+    # user_id stays an ObjectId; the app's JSON provider encodes it
+    return list(cursor), snapshot
@@ -0,0 +1,93 @@
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+import metrics
+
+# Documents are fetched raw so the bytes transferred can be counted exactly
+RAW_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+class Record:
+    """
+    Base for compact, typed views of a Mongo document.
+
+    Subclasses list FIELDS as (name, default) pairs and matching __slots__.
+    Queries project exactly those fields, so only they are transferred and
+    decoded. A callable default (e.g. list) is called to make a fresh value.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    @classmethod
+    def projection(cls, slices=None):
+        """
+        slices maps array fields to a $slice argument, e.g. {"items": [20, 11]},
+        so only part of a large embedded array is transferred.
+        """
+        names = [name for name, _ in cls.FIELDS]
+        projection = {name: 1 for name in names}
+        if "_id" not in names:
+            projection["_id"] = 0
+        for name, argument in (slices or {}).items():
+            projection[name] = {"$slice": argument}
+        return projection
+
+    @classmethod
+    def from_document(cls, document):
+        record = cls.__new__(cls)
+        for name, default in cls.FIELDS:
+            value = document.get(name)
+            if value is None:
+                value = default() if callable(default) else default
+            setattr(record, name, value)
+        return record
+
+    @classmethod
+    def _decode(cls, raw):
+        metrics.observe_read(1, len(raw.raw))
+        return cls.from_document(bson.decode(raw.raw))
+
+    @classmethod
+    def find_one(cls, collection, query, slices=None, **kwargs):
+        """
+        Returns the first matching record, or None.
+        """
+        raw = collection.with_options(codec_options=RAW_OPTIONS).find_one(query, cls.projection(slices), **kwargs)
+        return cls._decode(raw) if raw is not None else None
+
+    @classmethod
+    def find(cls, collection, query, sort=None, limit=0):
+        """
+        Returns a list of matching records.
+        """
+        cursor = collection.with_options(codec_options=RAW_OPTIONS).find(query, cls.projection())
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [cls._decode(raw) for raw in cursor]
+
+    @classmethod
+    async def find_one_async(cls, collection, query, slices=None, **kwargs):
+        """
+        find_one() for an AsyncMongoClient collection.
+        """
+        raw = await collection.with_options(codec_options=RAW_OPTIONS).find_one(query, cls.projection(slices), **kwargs)
+        return cls._decode(raw) if raw is not None else None
+
+    @classmethod
+    async def find_async(cls, collection, query, sort=None, limit=0):
+        """
+        find() for an AsyncMongoClient collection.
+        """
+        cursor = collection.with_options(codec_options=RAW_OPTIONS).find(query, cls.projection())
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [cls._decode(raw) async for raw in cursor]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name, _ in self.FIELDS}
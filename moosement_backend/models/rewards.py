@@ -0,0 +1,169 @@
+from datetime import datetime
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from models import db
+from models.catalog import CatalogCache
+
+rewards_collection = db.collection(db.REWARDS)
+users_collection = db.collection(db.USERS)
+
+# Reward Schema (for reference)
+REWARD_SCHEMA = {
+    "name": str,
+    "points_required": int,
+    "stock": int,  # Optional; units left for limited rewards, missing means unlimited
+}
+
+# Seeded by `flask seed-rewards`
+DEFAULT_REWARDS = [
+    {"name": "Free Lunch Voucher", "points_required": 150},
+    {"name": "Late Start Pass", "points_required": 200},
+    {"name": "Company T-Shirt", "points_required": 300},
+    {"name": "Extra PTO Day", "points_required": 500},
+    {"name": "Gift Card", "points_required": 200}
+]
+
+# Rewards are looked up by name when redeemed
+reward_catalog = CatalogCache(db.REWARDS, key="name")
+
+# Indexes for rewards (created by models.indexes.ensure_indexes)
+INDEXES = [
+    IndexModel([("name", ASCENDING)], name="name", unique=True),
+]
+
+# Outcomes of redeem_reward()
+REDEEMED = "redeemed"
+SOLD_OUT = "sold_out"
+ALREADY_REDEEMED = "already_redeemed"
+NOT_ENOUGH_POINTS = "not_enough_points"
+USER_NOT_FOUND = "user_not_found"
+
+# ---- Helper Functions ----
+
+def get_reward(reward_name):
+    """
+    Returns a reward from the in-memory catalog, or None if it does not exist.
+    """
+    return reward_catalog.get(reward_name)
+
+
+def invalidate_catalog():
+    """
+    Drops the in-memory catalog so the next lookup reloads it.
+    """
+    reward_catalog.invalidate()
+
+
+def seed_rewards(rewards=DEFAULT_REWARDS):
+    """
+    Inserts any of the given rewards not already present, matched by name.
+    Existing rewards (and their stock) are left alone, so this is safe to run
+    repeatedly. Returns the number inserted.
+    """
+    result = rewards_collection.bulk_write([
+        UpdateOne({"name": reward["name"]}, {"$setOnInsert": dict(reward)}, upsert=True)
+        for reward in rewards
+    ], ordered=False)
+    if result.upserted_count:
+        invalidate_catalog()
+    return result.upserted_count
+
+
+def _take_stock_query(reward):
+    """
+    Takes one unit of a limited reward; unlimited rewards (no stock field)
+    match without being changed. The database decides which kind the reward
+    is, since the cached catalog may not have seen a stock change yet.
+    """
+    query = {"_id": reward["_id"], "$or": [{"stock": {"$exists": False}}, {"stock": {"$gt": 0}}]}
+    update = [{"$set": {"stock": {"$cond": [{"$gt": ["$stock", 0]}, {"$subtract": ["$stock", 1]}, "$$REMOVE"]}}}]
+    return query, update
+
+
+_TAKE_STOCK_OPTIONS = {"projection": {"_id": 0, "stock": 1}, "return_document": ReturnDocument.BEFORE}
+
+
+def _redeem_update(user_id, reward):
+    """
+    The filter and update for a redemption. The balance and already-redeemed
+    checks are part of the filter.
+    """
+    name = reward["name"]
+    cost = reward["points_required"]
+    now = datetime.utcnow().isoformat()
+    query = {
+        "_id": user_id,
+        "total_points": {"$gte": cost},
+        "redeemed_rewards.reward_name": {"$ne": name},
+    }
+    update = {
+        "$inc": {"total_points": -cost},
+        "$push": {"redeemed_rewards": {
+            "reward_name": name,
+            "points_spent": cost,
+            "redeemed_at": now
+        }},
+        "$set": {"updated_at": now}
+    }
+    return query, update
+
+
+def _failure_query(user_id, reward):
+    return {"_id": user_id}, {"_id": 1, "redeemed_rewards": {"$elemMatch": {"reward_name": reward["name"]}}}
+
+
+def _failure_outcome(user):
+    if user is None:
+        return USER_NOT_FOUND, None
+    if user.get("redeemed_rewards"):
+        return ALREADY_REDEEMED, None
+    return NOT_ENOUGH_POINTS, None
+
+
+_REDEEM_OPTIONS = {"projection": {"_id": 0, "total_points": 1}, "return_document": ReturnDocument.AFTER}
+
+
+def redeem_reward(user_id, reward):
+    """
+    Redeems a catalog reward for a user. Returns (outcome, remaining_points);
+    remaining_points is None unless the outcome is REDEEMED.
+
+    The balance and already-redeemed checks are part of the update filter, so
+    concurrent requests cannot spend the same points twice. A limited reward's
+    stock is taken first and handed back if the user update does not apply,
+    so stock can never go below zero.
+    """
+    stock = rewards_collection.find_one_and_update(*_take_stock_query(reward), **_TAKE_STOCK_OPTIONS)
+    if stock is None:
+        return SOLD_OUT, None
+    limited = "stock" in stock
+
+    user = users_collection.find_one_and_update(*_redeem_update(user_id, reward), **_REDEEM_OPTIONS)
+    if user is not None:
+        return REDEEMED, user["total_points"]
+
+    if limited:
+        rewards_collection.update_one({"_id": reward["_id"]}, {"$inc": {"stock": 1}})
+
+    # Only failed redemptions pay for a second read to explain why
+    return _failure_outcome(users_collection.find_one(*_failure_query(user_id, reward)))
+
+
+async def redeem_reward_async(user_id, reward):
+    """
+    redeem_reward() on the async client.
+    """
+    rewards = db.get_async_collection(db.REWARDS)
+    users = db.get_async_collection(db.USERS)
+
+    stock = await rewards.find_one_and_update(*_take_stock_query(reward), **_TAKE_STOCK_OPTIONS)
+    if stock is None:
+        return SOLD_OUT, None
+    limited = "stock" in stock
+
+    user = await users.find_one_and_update(*_redeem_update(user_id, reward), **_REDEEM_OPTIONS)
+    if user is not None:
+        return REDEEMED, user["total_points"]
+
+    if limited:
+        await rewards.update_one({"_id": reward["_id"]}, {"$inc": {"stock": 1}})
+    return _failure_outcome(await users.find_one(*_failure_query(user_id, reward)))
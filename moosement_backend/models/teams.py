@@ -1,17 +1,15 @@
-from pymongo import MongoClient
+import asyncio
 from bson import ObjectId
-from config import MONGO_URI
 import datetime
 
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-import certifi
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
+from models import db
+from models.write_behind import PartialFlush, PointsBuffer
+from models.records import Record
 
-# Create a new client and connect to the server
-client = MongoClient(MONGO_URI, server_api=ServerApi('1'), tls=True, tlsCAFile=certifi.where())
-db = client["moosement"]
-teams_collection = db["team_data"]
-users_collection = db["user_data"]
+teams_collection = db.collection(db.TEAMS)
+users_collection = db.collection(db.USERS)
 
 # Team Schema (for reference)
 TEAM_SCHEMA = {
@@ -24,6 +22,36 @@ TEAM_SCHEMA = {
     "members": list,  # List of user IDs in the team
 }
 
+# Leaderboard order: most points first, ties broken by team_id so every team
+# has a stable position. The compound index below backs every ranking query.
+LEADERBOARD_SORT = [("total_team_points", DESCENDING), ("team_id", ASCENDING)]
+REVERSE_SORT = [(field, -direction) for field, direction in LEADERBOARD_SORT]
+
+
+class TeamStanding(Record):
+    """
+    A team as shown on the leaderboard.
+    """
+    __slots__ = ("name", "team_id", "total_team_points")
+    FIELDS = (("name", None), ("team_id", None), ("total_team_points", 0))
+
+# Indexes for team queries (created by models.indexes.ensure_indexes)
+INDEXES = [
+    IndexModel(LEADERBOARD_SORT, name="leaderboard"),
+    IndexModel(
+        [("team_id", ASCENDING)], name="team_id", unique=True,
+        partialFilterExpression={"team_id": {"$type": "string"}},
+    ),
+    IndexModel([("company_id", ASCENDING)], name="company_id"),
+    # One team per name in a company, so concurrent or retried imports cannot
+    # create a team twice. Duplicates already in the data must be merged
+    # before this index can be built; ensure-indexes reports them.
+    IndexModel(
+        [("company_id", ASCENDING), ("name", ASCENDING)], name="company_team_name", unique=True,
+        partialFilterExpression={"company_id": {"$type": "string"}, "name": {"$type": "string"}},
+    ),
+]
+
 # ---- Helper Functions ----
 
 def create_team(name, company_id, creator_id):
@@ -68,4 +96,185 @@ def join_team(user_id, team_id):
         )
         return True
 
-    return False  # User already in the team
\ No newline at end of file
+    return False  # User already in the team
+
+
+def team_filter(team_id):
+    """
+    Builds a query matching a team by its team_id field or its Mongo _id.
+    Users created through invites store the _id, others store team_id.
+    """
+    if ObjectId.is_valid(team_id):
+        return {"$or": [{"team_id": team_id}, {"_id": ObjectId(team_id)}]}
+    return {"team_id": team_id}
+
+
+def _write_team_points(points_by_team):
+    """
+    Applies point increments to many teams with one bulk write, one $inc per team.
+    """
+    now = datetime.datetime.utcnow().isoformat()
+    team_ids = [team_id for team_id, points in points_by_team.items() if points]
+    operations = [
+        UpdateOne(team_filter(team_id), {
+            "$inc": {"total_team_points": points_by_team[team_id]},
+            "$set": {"updated_at": now},
+        })
+        for team_id in team_ids
+    ]
+    if not operations:
+        return 0
+    try:
+        return teams_collection.bulk_write(operations, ordered=False).matched_count
+    except BulkWriteError as e:
+        # The other updates were applied; only the failed ones may be retried
+        failed = {team_ids[error["index"]]: points_by_team[team_ids[error["index"]]]
+                  for error in e.details.get("writeErrors", [])}
+        raise PartialFlush(failed, str(e)) from e
+
+
+# Optional write-behind for team points; create_app() turns it on from config.
+# Totals on the leaderboard then trail live activity by up to the flush interval.
+team_points_buffer = PointsBuffer(_write_team_points, "team-points")
+
+
+def _points_update(points):
+    return {
+        "$inc": {"total_team_points": points},
+        "$set": {"updated_at": datetime.datetime.utcnow().isoformat()},
+    }
+
+
+def add_team_points(team_id, points):
+    """
+    Atomically adds points to a team. The leaderboard index keeps the ranking
+    up to date, so no other team documents need to be rewritten.
+    """
+    if team_points_buffer.add(team_id, points):
+        return True
+    result = teams_collection.update_one(team_filter(team_id), _points_update(points))
+    return result.matched_count > 0
+
+
+async def add_team_points_async(team_id, points):
+    """
+    add_team_points() on the async client.
+    """
+    if team_points_buffer.add(team_id, points):
+        return True
+    result = await db.get_async_collection(db.TEAMS).update_one(team_filter(team_id), _points_update(points))
+    return result.matched_count > 0
+
+
+def add_team_points_bulk(points_by_team):
+    """
+    Adds points to many teams, one $inc per team.
+    """
+    if team_points_buffer.add_many(points_by_team):
+        return len(points_by_team)
+    return _write_team_points(points_by_team)
+
+
+def ahead_of_query(team):
+    """
+    Query for all teams ranked above the given team.
+    """
+    return {"$or": [
+        {"total_team_points": {"$gt": team["total_team_points"]}},
+        {"total_team_points": team["total_team_points"], "team_id": {"$lt": team["team_id"]}},
+    ]}
+
+
+def behind_query(team):
+    """
+    Query for all teams ranked below the given team.
+    """
+    return {"$or": [
+        {"total_team_points": {"$lt": team["total_team_points"]}},
+        {"total_team_points": team["total_team_points"], "team_id": {"$gt": team["team_id"]}},
+    ]}
+
+
+def _with_standings(records, first_standing):
+    leaderboard = []
+    for index, team in enumerate(records):
+        entry = team.to_dict()
+        entry["team_standing"] = first_standing + index
+        leaderboard.append(entry)
+    return leaderboard
+
+
+def get_top_teams(limit, after=None):
+    """
+    Returns `limit` teams of the leaderboard with their standing, starting
+    below `after` (a dict with total_team_points, team_id and team_standing
+    of the last team already shown) or from the top. Each page is an index
+    range scan, however deep it goes.
+    """
+    query = behind_query(after) if after else {}
+    first_standing = after["team_standing"] + 1 if after else 1
+    teams = TeamStanding.find(teams_collection, query, sort=LEADERBOARD_SORT, limit=limit)
+    return _with_standings(teams, first_standing)
+
+
+async def get_top_teams_async(limit, after=None):
+    """
+    get_top_teams() on the async client.
+    """
+    query = behind_query(after) if after else {}
+    first_standing = after["team_standing"] + 1 if after else 1
+    teams = await TeamStanding.find_async(
+        db.get_async_collection(db.TEAMS), query, sort=LEADERBOARD_SORT, limit=limit
+    )
+    return _with_standings(teams, first_standing)
+
+
+def get_team_rank(team_id, neighbours=0):
+    """
+    Returns a team's standing plus up to `neighbours` teams directly above and
+    below it, or None if the team does not exist.
+    """
+    record = TeamStanding.find_one(teams_collection, team_filter(team_id))
+    if not record:
+        return None
+    team = record.to_dict()
+
+    standing = teams_collection.count_documents(ahead_of_query(team)) + 1
+    above, below = [], []
+    if neighbours > 0:
+        above = TeamStanding.find(teams_collection, ahead_of_query(team), sort=REVERSE_SORT, limit=neighbours)
+        below = TeamStanding.find(teams_collection, behind_query(team), sort=LEADERBOARD_SORT, limit=neighbours)
+    return _rank_result(team, standing, above, below)
+
+
+async def get_team_rank_async(team_id, neighbours=0):
+    """
+    get_team_rank() on the async client. The count and the neighbour reads
+    only depend on the team, so they run concurrently.
+    """
+    collection = db.get_async_collection(db.TEAMS)
+    record = await TeamStanding.find_one_async(collection, team_filter(team_id))
+    if not record:
+        return None
+    team = record.to_dict()
+
+    reads = [collection.count_documents(ahead_of_query(team))]
+    if neighbours > 0:
+        reads.append(TeamStanding.find_async(collection, ahead_of_query(team), sort=REVERSE_SORT, limit=neighbours))
+        reads.append(TeamStanding.find_async(collection, behind_query(team), sort=LEADERBOARD_SORT, limit=neighbours))
+    results = await asyncio.gather(*reads)
+    above, below = results[1:] if neighbours > 0 else ([], [])
+    return _rank_result(team, results[0] + 1, above, below)
+
+
+def _rank_result(team, standing, above, below):
+    """
+    Numbers the team and its neighbours. `above` is nearest-first.
+    """
+    team["team_standing"] = standing
+    above = list(reversed(above))
+    return {
+        "team": team,
+        "above": _with_standings(above, standing - len(above)),
+        "below": _with_standings(below, standing + 1),
+    }
@@ -1,15 +1,10 @@
-from pymongo import MongoClient
 from bson import ObjectId
 import datetime
-from config import MONGO_URI
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-import certifi
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from models import db
+from models.records import Record
 
-# Create a new client and connect to the server
-client = MongoClient(MONGO_URI, server_api=ServerApi('1'), tls=True, tlsCAFile=certifi.where())
-db = client["moosement"]
-users_collection = db["user_data"]
+users_collection = db.collection(db.USERS)
 
 # ---- User Schema ----
 USER_SCHEMA = {
@@ -21,6 +16,72 @@ USER_SCHEMA = {
     "updated_at": str,  # Timestamp
     "team_id": str,  # The team the user belongs to (nullable)
     "company_id": str,  # The company the user belongs to
+    "department": str,  # Department within the company (nullable)
+    "streaks": int,  # Current daily streak
+    "last_active_day": str,  # UTC date of the last completion, YYYY-MM-DD
+    "last_completed": dict,  # challenge_id -> UTC date it was last completed
+    "total_points": int,  # Current point balance
+    "points": int,  # Lifetime points earned
+    "redeemed_rewards": list,  # [{"reward_name", "points_spent", "redeemed_at"}]
+    "role": str,  # "employee" or "admin"
+    "activation_hash": str,  # Imported accounts without a password: sha256 of their activation code
+}
+
+
+# ---- User Records ----
+# Each record is the slice of the user document one kind of request needs.
+# Only its fields are projected, transferred and decoded.
+
+class UserPoints(Record):
+    __slots__ = ("total_points", "redeemed_rewards", "streaks", "last_active_day")
+    FIELDS = (("total_points", 0), ("redeemed_rewards", list), ("streaks", 0), ("last_active_day", None))
+
+
+class UserRewards(Record):
+    __slots__ = ("redeemed_rewards",)
+    FIELDS = (("redeemed_rewards", list),)
+
+
+class UserMembership(Record):
+    __slots__ = ("team_id", "company_id")
+    FIELDS = (("team_id", None), ("company_id", None))
+
+
+class UserCredentials(Record):
+    __slots__ = ("_id", "password", "team_id", "company_id")
+    FIELDS = (("_id", None), ("password", None), ("team_id", None), ("company_id", None))
+
+
+class UserRole(Record):
+    __slots__ = ("role", "company_id")
+    FIELDS = (("role", "employee"), ("company_id", None))
+
+# Indexes for user queries (created by models.indexes.ensure_indexes)
+INDEXES = [
+    IndexModel([("email", ASCENDING)], name="email", unique=True),
+    IndexModel([("team_id", ASCENDING)], name="team_id"),
+    # Also serve plain company_id lookups through their prefix
+    IndexModel([("company_id", ASCENDING), ("total_points", DESCENDING)], name="company_points"),
+    IndexModel(
+        [("company_id", ASCENDING), ("department", ASCENDING), ("total_points", DESCENDING)],
+        name="department_points",
+    ),
+    # Only users with a live streak are indexed, so the nightly reset reads
+    # just the streaks that can have broken
+    IndexModel(
+        [("last_active_day", ASCENDING)],
+        name="streak_expiry",
+        partialFilterExpression={"streaks": {"$gt": 0}},
+    ),
+]
+
+STREAK_BONUS_PER_DAY = 0.1
+STREAK_BONUS_CAP = 0.5  # Cap streak bonus at 50%
+
+# Fields needed to apply completions and exercise logs to a user
+ACTIVITY_PROJECTION = {
+    "streaks": 1, "last_active_day": 1, "last_completed": 1,
+    "team_id": 1, "total_points": 1, "updated_at": 1,
 }
 
 
@@ -53,11 +114,10 @@ def get_user_by_id(user_id):
     """
 
     try:
-        _id = ObjectId(user_id)
-        user = users_collection.find_one({"_id": user_id}, {"_id": 0, "password_hash": 0})
+        user = users_collection.find_one({"_id": ObjectId(user_id)}, {"_id": 0, "password_hash": 0})
         return user
 
-    except Exception as e:
+    except Exception:
         return {"error": "Invalid user ID format"}
 
 
@@ -92,3 +152,180 @@ def delete_user(user_id):
     """
     result = users_collection.delete_one({"user_id": user_id})
     return result.deleted_count > 0  # Returns True if user was deleted
+
+
+def streak_points(base_points, streak):
+    """
+    Points for a challenge including the streak bonus. Must stay in step with
+    the pipeline in award_challenge_points.
+    """
+    return int(base_points * (1 + min(streak * STREAK_BONUS_PER_DAY, STREAK_BONUS_CAP)))
+
+
+def current_streak(streaks, last_active_day, today=None):
+    """
+    The streak as of today from the stored fields. A streak whose last active
+    day is before yesterday is already broken, even if the nightly reset has
+    not cleared it yet.
+    """
+    today = today or datetime.datetime.utcnow().date()
+    yesterday = (today - datetime.timedelta(days=1)).isoformat()
+    if not streaks or not last_active_day or last_active_day < yesterday:
+        return 0
+    return streaks
+
+
+def broken_streaks_query(today):
+    """
+    Matches users with a streak who were not active today or yesterday.
+    """
+    yesterday = (today - datetime.timedelta(days=1)).isoformat()
+    return {"streaks": {"$gt": 0}, "last_active_day": {"$lt": yesterday}}
+
+
+def reset_broken_streaks(today=None, batch_size=1000):
+    """
+    Sets streaks to 0 for every user who was not active today or yesterday.
+    Reads candidates through the streak_expiry index and resets them with
+    batched bulk writes. Each update repeats the date check, so a completion
+    that lands while the job runs is not wiped out. Returns the number of
+    streaks reset.
+    """
+    broken = broken_streaks_query(today or datetime.datetime.utcnow().date())
+    # updated_at changes too, so a sync that read the user before the reset
+    # fails its optimistic check instead of writing the old streak back
+    reset_fields = {"streaks": 0, "updated_at": datetime.datetime.utcnow().isoformat()}
+
+    reset = 0
+    batch = []
+    for user in users_collection.find(broken, {"_id": 1}, batch_size=batch_size):
+        batch.append(UpdateOne({"_id": user["_id"], **broken}, {"$set": reset_fields}))
+        if len(batch) >= batch_size:
+            reset += users_collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        reset += users_collection.bulk_write(batch, ordered=False).modified_count
+    return reset
+
+
+def get_user_record(user_id, record):
+    """
+    Fetches one user as the given Record class, or None if not found.
+    """
+    return record.find_one(users_collection, {"_id": ObjectId(user_id)})
+
+
+def users_query(user_ids):
+    return {"_id": {"$in": list(user_ids)}}
+
+
+def get_users_activity(user_ids):
+    """
+    Fetches the streak and points state for several users in one query.
+    Returns a dict keyed by ObjectId.
+    """
+    users = users_collection.find(users_query(user_ids), ACTIVITY_PROJECTION)
+    return {user["_id"]: user for user in users}
+
+
+def _award_update(user_id, challenge_id, base_points):
+    """
+    The filter, pipeline and options for award_challenge_points, shared with
+    the async tier.
+    """
+    now = datetime.datetime.utcnow()
+    today = now.date().isoformat()
+    yesterday = (now.date() - datetime.timedelta(days=1)).isoformat()
+    completed_key = f"last_completed.{challenge_id}"
+
+    streak = {"$switch": {
+        "branches": [
+            # Same day completion
+            {"case": {"$eq": ["$last_active_day", today]}, "then": {"$ifNull": ["$streaks", 1]}},
+            # Last completion was yesterday
+            {"case": {"$eq": ["$last_active_day", yesterday]}, "then": {"$add": [{"$ifNull": ["$streaks", 0]}, 1]}},
+        ],
+        "default": 1,  # Streak broken
+    }}
+    points_earned = {"$toInt": {"$trunc": {"$multiply": [
+        base_points,
+        {"$add": [1, {"$min": [{"$multiply": ["$streaks", STREAK_BONUS_PER_DAY]}, STREAK_BONUS_CAP]}]},
+    ]}}}
+
+    query = {"_id": ObjectId(user_id), completed_key: {"$ne": today}}
+    pipeline = [
+        # Kept so revoke_challenge_points() can put the streak back
+        {"$set": {"before_last_award": {
+            "streaks": "$streaks", "last_active_day": "$last_active_day", "completed": f"${completed_key}",
+        }}},
+        {"$set": {"streaks": streak, "last_active_day": today}},
+        {"$set": {"last_points_earned": points_earned}},
+        {"$set": {
+            "total_points": {"$add": [{"$ifNull": ["$total_points", 0]}, "$last_points_earned"]},
+            "points": {"$add": [{"$ifNull": ["$points", 0]}, "$last_points_earned"]},
+            completed_key: today,
+            "updated_at": now.isoformat(),
+        }},
+    ]
+    options = {
+        "projection": {
+            "_id": 0, "streaks": 1, "last_points_earned": 1, "total_points": 1, "team_id": 1, "before_last_award": 1,
+        },
+        "return_document": ReturnDocument.AFTER,
+    }
+    return query, pipeline, options
+
+
+def award_challenge_points(user_id, challenge_id, base_points):
+    """
+    Awards points for completing a challenge in a single atomic update.
+    The streak and the points earned are computed by the server from the
+    user's last_active_day, and the filter rejects a second completion of the
+    same challenge on the same day.
+    Returns the updated streak/points/team fields, or None if the user does not
+    exist or already completed the challenge today.
+    """
+    query, pipeline, options = _award_update(user_id, challenge_id, base_points)
+    return users_collection.find_one_and_update(query, pipeline, **options)
+
+
+async def award_challenge_points_async(user_id, challenge_id, base_points):
+    """
+    award_challenge_points() on the async client.
+    """
+    query, pipeline, options = _award_update(user_id, challenge_id, base_points)
+    return await db.get_async_collection(db.USERS).find_one_and_update(query, pipeline, **options)
+
+
+def _revoke_update(challenge_id, awarded):
+    points = awarded["last_points_earned"]
+    before = awarded.get("before_last_award") or {}
+    restore = {"updated_at": datetime.datetime.utcnow().isoformat()}
+    remove = {"before_last_award": ""}
+    for field, key in (
+        ("streaks", "streaks"), ("last_active_day", "last_active_day"), (f"last_completed.{challenge_id}", "completed"),
+    ):
+        if key in before:
+            restore[field] = before[key]
+        else:
+            remove[field] = ""
+    return {"$inc": {"total_points": -points, "points": -points}, "$set": restore, "$unset": remove}
+
+
+def revoke_challenge_points(user_id, challenge_id, awarded):
+    """
+    Undoes award_challenge_points() for a completion that was already
+    recorded, e.g. one made before last_completed existed: takes back the
+    points and puts the streak, last_active_day and last_completed entry back
+    as they were. awarded is what award_challenge_points() returned.
+    """
+    users_collection.update_one({"_id": ObjectId(user_id)}, _revoke_update(challenge_id, awarded))
+
+
+async def revoke_challenge_points_async(user_id, challenge_id, awarded):
+    """
+    revoke_challenge_points() on the async client.
+    """
+    await db.get_async_collection(db.USERS).update_one(
+        {"_id": ObjectId(user_id)}, _revoke_update(challenge_id, awarded)
+    )
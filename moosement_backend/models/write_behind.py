@@ -0,0 +1,184 @@
+import atexit
+import os
+import threading
+import time
+
+from logs import logger
+
+
+class PartialFlush(Exception):
+    """
+    Raised by a writer when only some keys of a batch were written. `failed`
+    maps the keys that were not written to their amounts.
+    """
+
+    def __init__(self, failed, message="Some keys were not written"):
+        super().__init__(message)
+        self.failed = failed
+
+
+class PointsBuffer:
+    """
+    Collects point increments in memory and writes them in batches.
+
+    add() merges each increment into a per-key total. A background thread
+    hands the merged totals to `writer` every `flush_interval` seconds, or
+    sooner once `flush_threshold` increments are waiting. Many concurrent
+    increments to one hot document become a single $inc.
+
+    If a write fails, its totals are merged back and retried on the next
+    flush. A writer that applied part of a batch raises PartialFlush naming
+    the keys it did not write, and only those are retried, so no increment
+    is applied twice. Any other exception is taken to mean nothing was
+    written. The buffer is flushed at interpreter exit. A forked child starts
+    with an empty buffer, so increments taken before the fork are only
+    written once, by the parent.
+    """
+
+    def __init__(self, writer, name):
+        self.writer = writer
+        self.name = name
+        self.enabled = False
+        self.flush_interval = 1.0
+        self.flush_threshold = 200
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._pending = {}
+        self._counts = {}  # key -> number of add() calls merged into its total
+        self._pending_count = 0
+        self._oldest = None  # When the oldest unflushed increment arrived
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._stopping = False
+        self._stats = {
+            "increments": 0,  # add() calls
+            "writes": 0,  # documents updated by flushes
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_lag_seconds": 0.0,  # Age of the oldest increment at the last flush
+            "max_flush_lag_seconds": 0.0,
+        }
+
+    def configure(self, enabled, flush_interval, flush_threshold):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+    def add(self, key, amount):
+        """
+        Buffers an increment. Returns False when the buffer is disabled so the
+        caller can write directly.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._pending_count += 1
+            self._stats["increments"] += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = self._pending_count >= self.flush_threshold
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+        return True
+
+    def add_many(self, amounts):
+        if not self.enabled:
+            return False
+        for key, amount in amounts.items():
+            self.add(key, amount)
+        return True
+
+    def flush(self):
+        """
+        Writes everything buffered so far. Returns the number of keys written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, counts, oldest = self._pending, self._counts, self._oldest
+                self._pending, self._counts, self._pending_count, self._oldest = {}, {}, 0, None
+            pending = {key: amount for key, amount in pending.items() if amount}
+            if not pending:
+                return 0
+
+            try:
+                self.writer(pending)
+            except PartialFlush as e:
+                self._requeue(e.failed, counts, oldest)
+                self._record_flush(len(pending) - len(e.failed), oldest)
+                raise
+            except Exception:
+                self._requeue(pending, counts, oldest)
+                raise
+
+            self._record_flush(len(pending), oldest)
+            return len(pending)
+
+    def _requeue(self, failed, counts, oldest):
+        # Put the totals back so the next flush retries them
+        with self._lock:
+            for key, amount in failed.items():
+                self._pending[key] = self._pending.get(key, 0) + amount
+                self._counts[key] = self._counts.get(key, 0) + counts.get(key, 0)
+                self._pending_count += counts.get(key, 0)
+            self._oldest = min(filter(None, [self._oldest, oldest]), default=oldest)
+            self._stats["failed_flushes"] += 1
+
+    def _record_flush(self, written, oldest):
+        lag = time.monotonic() - oldest
+        with self._lock:
+            self._stats["writes"] += written
+            self._stats["flushes"] += 1
+            self._stats["last_flush_lag_seconds"] = lag
+            self._stats["max_flush_lag_seconds"] = max(self._stats["max_flush_lag_seconds"], lag)
+
+    def stats(self):
+        """
+        Returns counters for monitoring. `coalesced` is how many increments
+        were merged into another write instead of being written on their own.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending_keys"] = len(self._pending)
+            stats["pending_increments"] = self._pending_count
+        stats["coalesced"] = stats["increments"] - stats["pending_increments"] - stats["writes"]
+        return stats
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != pid:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-flush", daemon=True)
+                self._thread_pid = pid
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("write_behind_flush_failed", buffer=self.name, error=str(e))
+
+    def close(self):
+        """
+        Stops the background thread and writes anything still buffered.
+        """
+        self._stopping = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("write_behind_flush_failed", buffer=self.name, error=str(e), shutdown=True)
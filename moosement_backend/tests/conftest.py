@@ -0,0 +1,102 @@
+"""
+The tests run against mongomock (see benchmarks/mongomock_backend.py), so
+no MongoDB server is needed. From moosement_backend/:
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGO_WRITE_CONCERN", "1")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")  # Hash inline, no process pool
+os.environ.setdefault("PASSWORD_HASH_METHOD", "scrypt:1024:8:1")
+
+import pytest
+
+from benchmarks import mongomock_backend
+
+client = mongomock_backend.install("moosement_test")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture(scope="session")
+def async_app(app):
+    """
+    The async tier, on the same mongomock client as app.
+    """
+    from app.aio import create_async_app
+    return create_async_app()
+
+
+@pytest.fixture
+def database(app):
+    """
+    An empty database with every index in place, and empty catalog caches.
+    """
+    from models import db
+    from models.challenges import challenge_catalog
+    from models.indexes import ensure_indexes
+    from models.rewards import reward_catalog
+
+    client.drop_database(db.get_db().name)
+    assert ensure_indexes() == []
+    challenge_catalog.invalidate()
+    reward_catalog.invalidate()
+    return db.get_db()
+
+
+@pytest.fixture
+def token(app):
+    """
+    Returns a function that signs a session token, as login would.
+    """
+    from app.session import issue_token
+
+    def sign(user_id, team_id=None, company_id=None):
+        with app.app_context():
+            return issue_token(user_id, team_id, company_id)
+    return sign
+
+
+COMMANDS = (
+    "find", "find_one", "find_one_and_update", "find_one_and_delete", "count_documents", "aggregate",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "bulk_write",
+)
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """
+    Records (collection, command) for each database call, like a
+    CommandListener would on a real server. Calls made inside another call
+    (mongomock's find_one runs find) are not counted again.
+    """
+    import threading
+
+    import mongomock
+
+    recorded = []
+    depth = threading.local()
+
+    def counted(name, method):
+        def wrapper(self, *args, **kwargs):
+            outer = not getattr(depth, "value", 0)
+            if outer:
+                recorded.append((self.name, name))
+            depth.value = getattr(depth, "value", 0) + 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                depth.value -= 1
+        return wrapper
+
+    for name in COMMANDS:
+        monkeypatch.setattr(mongomock.Collection, name, counted(name, getattr(mongomock.Collection, name)))
+    return recorded
@@ -0,0 +1,49 @@
+import asyncio
+
+from models import db
+from tests.test_challenges import _setup
+
+
+def _call(async_app, method, path, **kwargs):
+    """
+    Calls the async app and returns (status, JSON body).
+    """
+    async def call():
+        response = await getattr(async_app.test_client(), method)(path, **kwargs)
+        return response.status_code, await response.get_json()
+    return asyncio.run(call())
+
+
+def test_complete_then_history(async_app, database, token):
+    challenge_id, team_id, user_id = _setup(database)
+    database[db.USERS].update_one({"_id": user_id}, {"$set": {"team_id": team_id}})
+    headers = {"Authorization": f"Bearer {token(user_id, team_id)}"}
+
+    status, body = _call(
+        async_app, "post", "/api/challenges/complete", json={"challenge_id": challenge_id}, headers=headers
+    )
+    assert status == 200 and body["current_streak"] == 1
+    points = body["points_earned"]
+    assert database[db.TEAMS].find_one({"team_id": team_id})["total_team_points"] == points
+
+    status, body = _call(
+        async_app, "post", "/api/challenges/complete", json={"challenge_id": challenge_id}, headers=headers
+    )
+    assert status == 400
+    assert database[db.USERS].find_one({"_id": user_id})["total_points"] == points
+
+    status, body = _call(async_app, "get", "/api/challenges/history", headers=headers)
+    assert status == 200
+    assert [completion["challenge_id"] for completion in body["completed_challenges"]] == [challenge_id]
+
+
+def test_complete_and_history_need_a_session_token(async_app, database):
+    challenge_id, _, user_id = _setup(database)
+
+    status, _ = _call(
+        async_app, "post", "/api/challenges/complete", json={"challenge_id": challenge_id, "user_id": str(user_id)}
+    )
+    assert status == 401
+    status, _ = _call(async_app, "get", f"/api/challenges/history?user_id={user_id}")
+    assert status == 401
+    assert database[db.USERS].find_one({"_id": user_id})["total_points"] == 0
@@ -0,0 +1,121 @@
+import datetime
+
+from bson import ObjectId
+
+from models import db
+
+
+def _setup(database, **user_fields):
+    challenge_id = database[db.CHALLENGES].insert_one({"name": "Walk", "points": 10}).inserted_id
+    team_id = str(ObjectId())
+    database[db.TEAMS].insert_one({"team_id": team_id, "name": "T", "total_team_points": 0, "members": []})
+    user_id = database[db.USERS].insert_one({"total_points": 0, "points": 0, "streaks": 0, **user_fields}).inserted_id
+    return str(challenge_id), team_id, user_id
+
+
+def _complete(app, token, user_id, team_id, challenge_id):
+    return app.test_client().post(
+        "/api/challenges/complete", json={"challenge_id": challenge_id},
+        headers={"Authorization": f"Bearer {token(user_id, team_id)}"},
+    )
+
+
+def test_complete_challenge_makes_three_commands_in_two_round_trips(app, database, token, commands):
+    challenge_id, team_id, user_id = _setup(database)
+    database[db.USERS].update_one({"_id": user_id}, {"$set": {"team_id": team_id}})
+    client = app.test_client()
+    client.get("/api/challenges/get_challenges")  # Load the catalog first
+    commands.clear()
+
+    response = _complete(app, token, user_id, team_id, challenge_id)
+
+    assert response.status_code == 200
+    # One guarded user update, then the history insert and the team $inc in parallel
+    assert commands[0] == (db.USERS, "find_one_and_update")
+    assert sorted(commands[1:]) == sorted([(db.COMPLETIONS, "insert_one"), (db.TEAMS, "update_one")])
+    assert database[db.TEAMS].find_one({"team_id": team_id})["total_team_points"] == response.get_json()["points_earned"]
+
+
+def test_second_completion_on_the_same_day_is_rejected(app, database, token):
+    challenge_id, team_id, user_id = _setup(database)
+    assert _complete(app, token, user_id, team_id, challenge_id).status_code == 200
+    assert _complete(app, token, user_id, team_id, challenge_id).status_code == 400
+    assert database[db.COMPLETIONS].count_documents({}) == 1
+
+
+def test_completion_already_recorded_gives_back_the_points(app, database, token):
+    # A completion from before last_completed existed
+    challenge_id, team_id, user_id = _setup(database, team_id=None)
+    database[db.USERS].update_one({"_id": user_id}, {"$set": {"team_id": team_id}})
+    today = datetime.datetime.utcnow()
+    database[db.COMPLETIONS].insert_one({
+        "user_id": user_id, "challenge_id": challenge_id, "day": today.date().isoformat(),
+        "points_earned": 10, "streak": 1, "completed_at": today.isoformat(),
+    })
+
+    response = _complete(app, token, user_id, team_id, challenge_id)
+
+    assert response.status_code == 400
+    user = database[db.USERS].find_one({"_id": user_id})
+    assert user["total_points"] == 0
+    # The streak is as it was, so tomorrow's completion does not build on today's
+    assert user["streaks"] == 0
+    assert "last_active_day" not in user and challenge_id not in user.get("last_completed", {})
+    assert database[db.TEAMS].find_one({"team_id": team_id})["total_team_points"] == 0
+
+
+
+def test_revoked_completion_keeps_the_earlier_streak(app, database, token):
+    yesterday = (datetime.datetime.utcnow().date() - datetime.timedelta(days=1)).isoformat()
+    challenge_id, team_id, user_id = _setup(database, streaks=3, last_active_day=yesterday)
+    database[db.USERS].update_one({"_id": user_id}, {"$set": {f"last_completed.{challenge_id}": yesterday}})
+    today = datetime.datetime.utcnow()
+    database[db.COMPLETIONS].insert_one({
+        "user_id": user_id, "challenge_id": challenge_id, "day": today.date().isoformat(),
+        "points_earned": 10, "streak": 1, "completed_at": today.isoformat(),
+    })
+
+    assert _complete(app, token, user_id, team_id, challenge_id).status_code == 400
+    user = database[db.USERS].find_one({"_id": user_id})
+    assert (user["total_points"], user["streaks"], user["last_active_day"]) == (0, 3, yesterday)
+    assert user["last_completed"] == {challenge_id: yesterday}
+
+def test_backfill_keeps_existing_streaks(database):
+    from models.completions import backfill_user_activity
+    from models.users import current_streak
+
+    yesterday = (datetime.datetime.utcnow().date() - datetime.timedelta(days=1)).isoformat()
+    user_id = database[db.USERS].insert_one({"streaks": 4}).inserted_id
+    database[db.COMPLETIONS].insert_many([
+        {"user_id": user_id, "challenge_id": "a", "day": "2025-01-01", "completed_at": "2025-01-01T08:00:00"},
+        {"user_id": user_id, "challenge_id": "a", "day": yesterday, "completed_at": yesterday + "T08:00:00"},
+        {"user_id": user_id, "challenge_id": "b", "day": "2025-01-02", "completed_at": "2025-01-02T08:00:00"},
+    ])
+
+    assert backfill_user_activity() == 1
+    user = database[db.USERS].find_one({"_id": user_id})
+    assert user["last_active_day"] == yesterday
+    assert user["last_completed"] == {"a": yesterday, "b": "2025-01-02"}
+    assert current_streak(user["streaks"], user["last_active_day"]) == 4
+
+
+def test_history_needs_the_user(app, database, token):
+    user_id = database[db.USERS].insert_one({"email": "a@example.com"}).inserted_id
+    client = app.test_client()
+
+    assert client.get("/api/challenges/history").status_code == 401
+    # A bare user id is not proof of who is asking
+    assert client.get(f"/api/challenges/history?user_id={user_id}").status_code == 401
+    response = client.get("/api/challenges/history", headers={"Authorization": f"Bearer {token(user_id)}"})
+    assert response.status_code == 200 and response.get_json()["completed_challenges"] == []
+
+
+def test_complete_needs_a_session_token(app, database):
+    challenge_id, team_id, user_id = _setup(database, team_id=None)
+
+    response = app.test_client().post(
+        "/api/challenges/complete", json={"challenge_id": challenge_id, "user_id": str(user_id)}
+    )
+
+    assert response.status_code == 401
+    assert database[db.USERS].find_one({"_id": user_id})["total_points"] == 0
@@ -0,0 +1,7 @@
+from app.commands import QUERY_SHAPES
+
+
+def test_query_shapes_name_real_endpoints(app):
+    commands = set(app.cli.list_commands(None))
+    for endpoint, _, _, _ in QUERY_SHAPES:
+        assert endpoint in app.view_functions or endpoint in commands, endpoint
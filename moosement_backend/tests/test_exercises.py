@@ -0,0 +1,39 @@
+from models import db
+
+
+def test_log_rejects_unknown_exercise_type(app, database, token):
+    user_id = database[db.USERS].insert_one({"email": "a@example.com", "total_points": 0}).inserted_id
+    headers = {"Authorization": f"Bearer {token(user_id)}"}
+
+    for exercise_type in (["running"], {"a": 1}, "juggling"):
+        response = app.test_client().post(
+            "/api/exercise/log", json={"exercise_type": exercise_type, "value": 3}, headers=headers
+        )
+        assert response.status_code == 400
+    assert database[db.USERS].find_one({"_id": user_id})["total_points"] == 0
+
+
+def test_team_history_is_only_for_members(app, database, token):
+    user_id = database[db.USERS].insert_one({"email": "a@example.com", "team_id": "team-a"}).inserted_id
+    headers = {"Authorization": f"Bearer {token(user_id, 'team-a')}"}
+    client = app.test_client()
+
+    assert client.get("/api/exercise/team_history?team_id=team-a").status_code == 401
+    assert client.get(f"/api/exercise/team_history?user_id={user_id}&team_id=team-a").status_code == 401
+    assert client.get("/api/exercise/team_history?team_id=team-b", headers=headers).status_code == 403
+    response = client.get("/api/exercise/team_history", headers=headers)
+    assert response.status_code == 200 and response.get_json()["team_id"] == "team-a"
+
+
+def test_history_needs_a_session_token(app, database, token):
+    user_id = database[db.USERS].insert_one({"email": "a@example.com"}).inserted_id
+    other_id = database[db.USERS].insert_one({"email": "b@example.com"}).inserted_id
+    client = app.test_client()
+
+    assert client.get("/api/exercise/history").status_code == 401
+    # A bare user id is not proof of who is asking
+    assert client.get(f"/api/exercise/history?user_id={user_id}").status_code == 401
+    headers = {"Authorization": f"Bearer {token(other_id)}"}
+    assert client.get(f"/api/exercise/history?user_id={user_id}", headers=headers).status_code == 403
+    response = client.get("/api/exercise/history", headers={"Authorization": f"Bearer {token(user_id)}"})
+    assert response.status_code == 200 and response.get_json()["user_id"] == str(user_id)
@@ -0,0 +1,99 @@
+import io
+import tempfile
+import time
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from models import db
+
+CSV = (
+    "name,email,password,department,team\n"
+    "Ann,ann@example.com,secret,Ops,Blue\n"
+    "Bob,bob@example.com,,Ops,Blue\n"
+    "Cat,not-an-email,,Ops,Red\n"
+)
+
+
+def _import(client, headers):
+    response = client.post("/api/users/import", data=CSV, headers=headers, content_type="text/csv")
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    for _ in range(100):
+        job = client.get(status_url, headers=headers).get_json()
+        if job["status"] != "running":
+            return job
+        time.sleep(0.05)
+    raise AssertionError("import did not finish")
+
+
+def test_import_runs_as_a_job_and_reruns_cleanly(app, database, token):
+    admin_id = database[db.USERS].insert_one(
+        {"email": "admin@example.com", "company_id": "acme", "role": "admin"}
+    ).inserted_id
+    headers = {"Authorization": f"Bearer {token(admin_id, None, 'acme')}"}
+    client = app.test_client()
+
+    job = _import(client, headers)
+    assert job["status"] == "done"
+    assert job["progress"] == {"rows": 3, "created": 2, "duplicates": 0, "failed": 1}
+    assert [activation["email"] for activation in job["report"]["activations"]] == ["bob@example.com"]
+
+    again = _import(client, headers)
+    assert again["progress"]["duplicates"] == 2
+    assert database[db.TEAMS].count_documents({"company_id": "acme", "name": "Blue"}) == 1
+
+
+def test_import_is_for_admins(app, database, token):
+    user_id = database[db.USERS].insert_one({"email": "a@example.com", "company_id": "acme"}).inserted_id
+    headers = {"Authorization": f"Bearer {token(user_id)}"}
+
+    response = app.test_client().post("/api/users/import", data=CSV, headers=headers, content_type="text/csv")
+    assert response.status_code == 403
+
+
+
+@pytest.fixture
+def admin_headers(database, token):
+    admin_id = database[db.USERS].insert_one(
+        {"email": "admin@example.com", "company_id": "acme", "role": "admin"}
+    ).inserted_id
+    return {"Authorization": f"Bearer {token(admin_id, None, 'acme')}"}
+
+
+def test_import_body_over_the_limit_is_refused(app, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, "IMPORT_MAX_BYTES", len(CSV) - 1)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    client = app.test_client()
+
+    response = client.post("/api/users/import", data=CSV, headers=admin_headers, content_type="text/csv")
+    assert response.status_code == 413
+    # Without a Content-Length the limit is enforced while spooling
+    response = client.post(
+        "/api/users/import", input_stream=io.BytesIO(CSV.encode()), headers=admin_headers,
+        content_type="text/csv", environ_overrides={"wsgi.input_terminated": True, "CONTENT_LENGTH": ""},
+    )
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spool_file_is_removed_if_the_job_does_not_start(app, admin_headers, monkeypatch, tmp_path):
+    from app import users
+
+    def fail(*args):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(users, "start_import_job", fail)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    response = app.test_client().post("/api/users/import", data=CSV, headers=admin_headers, content_type="text/csv")
+    assert response.status_code == 500
+    assert list(tmp_path.iterdir()) == []
+
+def test_team_names_are_unique_per_company(database):
+    teams = database[db.TEAMS]
+    teams.insert_one({"team_id": "t1", "company_id": "acme", "name": "Blue"})
+    teams.insert_one({"team_id": "t2", "company_id": "other", "name": "Blue"})
+
+    with pytest.raises(DuplicateKeyError):
+        teams.insert_one({"team_id": "t3", "company_id": "acme", "name": "Blue"})
@@ -0,0 +1,48 @@
+from models import db
+from models.leaderboards import build_snapshots
+
+
+def _page(client, headers, cursor=None):
+    url = "/api/leaderboards/individual?company_id=acme&limit=2"
+    return client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+
+
+def _users(database):
+    return database[db.USERS].insert_many([
+        {"email": f"u{index}@example.com", "name": f"u{index}", "company_id": "acme", "total_points": 10 * index}
+        for index in range(4)
+    ]).inserted_ids
+
+
+def test_cursor_stays_on_its_snapshot_across_a_rebuild(app, database, token):
+    user_ids = _users(database)
+    headers = {"Authorization": f"Bearer {token(user_ids[0], None, 'acme')}"}
+    build_snapshots()
+    client = app.test_client()
+    first = _page(client, headers).get_json()
+
+    # Everyone on the first page drops to the bottom before the next page is read
+    database[db.USERS].update_many({"total_points": {"$gte": 20}}, {"$set": {"total_points": 0}})
+    build_snapshots()
+    second = _page(client, headers, first["next_cursor"]).get_json()
+
+    names = [entry["name"] for entry in first["leaderboard"] + second["leaderboard"]]
+    assert names == ["u3", "u2", "u1", "u0"]
+    assert second["built_at"] == first["built_at"]
+
+    build_snapshots()
+    assert _page(client, headers, first["next_cursor"]).status_code == 410
+
+
+def test_board_is_only_for_the_users_own_company(app, database, token):
+    _users(database)
+    outsider_id = database[db.USERS].insert_one({"email": "o@example.com", "company_id": "other"}).inserted_id
+    build_snapshots()
+    client = app.test_client()
+
+    assert _page(client, {}).status_code == 401
+    # The token's company is only a hint; the user's current company decides
+    headers = {"Authorization": f"Bearer {token(outsider_id, None, 'acme')}"}
+    assert _page(client, headers).status_code == 403
+    response = client.get("/api/leaderboards/individual", headers=headers)
+    assert response.status_code == 200 and response.get_json()["company_id"] == "other"
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_load_test_runs_every_scenario_on_mongomock():
+    # The harness exits non-zero if a build fails or a scenario gets no 2xx
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_test", "--backend", "mongomock",
+         "--users", "20", "--teams", "4", "--requests", "10", "--concurrency", "2"],
+        cwd=ROOT, capture_output=True, text=True, timeout=600,
+        env=dict(os.environ, PASSWORD_HASH_WORKERS="0", PASSWORD_HASH_METHOD="scrypt:1024:8:1"),
+    )
+    assert result.returncode == 0, result.stderr
+    for scenario in ("complete", "redeem", "individual_leaderboard", "today"):
+        assert scenario in result.stdout
+
+
+def test_leaderboard_snapshot_and_assignments_build(database):
+    from benchmarks.seed import seed
+    from models.assignments import assign_daily_challenges
+    from models.leaderboards import build_snapshots, company_scope, get_page
+
+    data = seed(12, 3, 2, 1, 2, 1234)
+    build_snapshots()
+    entries, snapshot = get_page(company_scope(data["companies"][0]))
+    assert snapshot["built_at"] and entries
+    assert [entry["position"] for entry in entries] == list(range(1, len(entries) + 1))
+    points = [entry["total_points"] for entry in entries]
+    assert points == sorted(points, reverse=True)
+    assert assign_daily_challenges() == len(data["users"])
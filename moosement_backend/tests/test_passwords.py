@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import passwords
+
+
+@pytest.fixture
+def restore_settings():
+    saved = dict(passwords._settings)
+    yield
+    passwords.shutdown()
+    passwords.configure(**saved)
+
+
+def test_needs_rehash_compares_the_full_method(restore_settings):
+    passwords.configure(PASSWORD_HASH_METHOD="scrypt")
+
+    assert not passwords.needs_rehash(generate_password_hash("pw", "scrypt"))
+    assert passwords.needs_rehash(generate_password_hash("pw", "scrypt:1024:8:1"))
+    assert passwords.needs_rehash(generate_password_hash("pw", "pbkdf2:sha256"))
+
+
+
+@pytest.mark.parametrize("method", ["scrypt", "scrypt:1024:8:1", "pbkdf2", "pbkdf2:sha512", "pbkdf2:sha256:1000"])
+def test_method_prefix_matches_werkzeug(method):
+    assert passwords._method_prefix(method) == generate_password_hash("pw", method).split("$", 1)[0]
+
+def test_slow_hash_raises_hashing_busy(restore_settings):
+    passwords.configure(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT_SECONDS=0.01)
+
+    with pytest.raises(passwords.HashingBusy):
+        passwords._run(time.sleep, 1)
+    with pytest.raises(passwords.HashingBusy):
+        asyncio.run(passwords._run_async(time.sleep, 1))
+
+
+def test_batch_hashing_waits_for_slots(restore_settings):
+    passwords.configure(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=2, PASSWORD_HASH_TIMEOUT_SECONDS=0.1)
+    for _ in range(2):
+        passwords._slots.acquire()
+
+    with pytest.raises(passwords.HashingBusy):
+        passwords.hash_passwords(["a", "b"])
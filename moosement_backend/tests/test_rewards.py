@@ -0,0 +1,25 @@
+from models import db
+from models.rewards import REDEEMED, SOLD_OUT, redeem_reward, reward_catalog
+
+
+def _user(database, email, points=1000):
+    return database[db.USERS].insert_one({"email": email, "total_points": points, "redeemed_rewards": []}).inserted_id
+
+
+def test_stock_added_after_caching_is_enforced(database):
+    database[db.REWARDS].insert_one({"name": "Mug", "points_required": 10})
+    reward = reward_catalog.get("Mug")
+    database[db.REWARDS].update_one({"name": "Mug"}, {"$set": {"stock": 1}})
+
+    assert redeem_reward(_user(database, "a@example.com"), reward)[0] == REDEEMED
+    assert redeem_reward(_user(database, "b@example.com"), reward)[0] == SOLD_OUT
+    assert database[db.REWARDS].find_one({"name": "Mug"})["stock"] == 0
+
+
+def test_unlimited_reward_keeps_no_stock(database):
+    database[db.REWARDS].insert_one({"name": "Badge", "points_required": 10})
+    reward = reward_catalog.get("Badge")
+
+    assert redeem_reward(_user(database, "a@example.com"), reward)[0] == REDEEMED
+    assert redeem_reward(_user(database, "b@example.com", points=0), reward)[0] != REDEEMED
+    assert "stock" not in database[db.REWARDS].find_one({"name": "Badge"})
@@ -0,0 +1,41 @@
+from models import db
+
+
+def _sync(app, body, headers=None):
+    return app.test_client().post("/api/sync/batch", json=body, headers=headers or {})
+
+
+def test_sync_needs_a_session_token(app, database):
+    user_id = database[db.USERS].insert_one({"total_points": 0}).inserted_id
+    item = {"type": "exercise", "exercise_type": "walking", "value": 10}
+
+    assert _sync(app, {"user_id": str(user_id), "items": [item]}).status_code == 401
+    assert database[db.USERS].find_one({"_id": user_id})["total_points"] == 0
+
+
+def test_sync_only_credits_the_signed_in_user(app, database, token):
+    user_id = database[db.USERS].insert_one({"email": "a@example.com", "total_points": 0, "updated_at": "2025-01-01"}).inserted_id
+    other_id = database[db.USERS].insert_one({"email": "b@example.com", "total_points": 0, "updated_at": "2025-01-01"}).inserted_id
+    items = [
+        {"type": "exercise", "exercise_type": "walking", "value": 10},
+        {"type": "exercise", "exercise_type": "walking", "value": 10, "user_id": str(other_id)},
+    ]
+
+    response = _sync(app, {"items": items}, {"Authorization": f"Bearer {token(user_id)}"})
+
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == ["ok", "error"]
+    assert results[1]["error"] == "Item is for another user"
+    assert database[db.USERS].find_one({"_id": user_id})["total_points"] > 0
+    assert database[db.USERS].find_one({"_id": other_id})["total_points"] == 0
+
+
+def test_streak_reset_bumps_updated_at(database):
+    from models.users import reset_broken_streaks
+
+    user_id = database[db.USERS].insert_one(
+        {"streaks": 3, "last_active_day": "2025-01-01", "updated_at": "2025-01-01T00:00:00"}
+    ).inserted_id
+    assert reset_broken_streaks() == 1
+    user = database[db.USERS].find_one({"_id": user_id})
+    assert user["streaks"] == 0 and user["updated_at"] > "2025-01-01T00:00:00"
@@ -0,0 +1,118 @@
+from models import db
+
+
+def test_invites_use_the_current_team_not_the_tokens(app, database, token):
+    user_id = database[db.USERS].insert_one(
+        {"email": "a@example.com", "team_id": "team-b", "company_id": "acme"}
+    ).inserted_id
+    stale = {"Authorization": f"Bearer {token(user_id, 'team-a', 'acme')}"}
+
+    response = app.test_client().post("/api/teams/invite", headers=stale)
+
+    assert response.status_code == 200
+    invite = database[db.INVITES].find_one({"_id": response.get_json()["code"]})
+    assert invite["team_id"] == "team-b"
+
+
+def _admin(database, token, role="admin"):
+    database[db.TEAMS].insert_one({"team_id": "team-a", "company_id": "acme", "members": [], "total_team_points": 0})
+    admin_id = database[db.USERS].insert_one(
+        {"email": "admin@example.com", "team_id": "team-a", "company_id": "acme", "role": role}
+    ).inserted_id
+    return {"Authorization": f"Bearer {token(admin_id, 'team-a', 'acme')}"}
+
+
+def test_bulk_invites_are_for_admins(app, database, token):
+    headers = _admin(database, token, role="employee")
+    client = app.test_client()
+
+    assert client.post("/api/teams/invites/bulk", json={"count": 2}, headers=headers).status_code == 403
+    body = {"invites": [{"code": "x", "user_id": "0" * 24}]}
+    assert client.post("/api/teams/invites/bulk_accept", json=body, headers=headers).status_code == 403
+
+
+def test_bulk_accept_only_places_newcomers_of_the_company(app, database, token):
+    headers = _admin(database, token)
+    client = app.test_client()
+    users = database[db.USERS]
+    newcomer = users.insert_one({"email": "new@example.com", "company_id": "acme", "team_id": None}).inserted_id
+    outsider = users.insert_one({"email": "out@example.com", "company_id": "other"}).inserted_id
+    taken = users.insert_one({"email": "taken@example.com", "company_id": "acme", "team_id": "team-b"}).inserted_id
+
+    codes = [invite["code"] for invite in
+             client.post("/api/teams/invites/bulk", json={"count": 3}, headers=headers).get_json()["invites"]]
+    body = {"invites": [{"code": code, "user_id": str(user_id)}
+                        for code, user_id in zip(codes, [newcomer, outsider, taken])]}
+    result = client.post("/api/teams/invites/bulk_accept", json=body, headers=headers).get_json()
+
+    assert result["accepted"] == [codes[0]]
+    assert sorted(item["code"] for item in result["rejected"]) == sorted(codes[1:])
+    assert users.find_one({"_id": newcomer})["team_id"] == "team-a"
+    assert users.find_one({"_id": outsider}).get("team_id") is None
+    assert users.find_one({"_id": taken})["team_id"] == "team-b"
+    assert database[db.TEAMS].find_one({"team_id": "team-a"})["members"] == [str(newcomer)]
+    assert database[db.INVITES].count_documents({"_id": {"$in": codes[1:]}, "claim": {"$exists": False}}) == 2
+
+
+def test_users_who_joined_a_team_meanwhile_are_not_moved(database):
+    from models.invites import _apply_newcomers
+
+    database[db.TEAMS].insert_one({"team_id": "team-a", "company_id": "acme", "members": []})
+    late = database[db.USERS].insert_one({"email": "late@example.com", "company_id": "acme", "team_id": "team-b"}).inserted_id
+    fresh = database[db.USERS].insert_one({"email": "new@example.com", "company_id": "acme"}).inserted_id
+
+    invite = {"team_id": "team-a"}
+    moved = _apply_newcomers({str(late): invite, str(fresh): invite}, "acme")
+
+    assert moved == {str(fresh)}
+    assert database[db.USERS].find_one({"_id": late})["team_id"] == "team-b"
+    assert database[db.TEAMS].find_one({"team_id": "team-a"})["members"] == [str(fresh)]
+
+
+def _board(database):
+    # team-b, team-c and team-d tie, so team_id decides their order
+    points = {"team-a": 30, "team-c": 20, "team-b": 20, "team-d": 20, "team-e": 10, "team-f": 0}
+    database[db.TEAMS].insert_many([
+        {"team_id": team_id, "name": team_id, "company_id": "acme", "total_team_points": total}
+        for team_id, total in points.items()
+    ])
+
+
+def _standings(entries):
+    return [(entry["team_id"], entry["team_standing"]) for entry in entries]
+
+
+def test_leaderboard_pages_continue_through_tied_points(app, database):
+    _board(database)
+    client = app.test_client()
+
+    pages, cursor = [], None
+    while True:
+        body = client.get("/api/teams/new_leaderboard?limit=2" + (f"&cursor={cursor}" if cursor else "")).get_json()
+        pages.append(_standings(body["leaderboard"]))
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert pages == [
+        [("team-a", 1), ("team-b", 2)],
+        [("team-c", 3), ("team-d", 4)],
+        [("team-e", 5), ("team-f", 6)],
+    ]
+
+
+def test_rank_numbers_neighbours_at_the_top_and_bottom(app, database):
+    _board(database)
+    client = app.test_client()
+
+    top = client.get("/api/teams/rank?team_id=team-a&neighbours=2").get_json()
+    assert top["team"]["team_standing"] == 1
+    assert top["above"] == [] and _standings(top["below"]) == [("team-b", 2), ("team-c", 3)]
+
+    middle = client.get("/api/teams/rank?team_id=team-c&neighbours=1").get_json()
+    assert middle["team"]["team_standing"] == 3
+    assert _standings(middle["above"]) == [("team-b", 2)] and _standings(middle["below"]) == [("team-d", 4)]
+
+    bottom = client.get("/api/teams/rank?team_id=team-f&neighbours=2").get_json()
+    assert bottom["team"]["team_standing"] == 6
+    assert _standings(bottom["above"]) == [("team-d", 4), ("team-e", 5)] and bottom["below"] == []
@@ -0,0 +1,20 @@
+from app import users
+from models import db
+
+
+def test_register_race_on_the_same_email_is_a_conflict(app, database, monkeypatch):
+    hash_password = users.hash_password
+
+    def hash_while_another_request_registers(password):
+        # The other request inserts after this one has checked the email
+        database[db.USERS].insert_one({"email": "a@example.com"})
+        return hash_password(password)
+
+    monkeypatch.setattr(users, "hash_password", hash_while_another_request_registers)
+    response = app.test_client().post(
+        "/api/users/register", json={"name": "A", "email": "a@example.com", "password": "pw"}
+    )
+
+    assert response.status_code == 409
+    assert response.get_json()["error"] == "User with this email already exists"
+    assert database[db.USERS].count_documents({"email": "a@example.com"}) == 1
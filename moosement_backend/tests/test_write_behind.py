@@ -0,0 +1,47 @@
+import pytest
+
+from models.write_behind import PartialFlush, PointsBuffer
+
+
+def _buffer(writer):
+    buffer = PointsBuffer(writer, "test")
+    buffer.configure(True, 60, 1000)
+    return buffer
+
+
+def test_partial_flush_retries_only_the_failed_keys():
+    written = []
+
+    def writer(pending):
+        written.append(dict(pending))
+        if len(written) == 1:
+            raise PartialFlush({"b": pending["b"]})
+
+    buffer = _buffer(writer)
+    for key in ("a", "a", "b"):
+        buffer.add(key, 5)
+
+    with pytest.raises(PartialFlush):
+        buffer.flush()
+    assert buffer.flush() == 1
+    assert written == [{"a": 10, "b": 5}, {"b": 5}]
+
+
+def test_failed_flush_keeps_the_coalesced_count():
+    failures = [RuntimeError("down")]
+
+    def writer(pending):
+        if failures:
+            raise failures.pop()
+
+    buffer = _buffer(writer)
+    for _ in range(3):
+        buffer.add("a", 1)
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    stats = buffer.stats()
+    assert stats["pending_increments"] == 3 and stats["coalesced"] == 0
+    buffer.flush()
+    stats = buffer.stats()
+    assert stats["writes"] == 1 and stats["coalesced"] == 2